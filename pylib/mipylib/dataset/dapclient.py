@@ -0,0 +1,399 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: OPeNDAP request coalescing and response cache
+# Note: Jython
+#-----------------------------------------------------
+
+import os
+import json
+import time
+import hashlib
+import threading
+import Queue
+from collections import OrderedDict
+
+from org.meteoinfo.data import ArrayMath, ArrayUtil
+from org.meteoinfo.data.meteodata import MeteoDataInfo
+from ucar.ma2 import Array, Range, MAMath, DataType
+import mipylib.miutil as miutil
+
+def isurl(fname):
+    '''
+    Check if a file name is a remote (OPeNDAP) data URL.
+
+    :param fname: (*string*) File name.
+
+    :returns: (*boolean*) Is URL or not.
+    '''
+    s5 = fname[0:5]
+    return s5 == 'http:' or s5 == 'https' or s5 == 'dods:' or s5 == 'dap4:'
+
+def constraint(ranges):
+    '''
+    Get OPeNDAP hyperslab constraint expression of ranges.
+
+    :param ranges: (*list*) Range list.
+
+    :returns: (*string*) Constraint expression, e.g. ``[0:1:9][0:1:180]``.
+    '''
+    s = ''
+    for r in ranges:
+        s += '[%i:%i:%i]' % (r.first(), r.stride(), r.last())
+    return s
+
+def coalesce(requests, gap=0):
+    '''
+    Merge hyperslab requests which are adjacent or overlapping in the leading dimension
+    and identical in other dimensions.
+
+    :param requests: (*list*) Hyperslab requests, each is a Range list.
+    :param gap: (*int*) Maximum number of unrequested records between two requests to be
+        merged. Default is ``0``.
+
+    :returns: (*list*) Merged requests, each item is a tuple of merged Range list and the
+        indices of the original requests it covers.
+    '''
+    groups = OrderedDict()
+    for i in range(len(requests)):
+        ranges = requests[i]
+        key = constraint(ranges[1:])
+        groups.setdefault(key, []).append(i)
+
+    merged = []
+    for key, idxs in groups.iteritems():
+        idxs = sorted(idxs, key=lambda i: requests[i][0].first())
+        tail = requests[idxs[0]][1:]
+        first = requests[idxs[0]][0].first()
+        last = requests[idxs[0]][0].last()
+        members = [idxs[0]]
+        for i in idxs[1:]:
+            r = requests[i][0]
+            if r.first() <= last + 1 + gap:
+                last = max(last, r.last())
+                members.append(i)
+            else:
+                merged.append(([Range(first, last, 1)] + list(tail), members))
+                first = r.first()
+                last = r.last()
+                members = [i]
+        merged.append(([Range(first, last, 1)] + list(tail), members))
+    return merged
+
+def _subset(a, first, ranges):
+    '''
+    Extract a request from a fetched block whose leading dimension starts at ``first``.
+    '''
+    r0 = ranges[0]
+    sranges = [Range(r0.first() - first, r0.last() - first, r0.stride())]
+    for r in ranges[1:]:
+        sranges.append(Range(0, r.length() - 1, 1))
+    r = ArrayMath.section(a, sranges)
+    rr = Array.factory(r.getDataType(), r.getShape())
+    MAMath.copy(rr, r)
+    return rr
+
+def _open_dap(url):
+    meteodata = MeteoDataInfo()
+    meteodata.openNetCDFData(url)
+    return meteodata
+
+# Persistent response cache on disk
+class ResponseCache(object):
+    '''
+    Persistent on-disk cache of remote responses keyed by URL and constraint expression.
+    The least recently used responses are removed when the total size exceeds the cap. Access
+    times are kept in memory and the index file is written by ``put``, ``flush`` and
+    ``close``.
+
+    :param cachedir: (*string*) Cache directory.
+    :param maxsize: (*int*) Maximum cache size in bytes.
+    '''
+
+    def __init__(self, cachedir, maxsize=1024*1024*1024):
+        self.cachedir = cachedir
+        self.maxsize = maxsize
+        self.lock = threading.RLock()
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        self.indexfn = os.path.join(cachedir, 'index.json')
+        self.index = {}
+        self.dirty = False
+        if os.path.isfile(self.indexfn):
+            try:
+                with open(self.indexfn) as f:
+                    self.index = json.load(f)
+            except ValueError:
+                self.index = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __filename(self, key):
+        return os.path.join(self.cachedir, hashlib.md5(key).hexdigest() + '.bin')
+
+    def __save_index(self):
+        with open(self.indexfn, 'w') as f:
+            json.dump(self.index, f)
+        self.dirty = False
+
+    def flush(self):
+        '''
+        Write the index with the access times of the cache hits.
+        '''
+        with self.lock:
+            if self.dirty:
+                self.__save_index()
+
+    def close(self):
+        '''
+        Close the cache, the index is written.
+        '''
+        self.flush()
+
+    def size(self):
+        '''
+        Get total cached bytes.
+        '''
+        n = 0
+        for item in self.index.values():
+            n += item['nbytes']
+        return n
+
+    def get(self, key):
+        '''
+        Get a cached response.
+
+        :param key: (*string*) Response key.
+
+        :returns: (*Array*) Cached array or ``None``.
+        '''
+        with self.lock:
+            item = self.index.get(key)
+            if item is None:
+                return None
+            fn = self.__filename(key)
+            if not os.path.isfile(fn):
+                del self.index[key]
+                self.dirty = True
+                return None
+            item['atime'] = time.time()
+            self.dirty = True
+        return ArrayUtil.readBinFile(fn, item['shape'], item['dtype'], 0, 'little_endian')
+
+    def put(self, key, a):
+        '''
+        Put a response into the cache.
+
+        :param key: (*string*) Response key.
+        :param a: (*Array*) Response array.
+        '''
+        dtype = a.getDataType()
+        if not dtype in [DataType.BYTE, DataType.SHORT, DataType.INT, DataType.FLOAT, DataType.DOUBLE]:
+            return
+        nbytes = int(a.getSize()) * dtype.getSize()
+        if nbytes > self.maxsize:
+            return
+        with self.lock:
+            ArrayUtil.saveBinFile(self.__filename(key), a, 'little_endian', False, False)
+            self.index[key] = {'shape': list(a.getShape()), 'dtype': dtype.toString(), \
+                'nbytes': nbytes, 'atime': time.time()}
+            self.__evict()
+            self.__save_index()
+
+    def __evict(self):
+        total = self.size()
+        if total <= self.maxsize:
+            return
+        keys = sorted(self.index.keys(), key=lambda k: self.index[k]['atime'])
+        for key in keys:
+            fn = self.__filename(key)
+            if os.path.isfile(fn):
+                os.remove(fn)
+            total -= self.index.pop(key)['nbytes']
+            if total <= self.maxsize:
+                break
+
+    def clear(self):
+        '''
+        Remove all cached responses.
+        '''
+        with self.lock:
+            for key in self.index.keys():
+                fn = self.__filename(key)
+                if os.path.isfile(fn):
+                    os.remove(fn)
+            self.index = {}
+            self.__save_index()
+
+# Client side layer of remote (OPeNDAP) data reading
+class DapClient(object):
+    '''
+    Client side layer of remote data reading. Reads of a few records along the leading
+    (usually time) dimension are expanded to blocks of records, so a loop over time steps
+    issues one remote request per block instead of one per step. Fetched responses can be
+    kept in a persistent disk cache, and batches of hyperslab requests are merged and
+    fetched through parallel connections.
+
+    :param url: (*string*) Data URL.
+    :param dataset: (*MeteoDataInfo*) Opened dataset of the URL. Default is ``None``, the URL
+        will be opened.
+    :param nconn: (*int*) Number of parallel connections. Default is ``1``.
+    :param blocksize: (*int*) Number of leading dimension records of a block. Default is
+        ``None``, means decided by ``blockbytes``.
+    :param blockbytes: (*int*) Maximum bytes of a block. Default is 16 MB.
+    :param memsize: (*int*) Maximum bytes of blocks kept in memory. Default is 64 MB.
+    :param cachedir: (*string*) Persistent response cache directory. Default is ``None``,
+        means no disk cache.
+    :param cachesize: (*int*) Maximum bytes of the disk cache. Default is 1 GB.
+    :param opener: (*function*) Function to open the URL as a MeteoDataInfo object. Default
+        opens it as netCDF/OPeNDAP data.
+    '''
+
+    def __init__(self, url, dataset=None, nconn=1, blocksize=None, blockbytes=16*1024*1024, \
+        memsize=64*1024*1024, cachedir=None, cachesize=1024*1024*1024, opener=None):
+        self.url = url
+        self.opener = _open_dap if opener is None else opener
+        if dataset is None:
+            dataset = self.opener(url)
+        self.dataset = dataset
+        self.nconn = max(1, nconn)
+        self.blocksize = blocksize
+        self.blockbytes = blockbytes
+        self.memsize = memsize
+        self.cache = None if cachedir is None else ResponseCache(cachedir, cachesize)
+        self._blocks = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self._conns = Queue.Queue()
+        self._conns.put(dataset)
+        self._opened = []
+        self.nrequest = 0
+
+    def __key(self, varname, ranges):
+        return self.url + '?' + varname + constraint(ranges)
+
+    def __acquire(self):
+        try:
+            return self._conns.get_nowait()
+        except Queue.Empty:
+            with self._lock:
+                if len(self._opened) + 1 < self.nconn:
+                    ds = self.opener(self.url)
+                    self._opened.append(ds)
+                    return ds
+            return self._conns.get()
+
+    def fetch(self, varname, ranges):
+        '''
+        Fetch a hyperslab through the disk cache without block expansion.
+
+        :param varname: (*string*) Variable name.
+        :param ranges: (*list*) Range list.
+
+        :returns: (*Array*) Data array.
+        '''
+        key = self.__key(varname, ranges)
+        if not self.cache is None:
+            a = self.cache.get(key)
+            if not a is None:
+                return a
+        ds = self.__acquire()
+        try:
+            a = ds.read(varname, ranges)
+        finally:
+            self._conns.put(ds)
+        with self._lock:
+            self.nrequest += 1
+        if not self.cache is None:
+            self.cache.put(key, a)
+        return a
+
+    def __blocklen(self, varname, ranges):
+        if not self.blocksize is None:
+            return self.blocksize
+        var = self.dataset.getDataInfo().getVariable(varname)
+        n = var.getDataType().getSize()
+        for r in ranges[1:]:
+            n *= r.length()
+        return max(1, self.blockbytes // n)
+
+    def __getblock(self, varname, branges):
+        key = self.__key(varname, branges)
+        with self._lock:
+            a = self._blocks.pop(key, None)
+            if not a is None:
+                self._blocks[key] = a
+                return a
+        a = self.fetch(varname, branges)
+        with self._lock:
+            self._blocks[key] = a
+            self._nbytes += int(a.getSize()) * a.getDataType().getSize()
+            while self._nbytes > self.memsize and len(self._blocks) > 1:
+                k, b = self._blocks.popitem(last=False)
+                self._nbytes -= int(b.getSize()) * b.getDataType().getSize()
+        return a
+
+    def read(self, varname, ranges):
+        '''
+        Read a hyperslab of a variable. The hyperslab is served from a cached block of
+        leading dimension records if possible.
+
+        :param varname: (*string*) Variable name.
+        :param ranges: (*list*) Range list.
+
+        :returns: (*Array*) Data array.
+        '''
+        ranges = list(ranges)
+        if len(ranges) == 0:
+            return self.fetch(varname, ranges)
+        r0 = ranges[0]
+        bs = self.__blocklen(varname, ranges)
+        bidx = r0.first() // bs
+        if bs <= 1 or bidx != r0.last() // bs:
+            return self.fetch(varname, ranges)
+        var = self.dataset.getDataInfo().getVariable(varname)
+        dimlen = var.getDimension(0).getLength()
+        first = bidx * bs
+        last = min(first + bs, dimlen) - 1
+        block = self.__getblock(varname, [Range(first, last, 1)] + ranges[1:])
+        return _subset(block, first, ranges)
+
+    def read_many(self, varname, requests, gap=0):
+        '''
+        Read a batch of hyperslabs of a variable. Adjacent or overlapping requests are merged
+        and the merged requests are fetched through parallel connections.
+
+        :param varname: (*string*) Variable name.
+        :param requests: (*list*) Hyperslab requests, each is a Range list.
+        :param gap: (*int*) Maximum number of unrequested leading dimension records between
+            two requests to be merged. Default is ``0``.
+
+        :returns: (*list*) Data arrays in the order of the requests.
+        '''
+        merged = coalesce(requests, gap)
+        blocks = miutil.pmap(self.fetch, [(varname, m[0]) for m in merged], self.nconn)
+        r = [None] * len(requests)
+        for (mranges, members), block in zip(merged, blocks):
+            for i in members:
+                r[i] = _subset(block, mranges[0].first(), requests[i])
+        return r
+
+    def clear(self):
+        '''
+        Clear in-memory blocks.
+        '''
+        with self._lock:
+            self._blocks.clear()
+            self._nbytes = 0
+
+    def close(self):
+        '''
+        Close the extra connections and the response cache.
+        '''
+        self.clear()
+        for ds in self._opened:
+            ds.close()
+        self._opened = []
+        if not self.cache is None:
+            self.cache.close()
\ No newline at end of file
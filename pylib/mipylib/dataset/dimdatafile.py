@@ -16,6 +16,7 @@ import mipylib.miutil as miutil
 import mipylib.numeric.minum as minum
 
 import datetime
+import threading
 
 from java.util import Calendar
 from java.lang import Float
@@ -25,9 +26,16 @@ import jarray
 class DimDataFile(object):
     
     # dataset must be org.meteoinfo.data.meteodata.MeteoDataInfo
-    def __init__(self, dataset=None, access='r', ncfile=None, arldata=None, bufrdata=None):
+    # dapclient is DapClient for remote (OPeNDAP) data
+    # mmreader is MMapReader for fixed layout binary data
+    def __init__(self, dataset=None, access='r', ncfile=None, arldata=None, bufrdata=None, dapclient=None, \
+        mmreader=None):
         self.dataset = dataset
         self.access = access
+        self.dapclient = dapclient
+        self.mmreader = mmreader
+        #Serializes the reads, the dataset readers are not thread-safe
+        self.lock = threading.RLock()
         if not dataset is None:
             self.filename = dataset.getFileName()
             self.nvar = dataset.getDataInfo().getVariableNum()
@@ -63,6 +71,10 @@ class DimDataFile(object):
         '''
         Close the opended dataset
         '''
+        if not self.dapclient is None:
+            self.dapclient.close()
+        if not self.mmreader is None:
+            self.mmreader.close()
         if not self.dataset is None:
             self.dataset.close()
         elif not self.ncfile is None:
@@ -123,10 +135,30 @@ class DimDataFile(object):
         
         :varname: (*string*) Variable name
         '''
-        if origin is None:
-            return self.dataset.read(varname)
-        else:
-            return self.dataset.read(varname, origin, size, stride)
+        with self.lock:
+            if origin is None:
+                return self.dataset.read(varname)
+            else:
+                return self.dataset.read(varname, origin, size, stride)
+            
+    def read_ranges(self, varname, ranges):
+        '''
+        Read data array of a hyperslab from a variable. Remote data are read through the
+        request coalescing and cache layer, and fixed layout binary data are read through
+        the memory-mapped reader.
+        
+        :varname: (*string*) Variable name
+        :ranges: (*list*) Range list of the hyperslab
+        '''
+        with self.lock:
+            if not self.dapclient is None:
+                return self.dapclient.read(varname, ranges)
+            if not self.mmreader is None and self.mmreader.hasvar(varname):
+                dims = self.dataset.getDataInfo().getVariable(varname).getDimensions()
+                r = self.mmreader.read(varname, dims, ranges)
+                if not r is None:
+                    return r
+            return self.dataset.read(varname, ranges)
         
     def dump(self):
         '''
@@ -265,7 +297,9 @@ class DimDataFile(object):
         '''
         datatype = self.dataset.getDataInfo().getDataType()
         if datatype.isGrADS() or datatype == MeteoDataType.HYSPLIT_Conc:
-            self.dataset.getDataInfo().setBigEndian(big_endian)            
+            self.dataset.getDataInfo().setBigEndian(big_endian)
+            if not self.mmreader is None:
+                self.mmreader.setbyteorder('big_endian' if big_endian else 'little_endian')            
             
     def tostation(self, varname, x, y, z, t):
         '''
@@ -10,11 +10,84 @@ from org.meteoinfo.global import PointD
 from org.meteoinfo.projection import KnownCoordinateSystems, Reproject
 from ucar.nc2 import Attribute
 from ucar.ma2 import Range, Array, MAMath
-from mipylib.numeric.dimarray import DimArray
+from mipylib.numeric.dimarray import DimArray, PackedDimArray, unpack_array
 from mipylib.numeric.miarray import MIArray
 import mipylib.numeric.minum as minum
 import mipylib.miutil as miutil
 import datetime
+import threading
+import Queue
+import sys
+
+from java.util.concurrent import Semaphore, TimeUnit
+
+def _produce(read, keys, slots, results, stop):
+    try:
+        for key in keys:
+            #Poll so the thread exits once the iteration is closed or abandoned
+            while not slots.tryAcquire(100, TimeUnit.MILLISECONDS):
+                if stop.is_set():
+                    return
+            if stop.is_set():
+                return
+            results.put((True, read(key)))
+    except:
+        results.put((False, sys.exc_info()))
+
+class _Prefetch(object):
+    '''
+    Iterate read results of keys while reading the following ones on a background thread.
+    No more than ``prefetch`` results are read ahead of the consumer, so up to ``prefetch + 1``
+    results are in memory together with the one being consumed. The background thread stops
+    when the iteration ends, fails, is closed or the iterator is garbage collected.
+    '''
+    def __init__(self, read, keys, prefetch):
+        self.read = read
+        self.keys = list(keys)
+        self.idx = 0
+        self.stop = None
+        if prefetch > 0 and len(self.keys) > 0:
+            self.slots = Semaphore(prefetch)
+            self.results = Queue.Queue()
+            self.stop = threading.Event()
+            worker = threading.Thread(target=_produce, args=(read, self.keys, self.slots, \
+                self.results, self.stop))
+            worker.setDaemon(True)
+            worker.start()
+            
+    def __iter__(self):
+        return self
+        
+    def next(self):
+        if self.idx >= len(self.keys):
+            self.close()
+            raise StopIteration
+        self.idx += 1
+        if self.stop is None:
+            return self.read(self.keys[self.idx - 1])
+        ok, r = self.results.get()
+        if not ok:
+            self.close()
+            raise r[0], r[1], r[2]
+        self.slots.release()
+        return r
+        
+    def close(self):
+        '''
+        Stop the background reading.
+        '''
+        self.idx = len(self.keys)
+        if not self.stop is None:
+            self.stop.set()
+            
+    def __del__(self):
+        self.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, type, value, traceback):
+        self.close()
 
 # Dimension variable
 class DimVariable(object):
@@ -33,6 +106,7 @@ class DimVariable(object):
             self.fill_value = variable.getFillValue()
             self.scale_factor = variable.getScaleFactor()
             self.add_offset = variable.getAddOffset()
+            self.unpack = False
         elif not ncvariable is None:
             self.name = ncvariable.getShortName()
             self.dims = ncvariable.getDimensions()
@@ -259,15 +333,33 @@ class DimVariable(object):
                     dims.append(dim)
         #rr = self.dataset.read(self.name, origin, size, stride).reduce()
         if onlyrange:
-            rr = self.dataset.dataset.read(self.name, ranges)
+            rr = self.dataset.read_ranges(self.name, ranges)
         else:
-            rr = self.dataset.dataset.take(self.name, ranges)
+            with self.dataset.lock:
+                rr = self.dataset.dataset.take(self.name, ranges)
+        packed = self.unpack and self.ispacked() and rr.getDataType().isIntegral()
         if rr.getSize() == 1:
-            return rr.getObject(0)
+            r = rr.getObject(0)
+            if packed:
+                if r == self.fill_value:
+                    r = minum.nan
+                else:
+                    r = r * self.scale_factor + self.add_offset
+            return r
         else:
             for i in flips:
                 rr = rr.flip(i)
             rr = rr.reduce()
+            if packed:
+                if self.unpack == 'lazy':
+                    if len(flips) > 0:
+                        rrr = Array.factory(rr.getDataType(), rr.getShape())
+                        MAMath.copy(rrr, rr)
+                        rr = rrr
+                    return PackedDimArray(rr, dims, self.fill_value, self.dataset.proj, \
+                        self.scale_factor, self.add_offset, self.fill_value)
+                rr = unpack_array(rr, self.scale_factor, self.add_offset, self.fill_value)
+                return DimArray(MIArray(rr), dims, self.fill_value, self.dataset.proj)
             ArrayMath.missingToNaN(rr, self.fill_value)
             if len(flips) > 0:
                 rrr = Array.factory(rr.getDataType(), rr.getShape())
@@ -280,6 +372,60 @@ class DimVariable(object):
     
     def read(self):
         return MIArray(self.dataset.read(self.name))
+        
+    def ispacked(self):
+        '''
+        Check if the variable is packed with ``scale_factor`` or ``add_offset``.
+        
+        :returns: (*boolean*) Packed or not.
+        '''
+        return self.scale_factor != 1 or self.add_offset != 0
+        
+    def setunpack(self, unpack):
+        '''
+        Set how packed data are decoded when reading.
+        
+        :param unpack: (*boolean or string*) ``True`` - unpack with ``scale_factor`` and
+            ``add_offset`` and set missing values as NaN in the reading; ``False`` - return
+            the packed values (default); ``lazy`` - keep the data packed and unpack them when
+            the values are used.
+        '''
+        self.unpack = unpack
+        
+    def iter_time(self, step=1, prefetch=1, start=0, stop=None):
+        '''
+        Iterate over time steps. The following time steps are read on a background thread
+        while the current one is processed.
+        
+        :param step: (*int*) Time index step. Default is ``1``.
+        :param prefetch: (*int*) Number of time steps read ahead. Default is ``1``. ``0`` means
+            no background reading. Up to ``prefetch + 1`` time steps are in memory, including
+            the current one.
+        :param start: (*int*) Start time index. Default is ``0``.
+        :param stop: (*int*) Stop time index (not included). Default is ``None``, means the
+            length of the time dimension.
+        
+        :returns: Iterator of (time, DimArray) pairs. Call its ``close`` method or use it in
+            a ``with`` statement to stop the background reading when leaving the loop early.
+        '''
+        tidx = -1
+        for i in range(self.ndim):
+            if self.dims[i].getDimType() == DimensionType.T:
+                tidx = i
+                break
+        if tidx < 0:
+            raise ValueError('The variable has no time dimension!')
+        tdim = self.dims[tidx]
+        if stop is None:
+            stop = tdim.getLength()
+        tvalues = tdim.getDimValue()
+        
+        def read(t):
+            indices = [slice(None)] * self.ndim
+            indices[tidx] = t
+            return miutil.num2date(tvalues[t]), self.__getitem__(tuple(indices))
+        
+        return _Prefetch(read, range(start, stop, step), prefetch)
     
     # get dimension length
     def dimlen(self, idx):
@@ -370,6 +516,7 @@ class TDimVariable():
         self.fill_value = variable.getFillValue()
         self.scale_factor = variable.getScaleFactor()
         self.add_offset = variable.getAddOffset()
+        self.unpack = False
         dims = variable.getDimensions()
         tdim = Dimension(DimensionType.T)
         times = []
@@ -380,6 +527,43 @@ class TDimVariable():
         self.dims = dims
         self.tnum = len(times)
         
+    def iter_time(self, step=1, prefetch=1, start=0, stop=None):
+        '''
+        Iterate over time steps across the data files. The following time steps are read on
+        a background thread while the current one is processed.
+        
+        :param step: (*int*) Time index step. Default is ``1``.
+        :param prefetch: (*int*) Number of time steps read ahead. Default is ``1``. ``0`` means
+            no background reading. Up to ``prefetch + 1`` time steps are in memory, including
+            the current one.
+        :param start: (*int*) Start time index. Default is ``0``.
+        :param stop: (*int*) Stop time index (not included). Default is ``None``, means the
+            total time number of the data files.
+        
+        :returns: Iterator of (time, DimArray) pairs. Call its ``close`` method or use it in
+            a ``with`` statement to stop the background reading when leaving the loop early.
+        '''
+        if stop is None:
+            stop = self.tnum
+            
+        def read(t):
+            indices = [slice(None)] * self.ndim
+            indices[0] = t
+            return self.dataset.gettime(t), self.__getitem__(tuple(indices))
+        
+        return _Prefetch(read, range(start, stop, step), prefetch)
+        
+    def setunpack(self, unpack):
+        '''
+        Set how packed data are decoded when reading.
+        
+        :param unpack: (*boolean or string*) ``True`` - unpack with ``scale_factor`` and
+            ``add_offset`` and set missing values as NaN in the reading; ``False`` - return
+            the packed values (default); ``lazy`` - keep the data packed and unpack them when
+            the values are used.
+        '''
+        self.unpack = unpack
+        
     def __getitem__(self, indices):
         if len(indices) != self.ndim:
             print 'indices must be ' + str(self.ndim) + ' dimensions!'
@@ -426,6 +610,7 @@ class TDimVariable():
                 ei = i - step
                 ddf = self.dataset[sfidx]
                 var = ddf[self.name]
+                var.unpack = self.unpack
                 ii, ssi = self.dataset.dftindex(si)
                 ii, eei = self.dataset.dftindex(ei)
                 eei += 1
@@ -447,6 +632,7 @@ class TDimVariable():
             ei = eidx + 1 - step
             ddf = self.dataset[sfidx]
             var = ddf[self.name]
+            var.unpack = self.unpack
             ii, ssi = self.dataset.dftindex(si)
             ii, eei = self.dataset.dftindex(ei)
             eei += 1
@@ -466,6 +652,7 @@ class TDimVariable():
             sfidx = self.dataset.datafileindex(sidx)
             ddf = self.dataset[sfidx]
             var = ddf[self.name]
+            var.unpack = self.unpack
             ii, ssi = self.dataset.dftindex(sidx)
             nindices = list(indices)
             nindices[0] = slice(ssi, ssi, step)
@@ -7,6 +7,7 @@
 
 import os
 import datetime
+import jarray
 
 from org.meteoinfo.data.meteodata import MeteoDataInfo, Dimension, DimensionType
 from org.meteoinfo.data.meteodata.arl import ARLDataInfo
@@ -14,6 +15,9 @@ from org.meteoinfo.data.meteodata.bufr import BufrDataInfo
 from org.meteoinfo.data.meteodata.netcdf import NetCDFDataInfo
 from org.meteoinfo.data import ArrayUtil, TableUtil
 from ucar.nc2 import NetcdfFileWriter
+from ucar.ma2 import Array, DataType
+from java.io import RandomAccessFile, FileOutputStream, BufferedOutputStream
+from java.nio import ByteBuffer, ByteOrder
 
 import mipylib.numeric.minum as minum
 import mipylib.miutil as miutil
@@ -21,6 +25,8 @@ from mipylib.numeric.miarray import MIArray
 from mipylib.numeric.dimarray import DimArray
 from mipylib.numeric.mitable import PyTableData
 from dimdatafile import DimDataFile, DimDataFiles
+from dapclient import DapClient, isurl
+from mmapreader import mmap_grads, mmap_bil
 import mipylib.migl as migl
 
 __all__ = [
@@ -28,7 +34,8 @@ __all__ = [
     'addfile_grads','addfile_hyconc','addfile_hytraj','addfile_lonlat','addfile_micaps',
     'addfile_mm5','addfile_nc','addfile_grib','addfile_surfer',
     'addtimedim','joinncfile','asciiread','asciiwrite','binread','binwrite',
-    'numasciicol','numasciirow','readtable','convert2nc','dimension','grads2nc','ncwrite'
+    'numasciicol','numasciirow','readtable','convert2nc','dimension','grads2nc','ncwrite',
+    'binread_records'
     ]
 
 def isgriddata(gdata):
@@ -38,9 +45,8 @@ def isstationdata(sdata):
     return isinstance(sdata, PyStationData)
     
 def __getfilename(fname):
-    s5 = fname[0:5]
     isweb = False
-    if s5 == 'http:' or s5 == 'https' or s5 == 'dods:' or s5 == 'dap4:':
+    if isurl(fname):
         isweb = True
         return fname, isweb
     if os.path.exists(fname):
@@ -83,6 +89,9 @@ def addfile(fname, access='r', dtype='netcdf', keepopen=False, **kwargs):
     :param dtype: (*string*) The data type of the data file. Default is ``netcdf``.
     :param keepopen: (*boolean*) If the file keep open after this function. Default is ``False``. The
         file need to be closed later if ``keepopen`` is ``True``.
+    :param kwargs: Options of remote (OPeNDAP) data reading, see ``addfile_nc``.
+    :param mmap: (*boolean*) Read GrADS and BIL binary data through memory mapping if the
+        data layout is supported. Default is ``True``.
     
     :returns: (*DimDataFile*) Opened file object.
     """
@@ -93,20 +102,20 @@ def addfile(fname, access='r', dtype='netcdf', keepopen=False, **kwargs):
             raise IOError(fname)
 
         if isweb:
-            return addfile_nc(fname, False)
+            return addfile_nc(fname, False, **kwargs)
         
         if not os.path.exists(fname):
             raise IOError(fname)
         
         fsufix = os.path.splitext(fname)[1].lower()
         if fsufix == '.ctl':
-            return addfile_grads(fname, False)
+            return addfile_grads(fname, False, kwargs.pop('mmap', True))
         elif fsufix == '.tif':
             return addfile_geotiff(fname, False)
         elif fsufix == '.awx':
             return addfile_awx(fname, False)
         elif fsufix == '.bil':
-            return addfile_bil(fname, False)
+            return addfile_bil(fname, False, kwargs.pop('mmap', True))
         
         meteodata = MeteoDataInfo()
         meteodata.openData(fname, keepopen)
@@ -153,13 +162,15 @@ def addfile(fname, access='r', dtype='netcdf', keepopen=False, **kwargs):
     else:
         return None
     
-def addfile_grads(fname, getfn=True):
+def addfile_grads(fname, getfn=True, mmap=True):
     '''
     Add a GrADS data file. use this function is GrADS control file has no ``.ctl`` suffix, otherwise use
     ``addfile`` function.
     
     :param fname: (*string*) GrADS control file name.
     :param getfn: (*string*) If run ``__getfilename`` function or not. Default is ``True``.
+    :param mmap: (*boolean*) Read the binary data through memory mapping if the data layout is
+        supported (no templates, PDEF, EDEF or ZREV). Default is ``True``.
     
     :returns: (*DimDataFile*) Opened file object.
     '''
@@ -167,15 +178,32 @@ def addfile_grads(fname, getfn=True):
         fname, isweb = __getfilename(fname)
     meteodata = MeteoDataInfo()
     meteodata.openGrADSData(fname)
-    datafile = DimDataFile(meteodata)
+    mmreader = mmap_grads(fname, meteodata) if mmap else None
+    datafile = DimDataFile(meteodata, mmreader=mmreader)
     return datafile
     
-def addfile_nc(fname, getfn=True):
+def addfile_nc(fname, getfn=True, **kwargs):
     '''
     Add a netCDF data file.
     
+    Remote (OPeNDAP) data are read through a client side layer: reads of a few records along
+    the leading dimension are served from blocks of records fetched by one request, fetched
+    responses can be kept in a persistent disk cache, and batches of hyperslab requests
+    (``DimDataFile.dapclient.read_many``) are merged and fetched through parallel connections.
+    
     :param fname: (*string*) The netCDF file name.
     :param getfn: (*string*) If run ``__getfilename`` function or not. Default is ``True``.
+    :param dapcache: (*boolean*) Use the request coalescing and cache layer for remote data or
+        not. Default is ``True``.
+    :param nconn: (*int*) Number of parallel connections for remote data. Default is ``1``.
+    :param blocksize: (*int*) Number of leading dimension records fetched by one request. Default
+        is ``None``, means decided by ``blockbytes``.
+    :param blockbytes: (*int*) Maximum bytes fetched by one request. Default is 16 MB.
+    :param cachedir: (*string*) Persistent response cache directory. Default is ``None``, means
+        no disk cache.
+    :param cachesize: (*int*) Maximum bytes of the disk cache. Default is 1 GB.
+    
+    The remote data parameters (``dapcache`` to ``cachesize``) are ignored for local files.
     
     :returns: (*DimDataFile*) Opened file object.
     '''
@@ -183,7 +211,10 @@ def addfile_nc(fname, getfn=True):
         fname, isweb = __getfilename(fname)
     meteodata = MeteoDataInfo()
     meteodata.openNetCDFData(fname)
-    datafile = DimDataFile(meteodata)
+    dapclient = None
+    if isurl(fname) and kwargs.pop('dapcache', True):
+        dapclient = DapClient(fname, meteodata, **kwargs)
+    datafile = DimDataFile(meteodata, dapclient=dapclient)
     return datafile
     
 def addfile_grib(fname, getfn=True, version=None):
@@ -346,12 +377,14 @@ def addfile_geotiff(fname, getfn=True):
     datafile = DimDataFile(meteodata)
     return datafile
     
-def addfile_bil(fname, getfn=True):
+def addfile_bil(fname, getfn=True, mmap=True):
     '''
     Add a bil data file.
     
     :param fname: (*string*) The bil file name.
     :param getfn: (*string*) If run ``__getfilename`` function or not. Default is ``True``.
+    :param mmap: (*boolean*) Read the data through memory mapping if the data layout is supported
+        (single band float data). Default is ``True``.
     
     :returns: (*DimDataFile*) Opened file object.
     '''
@@ -361,7 +394,8 @@ def addfile_bil(fname, getfn=True):
         raise IOError('No such file: ' + fname)
     meteodata = MeteoDataInfo()
     meteodata.openBILData(fname)
-    datafile = DimDataFile(meteodata)
+    mmreader = mmap_bil(fname, meteodata) if mmap else None
+    datafile = DimDataFile(meteodata, mmreader=mmreader)
     return datafile
     
 def addfile_awx(fname, getfn=True):
@@ -547,7 +581,139 @@ def binread(fn, dim, datatype=None, skip=0, byteorder='little_endian'):
     r = ArrayUtil.readBinFile(fn, dim, datatype, skip, byteorder);
     return MIArray(r)
         
-def binwrite(fn, data, byteorder='little_endian', append=False, sequential=False):
+__bintypes = {'byte': (DataType.BYTE, 'b', 1), 'short': (DataType.SHORT, 'h', 2), \
+    'int': (DataType.INT, 'i', 4), 'float': (DataType.FLOAT, 'f', 4), 'double': (DataType.DOUBLE, 'd', 8)}
+    
+def __bintype(datatype):
+    if isinstance(datatype, DataType):
+        datatype = datatype.toString()
+    if not datatype in __bintypes:
+        raise ValueError('Data type not supported: ' + str(datatype))
+    return __bintypes[datatype]
+    
+def __typedbuffer(buf, code):
+    '''
+    Typed view of a byte buffer from its position, ``code`` is the jarray type code of
+    ``__bintype``.
+    '''
+    if code == 'b':
+        return buf.slice()
+    elif code == 'h':
+        return buf.asShortBuffer()
+    elif code == 'i':
+        return buf.asIntBuffer()
+    elif code == 'f':
+        return buf.asFloatBuffer()
+    else:
+        return buf.asDoubleBuffer()
+        
+def __readfully(channel, buf, pos):
+    while buf.hasRemaining():
+        n = channel.read(buf, pos)
+        if n < 0:
+            raise IOError('End of file reached!')
+        pos += n
+        
+def binread_records(fn, recshape, nrec=None, stride=1, fortran_sequential=True, datatype='float', \
+    skip=0, byteorder='little_endian', start=0, index=None):
+    """
+    Read multiple records from a binary file in one pass into one array.
+    
+    :param fn: (*string*) The binary file name for data reading.
+    :param recshape: (*list*) Dimensions of a record.
+    :param nrec: (*int*) Number of records to read. Default is ``None``, means all records from
+        ``start`` to the end of the file with ``stride``.
+    :param stride: (*int*) Record index step. Default is ``1``.
+    :param fortran_sequential: (*boolean*) If the records are Fortran sequential records with 4 bytes
+        length markers before and after each record. Default is ``True``.
+    :param datatype: (*string*) Data type string [byte | short | int | float | double]. Default is
+        ``float``.
+    :param skip: (*int*) Skip bytes number at the beginning of the file.
+    :param byteorder: (*string*) Byte order. ``little_endian`` or ``big_endian``.
+    :param start: (*int*) Index of the first record to read. Default is ``0``.
+    :param index: (*tuple of slices*) Hyperslab within each record, negative steps reverse the
+        order. Default is ``None``, means the whole record.
+    
+    :returns: (*MIArray*) Data array with record dimension as the first dimension.
+    """
+    if not os.path.exists(fn):
+        raise IOError('No such file: ' + fn)
+    dtype, code, itemsize = __bintype(datatype)
+    recshape = list(recshape)
+    nvals = 1
+    for n in recshape:
+        nvals *= n
+    databytes = nvals * itemsize
+    head = 4 if fortran_sequential else 0
+    recbytes = databytes + 2 * head
+    if nrec is None:
+        nall = (os.path.getsize(fn) - skip) // recbytes
+        nrec = len(range(start, nall, stride))
+        
+    #Contiguous runs (item offset, item number, item step) of the hyperslab in a record
+    if index is None:
+        selshape = recshape
+        runs = None
+        nsel = nvals
+    else:
+        if not isinstance(index, tuple):
+            index = (index,)
+        index = list(index) + [slice(None)] * (len(recshape) - len(index))
+        index = [slice(k, k + 1) if isinstance(k, int) else k for k in index]
+        idxs = [range(*k.indices(n)) for k, n in zip(index, recshape)]
+        selshape = [len(k) for k in idxs]
+        nsel = 1
+        for n in selshape:
+            nsel *= n
+        strides = [1] * len(recshape)
+        for i in range(len(recshape) - 2, -1, -1):
+            strides[i] = strides[i + 1] * recshape[i + 1]
+        last = idxs[-1]
+        runstep = last[1] - last[0] if len(last) > 1 else 1
+        runs = [(last[0] if len(last) > 0 else 0, len(last), runstep)]
+        for i in range(len(recshape) - 2, -1, -1):
+            runs = [(k * strides[i] + off, n, st) for k in idxs[i] for off, n, st in runs]
+    
+    order = ByteOrder.BIG_ENDIAN if byteorder == 'big_endian' else ByteOrder.LITTLE_ENDIAN
+    dst = jarray.zeros(nrec * nsel, code)
+    raf = RandomAccessFile(fn, 'r')
+    channel = raf.getChannel()
+    try:
+        if runs is None and stride == 1 and not fortran_sequential and nrec * databytes < 2**30:
+            buf = ByteBuffer.allocate(nrec * databytes).order(order)
+            __readfully(channel, buf, skip + start * recbytes)
+            buf.flip()
+            __typedbuffer(buf, code).get(dst)
+        else:
+            buf = ByteBuffer.allocate(recbytes).order(order)
+            k = 0
+            for i in range(nrec):
+                buf.clear()
+                __readfully(channel, buf, skip + (start + i * stride) * recbytes)
+                if fortran_sequential and (buf.getInt(0) != databytes or buf.getInt(recbytes - 4) != databytes):
+                    raise IOError('Fortran record length marker mismatch at record %i!' % (start + i * stride))
+                buf.position(head)
+                tbuf = __typedbuffer(buf, code)
+                if runs is None:
+                    tbuf.get(dst, k, nvals)
+                    k += nvals
+                else:
+                    #Item offsets from the record start, so negative steps stay in the record
+                    for off, n, st in runs:
+                        if st == 1:
+                            tbuf.position(off)
+                            tbuf.get(dst, k, n)
+                        else:
+                            for j in range(n):
+                                dst[k + j] = tbuf.get(off + j * st)
+                        k += n
+    finally:
+        channel.close()
+        raf.close()
+    r = Array.factory(dtype, [nrec] + selshape, dst)
+    return MIArray(r)
+        
+def binwrite(fn, data, byteorder='little_endian', append=False, sequential=False, records=False):
     """
     Create a binary data file from an array variable.
     
@@ -556,8 +722,35 @@ def binwrite(fn, data, byteorder='little_endian', append=False, sequential=False
     :param byteorder: (*string*) Byte order. ``little_endian`` or ``big_endian``.
     :param append: (*boolean*) Append to an existing file or not.
     :param sequential: (*boolean*) If write binary data as sequential - Fortran
+    :param records: (*boolean*) Only used for sequential writing. If ``True``, the first dimension
+        of the data is the record dimension and each sub array is written as one Fortran record in a
+        single buffered stream. Default is ``False``, means the whole array is one record.
     """
-    ArrayUtil.saveBinFile(fn, data.asarray(), byteorder, append, sequential)  
+    if not (sequential and records):
+        ArrayUtil.saveBinFile(fn, data.asarray(), byteorder, append, sequential)
+        return
+        
+    a = data.asarray()
+    datatype = a.getDataType().toString()
+    dtype, code, itemsize = __bintype(datatype)
+    nrec = data.shape[0]
+    nvals = int(a.getSize()) // nrec if nrec > 0 else 0
+    databytes = nvals * itemsize
+    storage = a.copyTo1DJavaArray()
+    order = ByteOrder.BIG_ENDIAN if byteorder == 'big_endian' else ByteOrder.LITTLE_ENDIAN
+    buf = ByteBuffer.allocate(databytes + 8).order(order)
+    out = BufferedOutputStream(FileOutputStream(fn, append), 1024 * 1024)
+    try:
+        for i in range(nrec):
+            buf.clear()
+            buf.putInt(databytes)
+            tbuf = __typedbuffer(buf, code)
+            tbuf.put(storage, i * nvals, nvals)
+            buf.position(4 + databytes)
+            buf.putInt(databytes)
+            out.write(buf.array(), 0, databytes + 8)
+    finally:
+        out.close()
     
 def convert2nc(infn, outfn, version='netcdf3', writedimvar=False, largefile=False):
     """
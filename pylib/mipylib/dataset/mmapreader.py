@@ -0,0 +1,325 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Memory-mapped reading of fixed layout binary data
+# Note: Jython
+#-----------------------------------------------------
+
+import os
+import threading
+
+from org.meteoinfo.data.meteodata import DimensionType
+from ucar.ma2 import Array, DataType
+from java.io import RandomAccessFile
+from java.nio import ByteOrder
+from java.nio.channels import FileChannel
+import jarray
+
+# Memory-mapped reader of float32 (x, y) records
+class MMapReader(object):
+    '''
+    Memory-mapped reader of fixed layout binary data consisting of float32 (x, y) records.
+    Hyperslab reads compute the byte offsets of the rows and copy them straight from the
+    mapped region with bulk byte order conversion.
+
+    :param fname: (*string*) Binary data file name.
+    :param nx: (*int*) X number of a record.
+    :param ny: (*int*) Y number of a record.
+    :param byteorder: (*string*) Byte order. ``little_endian`` or ``big_endian``.
+    :param yrev: (*boolean*) If the rows are stored in reverse order of the Y dimension.
+    :param segsize: (*int*) Bytes of a mapped segment. Default is 256 MB.
+    '''
+
+    def __init__(self, fname, nx, ny, byteorder='little_endian', yrev=False, segsize=256*1024*1024):
+        self.fname = fname
+        self.nx = nx
+        self.ny = ny
+        self.setbyteorder(byteorder)
+        self.yrev = yrev
+        self.segsize = segsize
+        self.overlap = nx * 4
+        self.raf = RandomAccessFile(fname, 'r')
+        self.channel = self.raf.getChannel()
+        self.fsize = self.channel.size()
+        #Variable name: (first record data offset, time stride bytes, level stride bytes, level number)
+        self.records = {}
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def setbyteorder(self, byteorder):
+        '''
+        Set byte order.
+
+        :param byteorder: (*string*) Byte order. ``little_endian`` or ``big_endian``.
+        '''
+        self.byteorder = byteorder
+        if byteorder == 'big_endian':
+            self._order = ByteOrder.BIG_ENDIAN
+        else:
+            self._order = ByteOrder.LITTLE_ENDIAN
+
+    def addrecord(self, varname, offset, tstride, zstride, nz=1):
+        '''
+        Add record layout of a variable.
+
+        :param varname: (*string*) Variable name.
+        :param offset: (*int*) Byte offset of the data of the first record.
+        :param tstride: (*int*) Bytes between two time steps.
+        :param zstride: (*int*) Bytes between two levels.
+        :param nz: (*int*) Level number.
+        '''
+        self.records[varname] = (offset, tstride, zstride, nz)
+
+    def hasvar(self, varname):
+        return varname in self.records
+
+    def __segment(self, idx):
+        with self._lock:
+            seg = self._segments.get(idx)
+            if seg is None:
+                pos = idx * self.segsize
+                size = min(self.segsize + self.overlap, self.fsize - pos)
+                seg = self.channel.map(FileChannel.MapMode.READ_ONLY, pos, size)
+                self._segments[idx] = seg
+            return seg
+
+    def __getrow(self, offset, dst, k, n):
+        idx = offset // self.segsize
+        b = self.__segment(idx).duplicate()
+        b.order(self._order)
+        b.position(offset - idx * self.segsize)
+        b.asFloatBuffer().get(dst, k, n)
+
+    def read(self, varname, dims, ranges):
+        '''
+        Read a hyperslab of a variable.
+
+        :param varname: (*string*) Variable name.
+        :param dims: (*list*) Dimensions of the variable - ordered as T, Z, Y, X.
+        :param ranges: (*list*) Range list of the dimensions.
+
+        :returns: (*Array*) Float data array, ``None`` if the variable dimensions are not
+            supported.
+        '''
+        rec = self.records.get(varname)
+        if rec is None:
+            return None
+        offset, tstride, zstride, nz = rec
+        order = [DimensionType.T, DimensionType.Z, DimensionType.Y, DimensionType.X]
+        rs = [None, None, None, None]
+        last = -1
+        shape = []
+        for dim, r in zip(dims, ranges):
+            dt = dim.getDimType()
+            if dt in order:
+                i = order.index(dt)
+                if i <= last:
+                    return None
+                rs[i] = r
+                last = i
+            elif r.length() > 1 or r.first() > 0:
+                return None
+            shape.append(r.length())
+        rt, rz, ry, rx = rs
+        if rz is None and nz > 1:
+            return None
+        if ry is None or rx is None:
+            return None
+
+        n = 1
+        for s in shape:
+            n *= s
+        dst = jarray.zeros(n, 'f')
+        nxr = rx.length()
+        span = rx.last() - rx.first() + 1
+        buf = None if rx.stride() == 1 else jarray.zeros(span, 'f')
+        rowbytes = self.nx * 4
+        tidx = [0] if rt is None else range(rt.first(), rt.last() + 1, rt.stride())
+        zidx = [0] if rz is None else range(rz.first(), rz.last() + 1, rz.stride())
+        yidx = range(ry.first(), ry.last() + 1, ry.stride())
+        k = 0
+        for t in tidx:
+            for z in zidx:
+                base = offset + t * tstride + z * zstride + rx.first() * 4
+                for y in yidx:
+                    if self.yrev:
+                        y = self.ny - 1 - y
+                    pos = base + y * rowbytes
+                    if buf is None:
+                        self.__getrow(pos, dst, k, nxr)
+                    else:
+                        self.__getrow(pos, buf, 0, span)
+                        for j in range(nxr):
+                            dst[k + j] = buf[j * rx.stride()]
+                    k += nxr
+        return Array.factory(DataType.FLOAT, shape, dst)
+
+    def close(self):
+        '''
+        Close the data file.
+        '''
+        self._segments = {}
+        self.channel.close()
+        self.raf.close()
+
+def _yreversed(ydim, ascending):
+    '''
+    Check if the Y dimension order of the dataset is reverse to the stored row order.
+    '''
+    yv = ydim.getDimValue()
+    if len(yv) < 2:
+        return False
+    return (yv[0] < yv[len(yv) - 1]) != ascending
+
+def _grids(dataset):
+    '''
+    Get variable dimensions of a dataset keyed by variable name.
+    '''
+    dinfo = dataset.getDataInfo()
+    r = {}
+    for vname in dinfo.getVariableNames():
+        r[vname] = list(dinfo.getVariable(vname).getDimensions())
+    return r
+
+def _finddim(dims, dimtype):
+    for dim in dims:
+        if dim.getDimType() == dimtype:
+            return dim
+    return None
+
+def mmap_grads(ctlfn, dataset):
+    '''
+    Create memory-mapped reader of GrADS binary data. Only direct access or sequential
+    float32 data without templates, PDEF, EDEF or ZREV options are supported.
+
+    :param ctlfn: (*string*) GrADS control file name.
+    :param dataset: (*MeteoDataInfo*) Opened dataset of the control file.
+
+    :returns: (*MMapReader*) Memory-mapped reader, ``None`` if not supported.
+    '''
+    dset = None
+    options = []
+    nums = {}
+    fileheader = theader = xyheader = 0
+    varlevs = []
+    f = open(ctlfn)
+    lines = f.readlines()
+    f.close()
+    i = 0
+    while i < len(lines):
+        items = lines[i].split()
+        i += 1
+        if len(items) == 0 or items[0].startswith('*'):
+            continue
+        key = items[0].upper()
+        if key == 'DSET':
+            dset = lines[i - 1].strip()[4:].strip()
+        elif key == 'OPTIONS':
+            options.extend([s.lower() for s in items[1:]])
+        elif key in ('XDEF', 'YDEF', 'ZDEF', 'TDEF'):
+            nums[key] = int(items[1])
+        elif key == 'FILEHEADER':
+            fileheader = int(items[1])
+        elif key == 'THEADER':
+            theader = int(items[1])
+        elif key == 'XYHEADER':
+            xyheader = int(items[1])
+        elif key in ('PDEF', 'EDEF', 'CHSUB', 'TRAILERBYTES', 'XYTRAILER'):
+            return None
+        elif key == 'VARS':
+            for j in range(int(items[1])):
+                vitems = lines[i].split()
+                i += 1
+                if len(vitems) < 3 or vitems[2].startswith('-'):
+                    return None
+                vname = vitems[0].split('=>')[-1]
+                varlevs.append((vname, max(1, int(vitems[1]))))
+    for opt in options:
+        if not opt in ('big_endian', 'little_endian', 'yrev', 'sequential', '365_day_calendar'):
+            return None
+    if dset is None or not 'XDEF' in nums or not 'YDEF' in nums or not 'TDEF' in nums:
+        return None
+    if dset.startswith('^'):
+        dset = os.path.join(os.path.dirname(os.path.abspath(ctlfn)), dset[1:])
+    if not os.path.isfile(dset):
+        return None
+
+    nx = nums['XDEF']
+    ny = nums['YDEF']
+    nt = nums['TDEF']
+    seq = 'sequential' in options
+    recsize = xyheader + nx * ny * 4
+    dataoff = xyheader
+    if seq:
+        recsize += 8
+        dataoff += 4
+    nrec = 0
+    for vname, nlev in varlevs:
+        nrec += nlev
+    tstride = theader + nrec * recsize
+    if os.path.getsize(dset) < fileheader + nt * tstride:
+        return None
+
+    grids = _grids(dataset)
+    for vname, nlev in varlevs:
+        dims = grids.get(vname)
+        if dims is None:
+            return None
+        xdim = _finddim(dims, DimensionType.X)
+        ydim = _finddim(dims, DimensionType.Y)
+        if xdim is None or ydim is None or xdim.getLength() != nx or ydim.getLength() != ny:
+            return None
+
+    byteorder = 'big_endian' if 'big_endian' in options else 'little_endian'
+    yrev = _yreversed(ydim, not 'yrev' in options)
+    reader = MMapReader(dset, nx, ny, byteorder, yrev)
+    cumrec = 0
+    for vname, nlev in varlevs:
+        offset = fileheader + theader + cumrec * recsize + dataoff
+        reader.addrecord(vname, offset, tstride, recsize, nlev)
+        cumrec += nlev
+    return reader
+
+def mmap_bil(fname, dataset):
+    '''
+    Create memory-mapped reader of BIL data. Only single band float32 data are supported.
+
+    :param fname: (*string*) BIL data file name.
+    :param dataset: (*MeteoDataInfo*) Opened dataset of the BIL file.
+
+    :returns: (*MMapReader*) Memory-mapped reader, ``None`` if not supported.
+    '''
+    hdrfn = os.path.splitext(fname)[0] + '.hdr'
+    if not os.path.isfile(hdrfn):
+        return None
+    hdr = {}
+    f = open(hdrfn)
+    for line in f:
+        items = line.split()
+        if len(items) >= 2:
+            hdr[items[0].upper()] = items[1].upper()
+    f.close()
+    if hdr.get('NBANDS', '1') != '1' or hdr.get('NBITS') != '32' or hdr.get('PIXELTYPE') != 'FLOAT':
+        return None
+    nx = int(hdr['NCOLS'])
+    ny = int(hdr['NROWS'])
+    skip = int(hdr.get('SKIPBYTES', '0'))
+    rowbytes = int(hdr.get('TOTALROWBYTES', str(nx * 4)))
+    if rowbytes != nx * 4 or os.path.getsize(fname) < skip + ny * rowbytes:
+        return None
+
+    grids = _grids(dataset)
+    if len(grids) != 1:
+        return None
+    vname, dims = grids.items()[0]
+    xdim = _finddim(dims, DimensionType.X)
+    ydim = _finddim(dims, DimensionType.Y)
+    if xdim is None or ydim is None or xdim.getLength() != nx or ydim.getLength() != ny:
+        return None
+
+    byteorder = 'big_endian' if hdr.get('BYTEORDER', 'I') == 'M' else 'little_endian'
+    #BIL rows are stored from north to south
+    yrev = _yreversed(ydim, False)
+    reader = MMapReader(fname, nx, ny, byteorder, yrev)
+    reader.addrecord(vname, skip, 0, 0, 1)
+    return reader
\ No newline at end of file
@@ -7,6 +7,8 @@
 
 import os
 import numbers
+import threading
+from collections import OrderedDict
 
 from org.meteoinfo.data.mapdata.geotiff import GeoTiff
 from org.meteoinfo.shape import ShapeUtil, PolygonShape
@@ -24,14 +26,40 @@ from mipylib.numeric.miarray import MIArray
 from mipylib.numeric.dimarray import DimArray
 import mipylib.migl as migl
 import mipylib.numeric.minum as minum
+import mipylib.numeric.rasterize as rasterize
+import mipylib.miutil as miutil
 
 from java.util import ArrayList
+from ucar.ma2 import Array
 
 __all__ = [
     'arrayinpolygon','circle','convert_encoding_dbf','distance','georead','geotiffread',
     'maplayer','inpolygon','maskin','maskout','polyarea','polygon','rmaskin','rmaskout','shaperead',
     'projinfo','project','projectxy'
     ]
+    
+# Maximum number of cached projections created from proj4 strings
+projcache_size = 64
+# Point number from which project transforms coordinates in a thread pool
+project_chunk = 100000
+
+__projcache = OrderedDict()
+__projlock = threading.Lock()
+
+def __projfactory(projstr):
+    '''
+    Get a projection created from a proj4 string through the LRU projection cache. The cached
+    objects are shared, so they are only used internally (e.g. ``project`` with proj4 strings)
+    and never handed to callers, which may change them (e.g. ``setCutoff`` of map axes).
+    '''
+    with __projlock:
+        proj = __projcache.pop(projstr, None)
+        if proj is None:
+            proj = ProjectionInfo.factory(projstr)
+        __projcache[projstr] = proj
+        while len(__projcache) > projcache_size:
+            __projcache.popitem(last=False)
+    return proj
 
 def shaperead(fn, encoding=None):   
     '''
@@ -300,7 +328,13 @@ def maskout(data, mask, x=None, y=None):
 
     if not isinstance(mask, (list, ArrayList)):
         mask = [mask]
-    r = ArrayMath.maskout(data.array, x.array, y.array, mask)
+    if x.ndim == 1 and y.ndim == 1 and data.ndim >= 2 and \
+        tuple(data.shape[-2:]) == (len(y), len(x)):
+        #Rasterized polygon mask (cached) multiplied with each (y, x) slice
+        factor = rasterize.maskfactor(x, y, mask, True)
+        r = miutil.pslab(lambda s: ArrayMath.mul(s, factor), data.asarray(), 2)
+    else:
+        r = ArrayMath.maskout(data.array, x.array, y.array, mask)
     if isinstance(data, DimArray):
         return DimArray(r, data.dims, data.fill_value, data.proj)
     else:
@@ -351,7 +385,13 @@ def maskin(data, mask, x=None, y=None):
 
     if not isinstance(mask, (list, ArrayList)):
         mask = [mask]
-    r = ArrayMath.maskin(data.array, x.array, y.array, mask)
+    if x.ndim == 1 and y.ndim == 1 and data.ndim >= 2 and \
+        tuple(data.shape[-2:]) == (len(y), len(x)):
+        #Rasterized polygon mask (cached) multiplied with each (y, x) slice
+        factor = rasterize.maskfactor(x, y, mask, False)
+        r = miutil.pslab(lambda s: ArrayMath.mul(s, factor), data.asarray(), 2)
+    else:
+        r = ArrayMath.maskin(data.array, x.array, y.array, mask)
     if isinstance(data, DimArray):
         return DimArray(r, data.dims, data.fill_value, data.proj)
     else:
@@ -431,29 +471,59 @@ def projinfo(proj4string=None, proj='longlat', **kwargs):
     if not h is None:
         projstr = projstr + ' +h=' + str(h)
         
-    return ProjectionInfo.factory(projstr) 
+    return ProjectionInfo.factory(projstr)
 
-def project(x, y, fromproj=KnownCoordinateSystems.geographic.world.WGS1984, toproj=KnownCoordinateSystems.geographic.world.WGS1984):
+def __reproject(x, y, fromproj, toproj, nthread=None):
+    '''
+    Bulk transform of coordinate arrays. Large arrays are split into chunks transformed
+    in a thread pool.
+    '''
+    n = int(x.getSize())
+    if n < project_chunk * 2 or nthread == 1:
+        return ArrayUtil.reproject(x, y, fromproj, toproj)
+    shape = x.getShape()
+    x = x.reshape([n])
+    y = y.reshape([n])
+    def chunk(i0, i1):
+        xc = x.section([i0], [i1 - i0]).copy()
+        yc = y.section([i0], [i1 - i0]).copy()
+        return ArrayUtil.reproject(xc, yc, fromproj, toproj)
+    rs = miutil.pmap(chunk, [(i, min(i + project_chunk, n)) for i in range(0, n, project_chunk)], \
+        nthread)
+    rx = Array.factory(rs[0][0].getDataType(), [n])
+    ry = Array.factory(rs[0][1].getDataType(), [n])
+    i = 0
+    for r in rs:
+        m = int(r[0].getSize())
+        Array.arraycopy(r[0], 0, rx, i, m)
+        Array.arraycopy(r[1], 0, ry, i, m)
+        i += m
+    return rx.reshape(shape), ry.reshape(shape)
+    
+def project(x, y, fromproj=KnownCoordinateSystems.geographic.world.WGS1984, toproj=KnownCoordinateSystems.geographic.world.WGS1984, \
+    nthread=None):
     """
     Project geographic coordinates from one projection to another.
     
     :param x: (*array_like*) X coordinate values for projection.
     :param y: (*array_like*) Y coordinate values for projection.
-    :param fromproj: (*ProjectionInfo*) From projection. Default is longlat projection.
-    :param toproj: (*ProjectionInfo*) To projection. Default is longlat projection.
+    :param fromproj: (*ProjectionInfo or string*) From projection. Default is longlat projection.
+    :param toproj: (*ProjectionInfo or string*) To projection. Default is longlat projection.
+    :param nthread: (*int*) Thread number to transform large coordinate arrays in chunks. Default is
+        ``None``, means the processor number.
     
     :returns: (*array_like*, *array_like*) Projected geographic coordinates.
     """
-    if isinstance(fromproj, str):
-        fromproj = ProjectionInfo.factory(fromproj)
-    if isinstance(toproj, str):
-        toproj = ProjectionInfo.factory(toproj)
+    if isinstance(fromproj, basestring):
+        fromproj = __projfactory(fromproj)
+    if isinstance(toproj, basestring):
+        toproj = __projfactory(toproj)
     if isinstance(x, (tuple, list)):
-        x = array(x)
+        x = minum.array(x)
     if isinstance(y, (tuple, list)):
-        y = array(y)
+        y = minum.array(y)
     if isinstance(x, MIArray):
-        outxy = ArrayUtil.reproject(x.asarray(), y.asarray(), fromproj, toproj)
+        outxy = __reproject(x.asarray(), y.asarray(), fromproj, toproj, nthread)
         return MIArray(outxy[0]), MIArray(outxy[1])
     else:
         inpt = PointD(x, y)
@@ -10,6 +10,7 @@ from org.meteoinfo.shape import Graphic
 from org.meteoinfo.image import ImageUtil
 from mipylib.geolib.milayer import MILayer
 from mipylib.numeric.miarray import MIArray
+import mipylib.numeric.filters as nfilters
 from org.meteoinfo.image.filter import ContrastFilter, SharpenFilter, RGBAdjustFilter, ChannelMixFilter, \
     GainFilter, GammaFilter, GrayFilter, GrayscaleFilter, HSBAdjustFilter, InvertAlphaFilter, \
     InvertFilter, LevelsFilter, MaskFilter, PosterizeFilter, RescaleFilter, SolarizeFilter, \
@@ -547,27 +548,37 @@ def opacity(src, opacity=None):
     filter.filter(image, dst)
     return __getreturn(src, dst)
     
-def count(a, size):
+def count(a, size, running=False):
     '''
     Count none-zero points with window size
     
     :param a: (*array_like*) 2-D array.
     :param size: (*int*) Window size.
+    :param running: (*boolean*) Use running sums, the cost does not depend on the window size.
+        NaN values and the edges may be handled differently from ``ImageUtil``. Default is
+        ``False``.
     
     :returns: (*array_like*) Count result.
     '''
+    if running:
+        return nfilters.window_count(a, size)
     r = ImageUtil.count(a.asarray(), size)
     return MIArray(r)
     
-def mean(a, size, positive=True):
+def mean(a, size, positive=True, running=False):
     '''
     Calculate mean value with window size
     
     :param a: (*array_like*) 2-D array.
     :param size: (*int*) Window size.
     :param positive: (*boolean*) Only calculate the positive value or not.
+    :param running: (*boolean*) Use running sums, the cost does not depend on the window size.
+        NaN values and the edges may be handled differently from ``ImageUtil``. Default is
+        ``False``.
     
     :returns: (*array_like*) Mean result.
     '''
+    if running:
+        return nfilters.window_mean(a, size, positive)
     r = ImageUtil.mean(a.asarray(), size, positive)
     return MIArray(r)
\ No newline at end of file
@@ -7,9 +7,14 @@
 
 from org.meteoinfo.data import ArrayMath
 from org.meteoinfo.math.meteo import MeteoMath
+from ucar.ma2 import Array, DataType
+from java.lang import System, Double
+import jarray
 import mipylib.numeric as np
 from mipylib.numeric.miarray import MIArray
 from mipylib.numeric.dimarray import DimArray
+import mipylib.miutil as miutil
+import mipylib.numeric.linalg.truncated as truncated
 import constants as constants
 
 __all__ = [
@@ -613,7 +618,42 @@ def temperature_from_potential_temperature(pressure, theta):
     """
     return theta * exner_function(pressure)
     
-def eof(x, svd=False, transform=False):
+def _eof_truncated(x, neofs, method, seed, nthread):
+    '''
+    EOF analysis of the leading modes with a truncated SVD.
+    '''
+    m, n = x.shape
+    vals = miutil.todouble(x)
+    valid_idx = []
+    for i in range(m):
+        for j in range(i * n, (i + 1) * n):
+            if vals[j] != vals[j]:
+                break
+        else:
+            valid_idx.append(i)
+    mv = len(valid_idx)
+    if mv < m:
+        xv = jarray.zeros(mv * n, 'd')
+        for k, i in enumerate(valid_idx):
+            System.arraycopy(vals, i * n, xv, k * n, n)
+    else:
+        xv = vals
+    xv = Array.factory(DataType.DOUBLE, [mv, n], xv)
+    U, s, VS = truncated._svds(xv, neofs, method, seed=seed, nthread=nthread)
+    k = len(s)
+    E = np.array(s)**2 / n
+    PC = MIArray(VS.transpose(0, 1).copy())
+    if mv < m:
+        u = miutil.todouble(U)
+        r = jarray.array([Double.NaN] * (m * k), 'd')
+        for kk, i in enumerate(valid_idx):
+            System.arraycopy(u, kk * k, r, i * k, k)
+        EOF = MIArray(Array.factory(DataType.DOUBLE, [m, k], r))
+    else:
+        EOF = MIArray(U)
+    return EOF, E, PC
+
+def eof(x, svd=False, transform=False, neofs=None, method=None, seed=None, nthread=None):
     '''
     Empirical Orthogonal Function (EOF) analysis to finds both time series and spatial patterns.
     
@@ -622,10 +662,26 @@ def eof(x, svd=False, transform=False):
     :param transform: (*boolean*) Do space-time transform or not. This transform will speed up
         the computation if the space location number is much more than time stamps. Only valid
         when ``svd=False``.
+    :param neofs: (*int*) Number of leading EOFs. Default is ``None``, means all EOFs by the full
+        decomposition. If set, only the leading modes are computed by a truncated solver without
+        forming the covariance matrix.
+    :param method: (*string*) Truncated solver [randomized | lanczos]. Default is ``None``, means
+        ``randomized`` if ``neofs`` is set.
+    :param seed: (*int*) Random seed of the truncated solvers. Default is ``None``.
+    :param nthread: (*int*) Thread number of the matrix products of the truncated solvers. Default
+        is ``None``, means the processor number.
         
     :returns: (EOF, E, PC) EOF: eigen vector 2-D array; E: eigen values 1-D array;
-        PC: Principle component 2-D array.
+        PC: Principle component 2-D array. With ``neofs``, EOF has shape (space, neofs), E has
+        shape (neofs,) and PC has shape (neofs, time). Rows of EOF with NaN values are NaN.
     '''
+    if not neofs is None or not method is None:
+        if neofs is None:
+            neofs = 10
+        if method is None:
+            method = 'randomized'
+        return _eof_truncated(x, neofs, method, seed, nthread)
+        
     has_nan = False
     if x.contains_nan():       #Has NaN value
         valid_idx = np.where(x[:,0]!=np.nan)[0]
@@ -645,7 +701,7 @@ def eof(x, svd=False, transform=False):
         E = S**2 / n
     else:
         if transform:        
-            C = np.dot(xx.T, xx)
+            C = np.dot(xx, xx, transa=True)
             E1, EOF1 = np.linalg.eig(C)
             EOF1 = EOF1[:,::-1]
             E = E1[::-1]
@@ -653,11 +709,11 @@ def eof(x, svd=False, transform=False):
             EOF = np.zeros((m,n))
             for i in range(n):
                 EOF[:,i] = EOFa[:,i]/np.sqrt(abs(E[i]))
-            PC = np.dot(EOF.T, xx)
+            PC = np.dot(EOF, xx, transa=True)
         else:
-            C = np.dot(xx, xx.T) / n
+            C = np.dot(xx, xx, transb=True) / n
             E, EOF = np.linalg.eig(C)
-            PC = np.dot(EOF.T, xx)
+            PC = np.dot(EOF, xx, transa=True)
             EOF = EOF[:,::-1]
             PC = PC[::-1,:]
             E = E[::-1]
@@ -688,7 +744,7 @@ def varimax(x, normalize=False, tol=1e-10, it_max=1000):
     d = 0
     for i in range(it_max):
         z = np.dot(x, TT)
-        B = np.dot(x.T, (z**3 - np.dot(z, np.diag(np.squeeze(np.dot(np.ones((1,p)), (z**2))))) / p))
+        B = np.dot(x, (z**3 - np.dot(z, np.diag(np.squeeze(np.dot(np.ones((1,p)), (z**2))))) / p), transa=True)
         U, S, Vh = np.linalg.svd(B)
         TT = np.dot(U, Vh)        
         d2 = d;
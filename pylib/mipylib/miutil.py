@@ -10,10 +10,15 @@ from org.meteoinfo.global.util import DateUtil
 from org.meteoinfo.math import Complex
 from org.meteoinfo.shape import PointShape, ShapeUtil
 from java.util import Calendar, Locale
+from java.util.concurrent import Callable, Executors
+from java.lang import Runtime
 from java.text import SimpleDateFormat
 from java.awt import Color
+from ucar.ma2 import Array, DataType, MAMath
 from org.joda.time import DateTime
 import datetime
+import sys
+import threading
 
 def pydate(t):    
     """
@@ -317,4 +322,122 @@ def getcolor(style, alpha=None):
         alpha = (int)(alpha * 255)
         c = Color(c.getRed(), c.getGreen(), c.getBlue(), alpha)
     
-    return c    
\ No newline at end of file
+    return c    
+    
+def cpu_count():
+    '''
+    Get the number of processors available to the Java virtual machine.
+    
+    :returns: (*int*) Processor number.
+    '''
+    return Runtime.getRuntime().availableProcessors()
+    
+def todouble(a):
+    '''
+    Get the values of an array as a Java double array.
+    
+    :param a: (*array_like*) The array.
+    
+    :returns: (*double[]*) The flattened double values.
+    '''
+    from mipylib.numeric.miarray import MIArray
+    if isinstance(a, MIArray):
+        a = a.asarray()
+    elif not isinstance(a, Array):
+        a = MIArray(a).asarray()
+    if a.getDataType() != DataType.DOUBLE:
+        b = Array.factory(DataType.DOUBLE, a.getShape())
+        MAMath.copyDouble(b, a)
+        a = b
+    return a.copyTo1DJavaArray()
+    
+# Flag of the pool worker threads, nested pmap calls in a worker run serially
+_worker = threading.local()
+
+class _PTask(Callable):
+    
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.error = None
+        
+    def call(self):
+        _worker.active = True
+        try:
+            return self.func(*self.args)
+        except:
+            self.error = sys.exc_info()
+            return None
+        finally:
+            _worker.active = False
+    
+def pmap(func, args, nthread=None):
+    '''
+    Apply a function to each argument tuple using a thread pool.
+    
+    The results are returned in the order of ``args``, so the output does not depend on
+    thread scheduling. Called from a pool worker (e.g. a library function parallelized inside
+    ``pslab``), the function is applied in the calling thread, so nested calls do not
+    multiply the threads.
+    
+    :param func: (*function*) The function to be applied.
+    :param args: (*list*) Argument tuples - one function call for each tuple.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    
+    :returns: (*list*) Function results.
+    '''
+    n = len(args)
+    if getattr(_worker, 'active', False):
+        nthread = 1
+    elif nthread is None:
+        nthread = cpu_count()
+    nthread = min(nthread, n)
+    if nthread <= 1:
+        return [func(*a) for a in args]
+        
+    tasks = [_PTask(func, a) for a in args]
+    pool = Executors.newFixedThreadPool(nthread)
+    try:
+        futures = pool.invokeAll(tasks)
+        r = [f.get() for f in futures]
+    finally:
+        pool.shutdown()
+    for task in tasks:
+        if not task.error is None:
+            raise task.error[0], task.error[1], task.error[2]
+    return r
+    
+def pslab(func, a, nd=2, nthread=None):
+    '''
+    Apply a function to the trailing dimension slabs of an array using a thread pool.
+    
+    The array is split over the leading dimensions, each slab is processed by ``func`` and
+    the results are put back in the order of the leading dimensions. Parallel functions
+    (``pmap``) called by ``func`` run serially in the slab threads.
+    
+    :param func: (*function*) The function to be applied, it takes a slab array and returns
+        a result array with the same shape for all slabs.
+    :param a: (*Array*) The array.
+    :param nd: (*int*) Number of the trailing dimensions of a slab. Default is ``2``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    
+    :returns: (*Array*) Result array with the leading dimensions of ``a`` and the result slab
+        dimensions.
+    '''
+    shape = list(a.getShape())
+    if len(shape) <= nd:
+        return func(a)
+    lead = shape[:len(shape) - nd]
+    sshape = [1] * len(lead) + shape[len(shape) - nd:]
+    origins = [[]]
+    for n in lead:
+        origins = [o + [i] for o in origins for i in range(n)]
+    def slab(origin):
+        s = a.section(origin + [0] * nd, sshape).copy()
+        return func(s.reshape(shape[len(shape) - nd:]))
+    rs = pmap(slab, [(o,) for o in origins], nthread)
+    n = int(rs[0].getSize())
+    r = Array.factory(rs[0].getDataType(), lead + list(rs[0].getShape()))
+    for i in range(len(rs)):
+        Array.arraycopy(rs[i], 0, r, i * n, n)
+    return r
\ No newline at end of file
@@ -11,6 +11,8 @@ from org.meteoinfo.geoprocess.analysis import ResampleMethods
 from org.meteoinfo.global import PointD
 from ucar.ma2 import Array, Range, MAMath, DataType
 from miarray import MIArray
+from gridinterp import interpn_points
+import projplan
 import math
 import datetime
 import mipylib.miutil as miutil
@@ -19,6 +21,25 @@ from java.util import ArrayList
 
 nan = Double.NaN
 
+def unpack_array(a, scale_factor=1, add_offset=0, fill_value=None):
+    '''
+    Decode a packed integer array: unpack values with ``scale_factor`` and ``add_offset``
+    and set missing values (``fill_value`` in packed units) as NaN. The unpacking is one
+    pass into a new double array and the missing values are replaced in that array in place.
+    
+    :param a: (*Array*) Packed array.
+    :param scale_factor: (*float*) Scale factor.
+    :param add_offset: (*float*) Add offset.
+    :param fill_value: (*float*) Fill value in packed units. Default is ``None``.
+    
+    :returns: (*Array*) Unpacked double array.
+    '''
+    a.resetLocalIterator()
+    r = MAMath.convert2Unpacked(a, MAMath.ScaleOffset(scale_factor, add_offset))
+    if not fill_value is None and not math.isnan(fill_value):
+        ArrayMath.missingToNaN(r, fill_value * scale_factor + add_offset)
+    return r
+
 # Dimension array
 class DimArray(MIArray):
     
@@ -973,17 +994,21 @@ class DimArray(MIArray):
         
         return r
         
-    def interpn(self, xi):
+    def interpn(self, xi, nthread=None):
         """
         Multidimensional interpolation on regular grids.
 
-        :param xi: (*list*) The coordinates to sample the gridded data at.
+        :param xi: (*list*) The coordinates to sample the gridded data at. An array with shape
+            (npoints, ndim) is interpolated point by point in parallel.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
         
         :returns: (*float*) Interpolated value at input coordinates.
         """
         points = []
         for i in range(self.ndim):
             points.append(ArrayUtil.array(self.dims[i].getDimValue()))
+        if isinstance(xi, MIArray) and xi.ndim == 2 and xi.shape[1] == self.ndim:
+            return MIArray(interpn_points(points, self.array, xi, nthread))
         if isinstance(xi, (list, tuple)):
             if isinstance(xi[0], MIArray):
                 nxi = []
@@ -997,7 +1022,7 @@ class DimArray(MIArray):
                     nxi.append(x)
                 nxi = MIArray(nxi).array
         else:
-            nxi = nxi.array
+            nxi = xi.array
         r = ArrayUtil.interpn(points, self.array, nxi)
         if isinstance(r, Array):
             return MIArray(r)
@@ -1012,7 +1037,8 @@ class DimArray(MIArray):
         else:
             return gdata.data.toStation(x, y)
             
-    def project(self, x=None, y=None, toproj=None, method='bilinear'):
+    def project(self, x=None, y=None, toproj=None, method='bilinear', nthread=None, plan=False, \
+        cachedir=None):
         """
         Project array
         
@@ -1020,6 +1046,13 @@ class DimArray(MIArray):
         :param y: To y coordinates.
         :param toproj: To projection.
         :param method: Interpolation method: ``bilinear`` or ``neareast`` .
+        :param nthread: (*int*) Thread number to project the 2-D slabs of the leading dimensions in
+            parallel. Default is ``None``, means the processor number.
+        :param plan: (*boolean*) Use a cached reprojection plan (source indices and weights of the target
+            cells) for the same source and target coordinates and projections. All leading dimension
+            slabs are projected through the plan in one call. Default is ``False``, means
+            ``ArrayUtil.reproject`` per slab.
+        :param cachedir: (*string*) Directory to persist reprojection plans. Default is ``None``.
         
         :returns: (*MIArray*) Projected array
         """
@@ -1029,10 +1062,15 @@ class DimArray(MIArray):
             toproj = self.proj
         
         if x is None or y is None:
-            pr = ArrayUtil.reproject(self.array, xx, yy, self.proj, toproj)
-            r = pr[0]
-            x = pr[1]
-            y = pr[2]
+            pxy = {}
+            def func(s):
+                pr = ArrayUtil.reproject(s, xx, yy, self.proj, toproj)
+                pxy['x'] = pr[1]
+                pxy['y'] = pr[2]
+                return pr[0]
+            r = miutil.pslab(func, self.array, 2, nthread)
+            x = pxy['x']
+            y = pxy['y']
             dims = self.dims
             ydim = Dimension(DimensionType.Y)
             ydim.setDimValues(MIArray(y).aslist())
@@ -1043,20 +1081,22 @@ class DimArray(MIArray):
             rr = DimArray(MIArray(r), dims, self.fill_value, toproj)
             return rr
         
+        if plan:
+            w = projplan.reproject_plan(xx, yy, x, y, self.proj, toproj, method, cachedir)
+            return w.apply(self.array, nthread, self.fill_value)
+            
         if method == 'bilinear':
             method = ResampleMethods.Bilinear
         else:
             method = ResampleMethods.NearestNeighbor
         if isinstance(x, list):
-            r = ArrayUtil.reproject(self.array, xx, yy, x, y, self.proj, toproj, self.fill_value, method)
-        elif isinstance(x, MIArray):
-            if x.ndim == 1:
-                r = ArrayUtil.reproject(self.array, xx, yy, x.aslist(), y.aslist(), self.proj, toproj, self.fill_value, method)
-            else:
-                r = ArrayUtil.reproject(self.array, xx, yy, x.asarray(), y.asarray(), self.proj, toproj, self.fill_value, method)
+            xa, ya = x, y
+        elif isinstance(x, MIArray) and x.ndim == 1:
+            xa, ya = x.aslist(), y.aslist()
         else:
-            r = ArrayUtil.reproject(self.array, xx, yy, x.asarray(), y.asarray(), self.proj, toproj, self.fill_value, method)
-        #r = ArrayUtil.reproject(self.array, xx, yy, x.asarray(), y.asarray(), self.proj, toproj, self.fill_value, method)
+            xa, ya = x.asarray(), y.asarray()
+        r = miutil.pslab(lambda s: ArrayUtil.reproject(s, xx, yy, xa, ya, self.proj, toproj, \
+            self.fill_value, method), self.array, 2, nthread)
         return MIArray(r)
             
     def join(self, b, dimidx):
@@ -1128,6 +1168,66 @@ class DimArray(MIArray):
                 else:
                     gdata.saveAsMICAPS4File(fname, desc, date, hours, level, smooth, boldvalue, float_format, proj)
     
+
+# Dimension array keeping packed integer data - unpacked when the values are used
+class PackedDimArray(DimArray):
+    
+    # packed must be a ucar.ma2.Array object of integer data type
+    def __init__(self, packed, dims=None, fill_value=-9999.0, proj=None, scale_factor=1, \
+        add_offset=0, packed_fill=None):
+        if isinstance(packed, MIArray):
+            packed = packed.array
+        self.packed = packed
+        self._unpacked = None
+        self.scale_factor = scale_factor
+        self.add_offset = add_offset
+        self.packed_fill = packed_fill
+        super(PackedDimArray, self).__init__(packed, dims, fill_value, proj)
+        self.dtype = DataType.DOUBLE
+        
+    def get_array(self):
+        if self._unpacked is None:
+            self._unpacked = unpack_array(self.packed, self.scale_factor, self.add_offset, \
+                self.packed_fill)
+            self.packed = None
+        return self._unpacked
+        
+    def set_array(self, value):
+        if self._unpacked is None and value is self.packed:
+            return
+        self._unpacked = value
+        self.packed = None
+        
+    array = property(get_array, set_array)
+    
+    def ispacked(self):
+        '''
+        Check if the data is still kept packed.
+        
+        :returns: (*boolean*) Packed or not.
+        '''
+        return not self.packed is None
+        
+    def __getitem__(self, indices):
+        if self.packed is None:
+            return super(PackedDimArray, self).__getitem__(indices)
+            
+        r = DimArray(self.packed, self.dims, self.fill_value, self.proj).__getitem__(indices)
+        if isinstance(r, DimArray):
+            return PackedDimArray(r.array, r.dims, r.fill_value, r.proj, self.scale_factor, \
+                self.add_offset, self.packed_fill)
+        elif r == self.packed_fill:
+            return nan
+        else:
+            return r * self.scale_factor + self.add_offset
+            
+    def unpack(self):
+        '''
+        Get unpacked data.
+        
+        :returns: (*DimArray*) Unpacked data array.
+        '''
+        return DimArray(self.array, self.dims, self.fill_value, self.proj)
        
 # The encapsulate class of GridData
 class PyGridData():
@@ -0,0 +1,524 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Moving window filters with running sums and monotone deques
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+import bisect
+from collections import deque
+
+from ucar.ma2 import Array, DataType
+from java.lang import Double
+import jarray
+
+from miarray import MIArray
+from dimarray import DimArray
+import mipylib.miutil as miutil
+
+inf = Double.POSITIVE_INFINITY
+nan = Double.NaN
+
+__all__ = ['uniform_filter','moving_sum','moving_std','moving_min','moving_max','rolling','Rolling']
+
+def _lines(shape, axis):
+    '''
+    Get the start positions, length and stride of the lines of an axis in a flat array.
+    '''
+    n = shape[axis]
+    inner = 1
+    for s in shape[axis + 1:]:
+        inner *= s
+    outer = 1
+    for s in shape[:axis]:
+        outer *= s
+    starts = [o * n * inner + i for o in range(outer) for i in range(inner)]
+    return starts, n, inner
+
+def _perlines(func, shape, axis, nthread):
+    '''
+    Apply ``func(starts, n, stride)`` to chunks of the lines of an axis in parallel.
+    '''
+    starts, n, stride = _lines(shape, axis)
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    m = len(starts)
+    nchunk = max(1, min(m, nthread * 4))
+    step = max(1, (m + nchunk - 1) // nchunk)
+    miutil.pmap(lambda i0, i1: func(starts[i0:i1], n, stride), \
+        [(i, min(i + step, m)) for i in range(0, m, step)], nthread)
+
+def _boxsum(buf, shape, axis, h1, h2, nthread):
+    '''
+    Replace each element by the sum of the window ``[i - h1, i + h2]`` along an axis (in
+    place). The window is truncated at the boundaries.
+    '''
+    def func(starts, n, st):
+        c = [0.0] * (n + 1)
+        for s0 in starts:
+            acc = 0.0
+            k = s0
+            for j in range(n):
+                acc += buf[k]
+                c[j + 1] = acc
+                k += st
+            k = s0
+            for j in range(n):
+                buf[k] = c[min(n, j + h2 + 1)] - c[max(0, j - h1)]
+                k += st
+    _perlines(func, shape, axis, nthread)
+
+def _boxext(buf, shape, axis, h1, h2, ismax, nthread):
+    '''
+    Replace each element by the minimum or maximum of the window ``[i - h1, i + h2]`` along
+    an axis (in place) using a monotone deque. NaN values must be replaced beforehand.
+    '''
+    def func(starts, n, st):
+        for s0 in starts:
+            vals = [buf[s0 + j * st] for j in range(n)]
+            dq = deque()
+            k = 0
+            for j in range(n):
+                hi = min(n - 1, j + h2)
+                while k <= hi:
+                    v = vals[k]
+                    if ismax:
+                        while dq and vals[dq[-1]] <= v:
+                            dq.pop()
+                    else:
+                        while dq and vals[dq[-1]] >= v:
+                            dq.pop()
+                    dq.append(k)
+                    k += 1
+                lo = j - h1
+                while dq[0] < lo:
+                    dq.popleft()
+                buf[s0 + j * st] = vals[dq[0]]
+    _perlines(func, shape, axis, nthread)
+
+def _windows(size, axes, ndim, offsets=None):
+    '''
+    Get the axes and (h1, h2) window offsets of a moving window.
+    '''
+    if axes is None:
+        axes = range(ndim)
+    elif isinstance(axes, int):
+        axes = [axes]
+    axes = [ax + ndim if ax < 0 else ax for ax in axes]
+    if isinstance(size, int):
+        size = [size] * len(axes)
+    if offsets is None:
+        offsets = [(w // 2, w - 1 - w // 2) for w in size]
+    return axes, offsets
+
+def _moving(a, stat, axes, offsets, nan_policy='propagate', min_count=1, ddof=0, \
+    nthread=None):
+    '''
+    Moving window statistic of an array.
+
+    :param a: (*array_like*) Input array.
+    :param stat: (*string*) Statistic: sum, mean, var, std, min or max.
+    :param axes: (*list*) Axes of the window.
+    :param offsets: (*list*) (h1, h2) offsets of each axis, the window of index ``i`` is
+        ``[i - h1, i + h2]``.
+    :param nan_policy: (*string*) ``propagate``: the result is NaN if the window contains NaN;
+        ``omit``: NaN values are skipped.
+    :param min_count: (*int*) Minimum number of valid values in the window.
+    :param ddof: (*int*) Delta degrees of freedom of var and std.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Result double array.
+    '''
+    if isinstance(a, MIArray):
+        shape = list(a.shape)
+    elif isinstance(a, Array):
+        shape = list(a.getShape())
+    else:
+        a = MIArray(a)
+        shape = list(a.shape)
+    src = miutil.todouble(a)
+    n = len(src)
+    #Valid and NaN value counts of the windows
+    cnt = jarray.zeros(n, 'd')
+    for i in range(n):
+        cnt[i] = 1.0 if src[i] == src[i] else 0.0
+    nanc = None
+    if nan_policy == 'propagate':
+        nanc = jarray.zeros(n, 'd')
+        for i in range(n):
+            nanc[i] = 1.0 - cnt[i]
+    for ax, (h1, h2) in zip(axes, offsets):
+        _boxsum(cnt, shape, ax, h1, h2, nthread)
+        if not nanc is None:
+            _boxsum(nanc, shape, ax, h1, h2, nthread)
+
+    if stat in ['min', 'max']:
+        ismax = stat == 'max'
+        fill = -inf if ismax else inf
+        r = jarray.zeros(n, 'd')
+        for i in range(n):
+            r[i] = src[i] if src[i] == src[i] else fill
+        for ax, (h1, h2) in zip(axes, offsets):
+            _boxext(r, shape, ax, h1, h2, ismax, nthread)
+    else:
+        s = jarray.zeros(n, 'd')
+        for i in range(n):
+            s[i] = src[i] if src[i] == src[i] else 0.0
+        s2 = None
+        if stat in ['var', 'std']:
+            #Remove the global mean to reduce cancellation in the sum of squares
+            c = 0.0
+            nc = 0
+            for i in range(n):
+                if src[i] == src[i]:
+                    c += src[i]
+                    nc += 1
+            c = c / nc if nc > 0 else 0.0
+            s2 = jarray.zeros(n, 'd')
+            for i in range(n):
+                if src[i] == src[i]:
+                    s[i] = src[i] - c
+                    s2[i] = s[i] * s[i]
+        for ax, (h1, h2) in zip(axes, offsets):
+            _boxsum(s, shape, ax, h1, h2, nthread)
+            if not s2 is None:
+                _boxsum(s2, shape, ax, h1, h2, nthread)
+        r = s
+        for i in range(n):
+            m = cnt[i]
+            if stat == 'mean':
+                r[i] = s[i] / m if m > 0 else nan
+            elif not s2 is None:
+                if m - ddof > 0:
+                    v = max(0.0, (s2[i] - s[i] * s[i] / m) / (m - ddof))
+                    r[i] = math.sqrt(v) if stat == 'std' else v
+                else:
+                    r[i] = nan
+
+    #Invalid windows
+    for i in range(n):
+        m = cnt[i]
+        if m < min_count or m == 0 or (not nanc is None and nanc[i] > 0.5):
+            r[i] = nan
+    return Array.factory(DataType.DOUBLE, shape, r)
+
+def _movquantile(a, q, axis, h1, h2, min_count=1, nthread=None):
+    '''
+    Moving window quantile along an axis. Each line keeps the valid values of the window in
+    a sorted list updated by bisection as the window slides. NaN values are skipped.
+
+    :param a: (*array_like*) Input array.
+    :param q: (*float*) Quantile between 0 and 1, linearly interpolated.
+    :param axis: (*int*) Axis of the window.
+    :param h1: (*int*) Offset before, the window of index ``i`` is ``[i - h1, i + h2]``.
+    :param h2: (*int*) Offset after.
+    :param min_count: (*int*) Minimum number of valid values in the window.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Result double array.
+    '''
+    if isinstance(a, MIArray):
+        shape = list(a.shape)
+    else:
+        shape = list(a.getShape())
+    src = miutil.todouble(a)
+    r = jarray.zeros(len(src), 'd')
+    min_count = max(1, min_count)
+
+    def func(starts, n, st):
+        for s0 in starts:
+            vals = [src[s0 + j * st] for j in range(n)]
+            win = []
+            k = 0
+            for j in range(n):
+                hi = min(n - 1, j + h2)
+                while k <= hi:
+                    v = vals[k]
+                    if v == v:
+                        bisect.insort(win, v)
+                    k += 1
+                lo = j - h1 - 1
+                if lo >= 0:
+                    v = vals[lo]
+                    if v == v:
+                        del win[bisect.bisect_left(win, v)]
+                m = len(win)
+                if m < min_count:
+                    r[s0 + j * st] = nan
+                else:
+                    pos = q * (m - 1)
+                    i = int(pos)
+                    if i >= m - 1:
+                        r[s0 + j * st] = win[m - 1]
+                    else:
+                        f = pos - i
+                        r[s0 + j * st] = win[i] + (win[i + 1] - win[i]) * f
+    _perlines(func, shape, axis, nthread)
+    return Array.factory(DataType.DOUBLE, shape, r)
+
+def _wrap(a, r):
+    if isinstance(a, DimArray):
+        return DimArray(MIArray(r), a.dims, a.fill_value, a.proj)
+    return MIArray(r)
+
+def uniform_filter(a, size, axes=None, nan_policy='propagate', nthread=None):
+    '''
+    Moving window average. The cost does not depend on the window size since the window
+    sums are computed from running sums along each axis. Windows are truncated at the
+    boundaries.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int or list*) Window size of each axis.
+    :param axes: (*list*) Axes of the window. Default is ``None``, means all axes.
+    :param nan_policy: (*string*) [propagate | omit]. ``propagate``: the result is NaN if
+        the window contains NaN; ``omit``: NaN values are skipped. Default is ``propagate``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Filtered array.
+    '''
+    axes, offsets = _windows(size, axes, a.ndim)
+    return _wrap(a, _moving(a, 'mean', axes, offsets, nan_policy, nthread=nthread))
+
+def moving_sum(a, size, axes=None, nan_policy='propagate', nthread=None):
+    '''
+    Moving window sum. Windows are truncated at the boundaries.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int or list*) Window size of each axis.
+    :param axes: (*list*) Axes of the window. Default is ``None``, means all axes.
+    :param nan_policy: (*string*) [propagate | omit]. Default is ``propagate``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Moving sum array.
+    '''
+    axes, offsets = _windows(size, axes, a.ndim)
+    return _wrap(a, _moving(a, 'sum', axes, offsets, nan_policy, nthread=nthread))
+
+def moving_std(a, size, axes=None, nan_policy='propagate', ddof=0, nthread=None):
+    '''
+    Moving window standard deviation. Windows are truncated at the boundaries.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int or list*) Window size of each axis.
+    :param axes: (*list*) Axes of the window. Default is ``None``, means all axes.
+    :param nan_policy: (*string*) [propagate | omit]. Default is ``propagate``.
+    :param ddof: (*int*) Delta degrees of freedom. Default is ``0``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Moving standard deviation array.
+    '''
+    axes, offsets = _windows(size, axes, a.ndim)
+    return _wrap(a, _moving(a, 'std', axes, offsets, nan_policy, ddof=ddof, nthread=nthread))
+
+def moving_min(a, size, axes=None, nan_policy='propagate', nthread=None):
+    '''
+    Moving window minimum using monotone deques. Windows are truncated at the boundaries.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int or list*) Window size of each axis.
+    :param axes: (*list*) Axes of the window. Default is ``None``, means all axes.
+    :param nan_policy: (*string*) [propagate | omit]. Default is ``propagate``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Moving minimum array.
+    '''
+    axes, offsets = _windows(size, axes, a.ndim)
+    return _wrap(a, _moving(a, 'min', axes, offsets, nan_policy, nthread=nthread))
+
+def moving_max(a, size, axes=None, nan_policy='propagate', nthread=None):
+    '''
+    Moving window maximum using monotone deques. Windows are truncated at the boundaries.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int or list*) Window size of each axis.
+    :param axes: (*list*) Axes of the window. Default is ``None``, means all axes.
+    :param nan_policy: (*string*) [propagate | omit]. Default is ``propagate``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Moving maximum array.
+    '''
+    axes, offsets = _windows(size, axes, a.ndim)
+    return _wrap(a, _moving(a, 'max', axes, offsets, nan_policy, nthread=nthread))
+
+def _derived(a, func):
+    '''
+    Get a double array derived element by element from an array.
+    '''
+    src = miutil.todouble(a)
+    r = jarray.zeros(len(src), 'd')
+    for i in range(len(src)):
+        r[i] = func(src[i])
+    shape = list(a.shape) if isinstance(a, MIArray) else list(a.getShape())
+    return Array.factory(DataType.DOUBLE, shape, r)
+
+def window_count(a, size, nthread=None):
+    '''
+    Count non-zero points in the centered 2-D windows of the last two dimensions.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int*) Window size.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Count array.
+    '''
+    axes, offsets = _windows(size, [-2, -1], a.ndim)
+    ind = _derived(a, lambda v: 1.0 if v != 0 and v == v else 0.0)
+    return MIArray(_moving(ind, 'sum', axes, offsets, 'omit', nthread=nthread))
+
+def window_mean(a, size, positive=True, nthread=None):
+    '''
+    Mean value in the centered 2-D windows of the last two dimensions.
+
+    :param a: (*array_like*) Input array.
+    :param size: (*int*) Window size.
+    :param positive: (*boolean*) Only calculate the positive values or not.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*array*) Mean array.
+    '''
+    axes, offsets = _windows(size, [-2, -1], a.ndim)
+    if positive:
+        vals = _derived(a, lambda v: v if v > 0 else nan)
+    else:
+        vals = a
+    return MIArray(_moving(vals, 'mean', axes, offsets, 'omit', nthread=nthread))
+
+class Rolling(object):
+    '''
+    Rolling window along an axis of an array. Statistics are evaluated for all the lines of
+    the axis at once and keep the dimensions of a DimArray. NaN values are skipped, a result
+    is NaN if the window has less than ``min_periods`` valid values.
+
+    :param a: (*array_like*) Input array.
+    :param window: (*int*) Size of the moving window.
+    :param axis: (*int*) Axis of the window. Default is 0.
+    :param center: (*boolean*) Set the labels at the center of the window. Default is ``False``,
+        the window of index ``i`` is ``[i - window + 1, i]``.
+    :param min_periods: (*int*) Minimum number of valid values in the window. Default is
+        ``None``, means the window size.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    '''
+
+    def __init__(self, a, window, axis=0, center=False, min_periods=None, nthread=None):
+        if isinstance(a, (list, tuple)):
+            a = MIArray(a)
+        if axis < 0:
+            axis += a.ndim
+        self.a = a
+        self.window = window
+        self.axis = axis
+        self.center = center
+        self.min_periods = window if min_periods is None else min_periods
+        self.nthread = nthread
+        if center:
+            self.offsets = (window // 2, window - 1 - window // 2)
+        else:
+            self.offsets = (window - 1, 0)
+
+    def __repr__(self):
+        return 'Rolling [window=%d, axis=%d, center=%s, min_periods=%d]' % (self.window, \
+            self.axis, self.center, self.min_periods)
+
+    def _stat(self, stat, ddof=0):
+        r = _moving(self.a, stat, [self.axis], [self.offsets], 'omit', self.min_periods, \
+            ddof, self.nthread)
+        return _wrap(self.a, r)
+
+    def sum(self):
+        '''
+        Rolling sum.
+
+        :returns: (*array*) Rolling sum array.
+        '''
+        return self._stat('sum')
+
+    def mean(self):
+        '''
+        Rolling mean.
+
+        :returns: (*array*) Rolling mean array.
+        '''
+        return self._stat('mean')
+
+    def var(self, ddof=1):
+        '''
+        Rolling variance.
+
+        :param ddof: (*int*) Delta degrees of freedom. Default is 1.
+
+        :returns: (*array*) Rolling variance array.
+        '''
+        return self._stat('var', ddof)
+
+    def std(self, ddof=1):
+        '''
+        Rolling standard deviation.
+
+        :param ddof: (*int*) Delta degrees of freedom. Default is 1.
+
+        :returns: (*array*) Rolling standard deviation array.
+        '''
+        return self._stat('std', ddof)
+
+    def min(self):
+        '''
+        Rolling minimum.
+
+        :returns: (*array*) Rolling minimum array.
+        '''
+        return self._stat('min')
+
+    def max(self):
+        '''
+        Rolling maximum.
+
+        :returns: (*array*) Rolling maximum array.
+        '''
+        return self._stat('max')
+
+    def quantile(self, q):
+        '''
+        Rolling quantile with linear interpolation.
+
+        :param q: (*float*) Quantile between 0 and 1.
+
+        :returns: (*array*) Rolling quantile array.
+        '''
+        if q < 0 or q > 1:
+            raise ValueError('Quantile must be between 0 and 1')
+        h1, h2 = self.offsets
+        r = _movquantile(self.a, q, self.axis, h1, h2, self.min_periods, self.nthread)
+        return _wrap(self.a, r)
+
+    def median(self):
+        '''
+        Rolling median.
+
+        :returns: (*array*) Rolling median array.
+        '''
+        return self.quantile(0.5)
+
+def rolling(a, window, axis=0, center=False, min_periods=None, nthread=None):
+    '''
+    Rolling window along an axis of an array, statistics are methods of the returned object.
+
+    :param a: (*array_like*) Input array.
+    :param window: (*int*) Size of the moving window.
+    :param axis: (*int*) Axis of the window. Default is 0.
+    :param center: (*boolean*) Set the labels at the center of the window. Default is ``False``.
+    :param min_periods: (*int*) Minimum number of valid values in the window. Default is
+        ``None``, means the window size.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Rolling*) Rolling object with ``sum``, ``mean``, ``var``, ``std``, ``min``,
+        ``max``, ``median`` and ``quantile`` methods.
+
+    Examples::
+
+        r = rolling(tas, 31, axis=0, center=True)
+        tm = r.mean()
+        ts = r.std()
+        tq = r.quantile(0.9)
+    '''
+    return Rolling(a, window, axis, center, min_periods, nthread)
\ No newline at end of file
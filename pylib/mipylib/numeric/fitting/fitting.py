@@ -6,10 +6,21 @@
 # Note: Jython
 #-----------------------------------------------------
 
+import math
+
 from org.meteoinfo.math.fitting import FittingUtil
 from org.meteoinfo.data import ArrayMath, ArrayUtil
+from ucar.ma2 import Array, DataType
+from java.lang import Double, System
+import jarray
 
 from mipylib.numeric.miarray import MIArray
+from mipylib.numeric.filters import _lines
+from mipylib.numeric.trend import _reduce, _wrapreduced
+from mipylib.numeric.gemm import gemm
+import mipylib.miutil as miutil
+
+nan = Double.NaN
 
 __all__ = [
     'powerfit', 'expfit','polyfit','polyval','predict'
@@ -55,7 +66,175 @@ def expfit(x, y, func=False):
     else:
         return r[0], r[1], r[2]
         
-def polyfit(x, y, degree, func=False):
+def _solve(a, b):
+    '''
+    Solve a small dense linear system by Gauss-Jordan elimination with partial pivoting.
+
+    :param a: (*list*) Matrix rows, overwritten.
+    :param b: (*list*) Right hand side rows (lists), overwritten with the solution.
+    '''
+    n = len(a)
+    for k in range(n):
+        p = max(range(k, n), key=lambda i: abs(a[i][k]))
+        if a[p][k] == 0:
+            raise ZeroDivisionError('Singular matrix')
+        a[k], a[p] = a[p], a[k]
+        b[k], b[p] = b[p], b[k]
+        for i in range(n):
+            if i != k and a[i][k] != 0:
+                f = a[i][k] / a[k][k]
+                ai = a[i]
+                ak = a[k]
+                for j in range(k, n):
+                    ai[j] -= f * ak[j]
+                bi = b[i]
+                bk = b[k]
+                for j in range(len(bk)):
+                    bi[j] -= f * bk[j]
+    for k in range(n):
+        b[k] = [v / a[k][k] for v in b[k]]
+    return b
+
+def _scaling(xs):
+    '''
+    Center and scale of x values, the fit is solved in t = (x - c) / s for conditioning.
+    '''
+    c = sum(xs) / len(xs)
+    s = max([abs(v - c) for v in xs])
+    return c, s if s > 0 else 1.0
+
+def _convert(q, c, s):
+    '''
+    Convert ascending coefficients of t = (x - c) / s to descending coefficients of x.
+    '''
+    d = len(q) - 1
+    p = [0.0] * (d + 1)
+    for k in range(d + 1):
+        f = q[k] / s ** k
+        binom = 1
+        for j in range(k + 1):
+            #binom is C(k, j)
+            p[j] += f * binom * (-c) ** (k - j)
+            binom = binom * (k - j) // (j + 1)
+    return p[::-1]
+
+def _polyline(xs, ys, degree):
+    '''
+    Least squares polynomial of the valid pairs of a line.
+
+    :returns: Descending coefficients and R-squared.
+    '''
+    x = []
+    y = []
+    for a, b in zip(xs, ys):
+        if a == a and b == b:
+            x.append(a)
+            y.append(b)
+    n = len(x)
+    m = degree + 1
+    if n < m:
+        return [nan] * (m + 1)
+    c, s = _scaling(x)
+    g = [[0.0] * m for i in range(m)]
+    b = [[0.0] for i in range(m)]
+    for xv, yv in zip(x, y):
+        t = (xv - c) / s
+        pw = [1.0] * (2 * m - 1)
+        for k in range(1, 2 * m - 1):
+            pw[k] = pw[k - 1] * t
+        for i in range(m):
+            gi = g[i]
+            for j in range(m):
+                gi[j] += pw[i + j]
+            b[i][0] += pw[i] * yv
+    try:
+        q = [v[0] for v in _solve([list(r) for r in g], [list(r) for r in b])]
+    except ZeroDivisionError:
+        return [nan] * (m + 1)
+    syy = sum([v * v for v in y])
+    return _convert(q, c, s) + [_rsquared(q, [v[0] for v in b], syy, n)]
+
+def _rsquared(q, b, syy, n):
+    '''
+    R-squared from the solution, the normal equation right hand side (b[0] is the sum of y)
+    and the sum of squared y.
+    '''
+    sstot = syy - b[0] * b[0] / n
+    ssres = syy - sum([u * v for u, v in zip(q, b)])
+    if sstot <= 0:
+        return nan
+    return max(0.0, min(1.0, 1 - ssres / sstot))
+
+def _polyaxis(x, y, degree, axis, nthread):
+    '''
+    Polynomial fitting of each line along an axis.
+
+    :returns: Descending coefficient arrays and R-squared array (floats for one dimension data).
+    '''
+    m = degree + 1
+    if x.ndim != 1 or y.ndim == 1:
+        r = _reduce(lambda xs, ys: _polyline(xs, ys, degree), [x, y], axis, m + 1, nthread)
+        return r[:m], r[m]
+
+    #Shared x: one matrix product gives the normal equation right hand sides of all the lines
+    shape = list(y.shape)
+    if axis < 0:
+        axis += len(shape)
+    xs = list(miutil.todouble(x))
+    src = miutil.todouble(y)
+    starts, n, st = _lines(shape, axis)
+    if len(xs) != n:
+        raise ValueError('x length must equal the axis length: %d' % n)
+    nc = len(starts)
+    c, s = _scaling(xs)
+    vt = jarray.zeros(m * n, 'd')
+    for j in range(n):
+        t = (xs[j] - c) / s
+        v = 1.0
+        for k in range(m):
+            vt[k * n + j] = v
+            v *= t
+    if axis == 0:
+        ym = src
+    else:
+        ym = jarray.zeros(n * nc, 'd')
+        for i in range(nc):
+            s0 = starts[i]
+            for j in range(n):
+                ym[j * nc + i] = src[s0 + j * st]
+    bs = miutil.todouble(gemm(Array.factory(DataType.DOUBLE, [m, n], vt), \
+        Array.factory(DataType.DOUBLE, [n, nc], ym), nthread=nthread))
+    g = [[sum([vt[i * n + j] * vt[k * n + j] for j in range(n)]) for k in range(m)] \
+        for i in range(m)]
+    try:
+        ginv = _solve([list(r) for r in g], [[1.0 if i == k else 0.0 for k in range(m)] \
+            for i in range(m)])
+    except ZeroDivisionError:
+        ginv = None
+    outs = [jarray.zeros(nc, 'd') for k in range(m + 1)]
+
+    def part(i0, i1):
+        for i in range(i0, i1):
+            line = [ym[j * nc + i] for j in range(n)]
+            if ginv is None or any([v != v for v in line]):
+                r = _polyline(xs, line, degree)
+            else:
+                b = [bs[k * nc + i] for k in range(m)]
+                q = [sum([ginv[k][l] * b[l] for l in range(m)]) for k in range(m)]
+                r = _convert(q, c, s) + [_rsquared(q, b, sum([v * v for v in line]), n)]
+            for k in range(m + 1):
+                outs[k][i] = r[k]
+
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(nc, nthread * 4))
+    step = max(1, (nc + nchunk - 1) // nchunk)
+    miutil.pmap(part, [(i, min(i + step, nc)) for i in range(0, nc, step)], nthread)
+    rshape = shape[:axis] + shape[axis + 1:]
+    r = [Array.factory(DataType.DOUBLE, rshape, o) for o in outs]
+    return r[:m], r[m]
+
+def polyfit(x, y, degree, func=False, axis=None, nthread=None):
     '''
     Polynomail fitting.
     
@@ -63,13 +242,30 @@ def polyfit(x, y, degree, func=False):
     :param y: (*array_like*) y data array.
     :param degree: (*int*) Degree of the fitting polynomial.
     :param func: (*boolean*) Return fit function (for predict function) or not. Default is ``False``.
+    :param axis: (*int*) Fit each line of ``y`` along this axis. ``x`` is a one dimension array
+        with the axis length or has the shape of ``y``. NaN pairs are removed. Default is
+        ``None``, means fitting the flattened data.
+    :param nthread: (*int*) Thread number of the axis fitting. Default is ``None``, means the
+        processor number.
     
-    :returns: Fitting parameters and function (optional).
+    :returns: Fitting parameters and function (optional). With ``axis``, the coefficient array
+        with shape (degree + 1, ...) from the highest degree (as ``polyval``) and the R-squared
+        array of the lines.
     '''
     if isinstance(x, list):
         x = MIArray(ArrayUtil.array(x))
     if isinstance(y, list):
         y = MIArray(ArrayUtil.array(y))
+    if not axis is None:
+        p, r2 = _polyaxis(x, y, degree, axis, nthread)
+        if not isinstance(r2, Array):
+            return MIArray(ArrayUtil.array(p)), r2
+        n = r2.getSize()
+        v = jarray.zeros(len(p) * n, 'd')
+        for k, a in enumerate(p):
+            System.arraycopy(a.copyTo1DJavaArray(), 0, v, k * n, n)
+        shape = [len(p)] + list(r2.getShape())
+        return MIArray(Array.factory(DataType.DOUBLE, shape, v)), _wrapreduced(y, r2, axis)
     r = FittingUtil.polyFit(x.asarray(), y.asarray(), degree)
     if func:
         return r[0], r[1], r[2]
@@ -0,0 +1,180 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Blocked multi-threaded matrix multiplication
+# Note: Jython
+#-----------------------------------------------------
+
+import time
+
+from org.meteoinfo.data import ArrayMath
+from ucar.ma2 import Array, DataType, MAMath
+from java.lang import System
+from java.util import Random
+import jarray
+
+import mipylib.miutil as miutil
+
+__all__ = ['gemm','benchmark']
+
+# Minimum multiply-add number (m * n * k) of the blocked path
+gemm_size = 2 ** 21
+# Tile size of the rows and columns of the result
+block = 256
+# Tile size of the shared dimension
+kblock = 1024
+
+def _double(a):
+    if a.getDataType() != DataType.DOUBLE:
+        b = Array.factory(DataType.DOUBLE, a.getShape())
+        MAMath.copyDouble(b, a)
+        a = b
+    return a
+
+# Numeric data types in promotion order and their copy functions
+_types = [DataType.BYTE, DataType.SHORT, DataType.INT, DataType.LONG, DataType.FLOAT, \
+    DataType.DOUBLE]
+_copies = {DataType.BYTE: MAMath.copyByte, DataType.SHORT: MAMath.copyShort, \
+    DataType.INT: MAMath.copyInt, DataType.LONG: MAMath.copyLong, \
+    DataType.FLOAT: MAMath.copyFloat}
+
+def _restore(r, a, b):
+    '''
+    Cast the double result of the blocked path back to the common type of the matrices.
+    '''
+    ta = a.getDataType()
+    tb = b.getDataType()
+    if not ta in _types or not tb in _types:
+        return r
+    dt = _types[max(_types.index(ta), _types.index(tb))]
+    if dt == DataType.DOUBLE:
+        return r
+    c = Array.factory(dt, r.getShape())
+    _copies[dt](c, r)
+    return c
+
+def _tile(a, r0, r1, c0, c1, trans):
+    '''
+    Contiguous copy of rows ``r0:r1`` and columns ``c0:c1`` of a matrix or of its transpose.
+    '''
+    if trans:
+        return a.section([c0, r0], [c1 - c0, r1 - r0]).transpose(0, 1).copy()
+    return a.section([r0, c0], [r1 - r0, c1 - c0]).copy()
+
+def _splits(n, size):
+    size = max(1, size)
+    return [(i, min(i + size, n)) for i in range(0, n, size)]
+
+def gemm(a, b, transa=False, transb=False, nthread=None):
+    '''
+    Matrix product of 2-D arrays split into tiles computed by a thread pool. A transposed
+    operand is read tile by tile, the full transpose is never formed. Small products are
+    computed directly.
+
+    :param a: (*Array*) Matrix a.
+    :param b: (*Array*) Matrix b.
+    :param transa: (*boolean*) Use the transpose of ``a``. Default is ``False``.
+    :param transb: (*boolean*) Use the transpose of ``b``. Default is ``False``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Result matrix with the common data type of the matrices, as
+        ``ArrayMath.dot``.
+    '''
+    sa = a.getShape()
+    sb = b.getShape()
+    m, k = (sa[1], sa[0]) if transa else (sa[0], sa[1])
+    k2, n = (sb[1], sb[0]) if transb else (sb[0], sb[1])
+    if k != k2:
+        raise ValueError('Matrix shapes not aligned: (%d, %d), (%d, %d)' % (m, k, k2, n))
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    if m * n * k < gemm_size or nthread <= 1:
+        at = ArrayMath.transpose(a, 0, 1) if transa else a
+        bt = ArrayMath.transpose(b, 0, 1) if transb else b
+        return ArrayMath.dot(at, bt)
+
+    ad = _double(a)
+    bd = _double(b)
+    rows = _splits(m, min(block, (m + nthread - 1) // nthread))
+    cols = _splits(n, block)
+    ntile = len(rows) * len(cols)
+    #Split the shared dimension too if there are not enough tiles for the threads
+    nk = max(1, min((k + kblock - 1) // kblock, (2 * nthread + ntile - 1) // ntile))
+    ks = _splits(k, (k + nk - 1) // nk)
+    tasks = [(rr, cc, kk) for rr in rows for cc in cols for kk in ks]
+
+    def part(rr, cc, kk):
+        i0, i1 = rr
+        j0, j1 = cc
+        k0, k1 = kk
+        acc = None
+        for s0, s1 in _splits(k1 - k0, kblock):
+            at = _tile(ad, i0, i1, k0 + s0, k0 + s1, transa)
+            bt = _tile(bd, k0 + s0, k0 + s1, j0, j1, transb)
+            p = _double(ArrayMath.dot(at, bt)).copyTo1DJavaArray()
+            if acc is None:
+                acc = p
+            else:
+                for i in range(len(acc)):
+                    acc[i] += p[i]
+        return acc
+
+    parts = miutil.pmap(part, tasks, nthread)
+    r = jarray.zeros(m * n, 'd')
+    for (rr, cc, kk), p in zip(tasks, parts):
+        i0, i1 = rr
+        j0, j1 = cc
+        w = j1 - j0
+        if len(ks) == 1:
+            for i in range(i0, i1):
+                System.arraycopy(p, (i - i0) * w, r, i * n + j0, w)
+        else:
+            for i in range(i0, i1):
+                o = i * n + j0
+                q = (i - i0) * w
+                for j in range(w):
+                    r[o + j] += p[q + j]
+    return _restore(Array.factory(DataType.DOUBLE, [m, n], r), a, b)
+
+def _random(m, n, rnd):
+    v = jarray.zeros(m * n, 'd')
+    for i in range(m * n):
+        v[i] = rnd.nextDouble()
+    return Array.factory(DataType.DOUBLE, [m, n], v)
+
+def benchmark(sizes=[128, 256, 512, 1024], repeat=3, nthread=None):
+    '''
+    Compare the blocked matrix product with the direct product on random square matrices.
+
+    :param sizes: (*list*) Matrix sizes.
+    :param repeat: (*int*) Repeat number, the best time is used.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*list*) Tuples of size, direct time, blocked time, transposed blocked time (seconds)
+        and the maximum absolute difference of the results.
+    '''
+    rnd = Random(0)
+    rs = []
+    print('%8s %12s %12s %12s %12s' % ('size', 'direct', 'blocked', 'blocked(T)', 'maxdiff'))
+    for n in sizes:
+        a = _random(n, n, rnd)
+        b = _random(n, n, rnd)
+        t = [None, None, None]
+        r0 = r1 = None
+        for it in range(repeat):
+            t0 = time.time()
+            r0 = ArrayMath.dot(a, b)
+            t1 = time.time()
+            r1 = gemm(a, b, nthread=nthread)
+            t2 = time.time()
+            gemm(a, b, transa=True, nthread=nthread)
+            t3 = time.time()
+            for i, d in enumerate([t1 - t0, t2 - t1, t3 - t2]):
+                if t[i] is None or d < t[i]:
+                    t[i] = d
+        v0 = _double(r0).copyTo1DJavaArray()
+        v1 = _double(r1).copyTo1DJavaArray()
+        diff = max([abs(x - y) for x, y in zip(v0, v1)])
+        print('%8d %12.4f %12.4f %12.4f %12.3e' % (n, t[0], t[1], t[2], diff))
+        rs.append((n, t[0], t[1], t[2], diff))
+    return rs
\ No newline at end of file
@@ -0,0 +1,119 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Vectorized interpolation on regular grids
+# Note: Jython
+#-----------------------------------------------------
+
+import bisect
+
+from ucar.ma2 import Array, DataType, MAMath
+from java.lang import Double
+import jarray
+
+from miarray import MIArray
+from kdtree import _tolist
+import mipylib.miutil as miutil
+
+nan = Double.NaN
+
+class _Axis(object):
+    '''
+    Cell locator of a grid dimension. Uniform coordinates are located by arithmetic,
+    others by bisection.
+    '''
+
+    def __init__(self, coords):
+        c = [float(v) for v in coords]
+        self.n = len(c)
+        self.rev = self.n > 1 and c[0] > c[self.n - 1]
+        if self.rev:
+            c = c[::-1]
+        self.c = c
+        self.uniform = False
+        if self.n > 1:
+            d = (c[self.n - 1] - c[0]) / (self.n - 1)
+            if d > 0:
+                tol = abs(d) * 1e-6
+                self.uniform = all(abs(c[i + 1] - c[i] - d) <= tol for i in range(self.n - 1))
+                self.d = d
+
+    def locate(self, v):
+        '''
+        Locate a coordinate value.
+
+        :returns: Lower index (in the original order) and fraction toward the upper index,
+            ``None`` if out of range.
+        '''
+        c = self.c
+        n = self.n
+        if v != v or n == 0 or v < c[0] or v > c[n - 1]:
+            return None
+        if n == 1:
+            return 0, 0.0
+        if self.uniform:
+            i = int((v - c[0]) / self.d)
+        else:
+            i = bisect.bisect_right(c, v) - 1
+        i = min(max(i, 0), n - 2)
+        f = (v - c[i]) / (c[i + 1] - c[i])
+        if self.rev:
+            return n - 2 - i, 1 - f
+        return i, f
+
+def interpn_points(points, values, xi, nthread=None):
+    '''
+    Multilinear interpolation of regular grid data at a set of points.
+
+    :param points: (*list*) The coordinate arrays defining the regular grid in n dimensions.
+    :param values: (*array_like*) The data on the regular grid in n dimensions.
+    :param xi: (*array_like*) The coordinates of the sample points with shape (npoints, ndim).
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Interpolated values with shape (npoints,). The values of points outside
+        the grid are NaN.
+    '''
+    axes = [_Axis(_tolist(p)) for p in points]
+    nd = len(axes)
+    shape = [ax.n for ax in axes]
+    strides = [1] * nd
+    for d in range(nd - 2, -1, -1):
+        strides[d] = strides[d + 1] * shape[d + 1]
+    v = miutil.todouble(values)
+    x = miutil.todouble(xi)
+    n = len(x) // nd
+    #Corner offsets of a cell: (dimension bits, flat offset)
+    corners = []
+    for k in range(1 << nd):
+        bits = [(k >> (nd - 1 - d)) & 1 for d in range(nd)]
+        corners.append((bits, sum(b * s for b, s in zip(bits, strides))))
+    r = jarray.zeros(n, 'd')
+
+    def part(p0, p1):
+        for p in range(p0, p1):
+            base = 0
+            fs = []
+            for d in range(nd):
+                loc = axes[d].locate(x[p * nd + d])
+                if loc is None:
+                    break
+                base += loc[0] * strides[d]
+                fs.append(loc[1])
+            else:
+                s = 0.0
+                for bits, off in corners:
+                    w = 1.0
+                    for d in range(nd):
+                        w *= fs[d] if bits[d] else 1 - fs[d]
+                    if w != 0:
+                        s += w * v[base + off]
+                r[p] = s
+                continue
+            r[p] = nan
+
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(n, nthread * 4))
+    step = max(1, (n + nchunk - 1) // nchunk)
+    miutil.pmap(part, [(i, min(i + step, n)) for i in range(0, n, step)], nthread)
+    return Array.factory(DataType.DOUBLE, [n], r)
\ No newline at end of file
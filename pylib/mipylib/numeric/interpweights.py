@@ -0,0 +1,366 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Reusable interpolation weights
+# Note: Jython
+#-----------------------------------------------------
+
+import bisect
+
+from ucar.ma2 import Array, DataType, MAMath
+from java.io import RandomAccessFile
+from java.nio import ByteOrder
+from java.nio.channels import FileChannel
+from java.lang import Double
+import jarray
+
+from miarray import MIArray
+from kdtree import KDTree, _tolist
+import mipylib.miutil as miutil
+
+inf = Double.POSITIVE_INFINITY
+nan = Double.NaN
+
+__all__ = ['InterpWeights','interp_weights']
+
+_MAGIC = 0x4d495754
+
+def _chunks(n, nthread):
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(n, nthread * 4))
+    step = max(1, (n + nchunk - 1) // nchunk)
+    return [(i, min(i + step, n)) for i in range(0, n, step)], nthread
+
+# Sparse interpolation weights
+class InterpWeights(object):
+    '''
+    Sparse interpolation weights from source points to target points. Each target point
+    is a weighted sum of a few source points, the weights are stored in compressed sparse
+    row form so applying them to new values is a sparse matrix-vector product.
+
+    :param srcshape: (*list*) Shape of the source data.
+    :param shape: (*list*) Shape of the target data.
+    :param indptr: (*array*) Start positions of the target points in ``indices`` and
+        ``weights`` (target number + 1 items).
+    :param indices: (*array*) Flat source indices.
+    :param weights: (*array*) Weights.
+    '''
+
+    def __init__(self, srcshape, shape, indptr, indices, weights):
+        self.srcshape = list(srcshape)
+        self.shape = list(shape)
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.nsrc = 1
+        for n in self.srcshape:
+            self.nsrc *= n
+        self.size = len(indptr) - 1
+
+    def __repr__(self):
+        return 'InterpWeights(srcshape=%s, shape=%s, nnz=%i)' % (self.srcshape, self.shape, \
+            len(self.weights))
+
+    def apply(self, values, nthread=None, missing=None):
+        '''
+        Interpolate values with the weights. Missing (NaN) source values are excluded by
+        renormalizing the weights of each target point, so an 'idw' target point uses fewer
+        than ``pointnum`` stations (NaN if all its stations are missing). Pass ``values`` to
+        ``interp_weights`` to leave the missing stations out of the neighbour search.
+
+        :param values: (*array_like*) Source values. The trailing dimensions must be the
+            source shape, leading dimensions (e.g. time and level) are interpolated in one
+            call.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+        :param missing: (*float*) Source missing value besides NaN. Default is ``None``.
+
+        :returns: (*array*) Interpolated array with the leading dimensions of ``values`` and
+            the target shape.
+        '''
+        if isinstance(values, MIArray):
+            vshape = list(values.shape)
+        elif isinstance(values, Array):
+            vshape = list(values.getShape())
+        else:
+            values = MIArray(Array.factory(DataType.DOUBLE, [len(values)], \
+                jarray.array(values, 'd')))
+            vshape = [len(values)]
+        ns = len(self.srcshape)
+        if vshape[len(vshape) - ns:] != self.srcshape:
+            raise ValueError('Values shape %s does not end with the source shape %s' % \
+                (vshape, self.srcshape))
+        lead = vshape[:len(vshape) - ns]
+        nlead = 1
+        for n in lead:
+            nlead *= n
+        src = miutil.todouble(values)
+        nsrc = self.nsrc
+        ntgt = self.size
+        dst = jarray.zeros(nlead * ntgt, 'd')
+        indptr = self.indptr
+        indices = self.indices
+        weights = self.weights
+        if missing is None:
+            missing = nan
+
+        def rows(t0, t1):
+            for t in range(t0, t1):
+                k0 = indptr[t]
+                k1 = indptr[t + 1]
+                for l in range(nlead):
+                    base = l * nsrc
+                    s = 0.0
+                    ws = 0.0
+                    for k in range(k0, k1):
+                        v = src[base + indices[k]]
+                        if v == v and v != missing:
+                            w = weights[k]
+                            s += w * v
+                            ws += w
+                    dst[l * ntgt + t] = s / ws if ws > 0 else nan
+
+        chunks, nthread = _chunks(ntgt, nthread)
+        miutil.pmap(rows, chunks, nthread)
+        r = Array.factory(DataType.DOUBLE, lead + self.shape, dst)
+        return MIArray(r)
+
+    def save(self, fname):
+        '''
+        Save the weights to a binary file.
+
+        :param fname: (*string*) File name.
+        '''
+        header = [_MAGIC, len(self.srcshape), len(self.shape)] + self.srcshape + self.shape + \
+            [len(self.indptr), len(self.indices)]
+        nbytes = 4 * len(header) + 4 * len(self.indptr) + 4 * len(self.indices) + \
+            8 * len(self.weights)
+        raf = RandomAccessFile(fname, 'rw')
+        try:
+            raf.setLength(0)
+            buf = raf.getChannel().map(FileChannel.MapMode.READ_WRITE, 0, nbytes)
+            buf.order(ByteOrder.LITTLE_ENDIAN)
+            for n in header:
+                buf.putInt(n)
+            buf.asIntBuffer().put(self.indptr)
+            buf.position(buf.position() + 4 * len(self.indptr))
+            buf.asIntBuffer().put(self.indices)
+            buf.position(buf.position() + 4 * len(self.indices))
+            buf.asDoubleBuffer().put(self.weights)
+            buf.force()
+        finally:
+            raf.close()
+
+    @staticmethod
+    def load(fname):
+        '''
+        Load weights from a binary file saved by ``save``.
+
+        :param fname: (*string*) File name.
+
+        :returns: (*InterpWeights*) The weights.
+        '''
+        raf = RandomAccessFile(fname, 'r')
+        try:
+            buf = raf.getChannel().map(FileChannel.MapMode.READ_ONLY, 0, raf.length())
+            buf.order(ByteOrder.LITTLE_ENDIAN)
+            if buf.getInt() != _MAGIC:
+                raise ValueError('Not an interpolation weights file: ' + fname)
+            nds = buf.getInt()
+            ndt = buf.getInt()
+            srcshape = [buf.getInt() for i in range(nds)]
+            shape = [buf.getInt() for i in range(ndt)]
+            nptr = buf.getInt()
+            nnz = buf.getInt()
+            indptr = jarray.zeros(nptr, 'i')
+            indices = jarray.zeros(nnz, 'i')
+            weights = jarray.zeros(nnz, 'd')
+            buf.asIntBuffer().get(indptr)
+            buf.position(buf.position() + 4 * nptr)
+            buf.asIntBuffer().get(indices)
+            buf.position(buf.position() + 4 * nnz)
+            buf.asDoubleBuffer().get(weights)
+        finally:
+            raf.close()
+        return InterpWeights(srcshape, shape, indptr, indices, weights)
+
+def _compress(srcshape, shape, rows):
+    '''
+    Build weights from the (indices, weights) lists of the target points.
+    '''
+    nnz = 0
+    for idx, ws in rows:
+        nnz += len(idx)
+    indptr = jarray.zeros(len(rows) + 1, 'i')
+    indices = jarray.zeros(nnz, 'i')
+    weights = jarray.zeros(nnz, 'd')
+    k = 0
+    for t in range(len(rows)):
+        idx, ws = rows[t]
+        for i, w in zip(idx, ws):
+            indices[k] = i
+            weights[k] = w
+            k += 1
+        indptr[t + 1] = k
+    return InterpWeights(srcshape, shape, indptr, indices, weights)
+
+def _build(func, ntgt, nthread):
+    '''
+    Compute (indices, weights) of the target points in parallel.
+    '''
+    def part(t0, t1):
+        return [func(t) for t in range(t0, t1)]
+    chunks, nthread = _chunks(ntgt, nthread)
+    rows = []
+    for r in miutil.pmap(part, chunks, nthread):
+        rows.extend(r)
+    return rows
+
+def _idw_weights(nb):
+    if len(nb) == 0:
+        return [], []
+    if nb[0][0] == 0:
+        return [nb[0][1]], [1.0]
+    ws = [1.0 / d2 for d2, i in nb]
+    s = sum(ws)
+    return [i for d2, i in nb], [w / s for w in ws]
+
+def _locate(c, v):
+    '''
+    Locate the cell of a coordinate value in an ascending coordinate list.
+
+    :returns: Lower index and fraction, ``None`` if out of range.
+    '''
+    n = len(c)
+    if n < 2 or v != v or v < c[0] or v > c[n - 1]:
+        return None
+    i = min(max(bisect.bisect_right(c, v) - 1, 0), n - 2)
+    return i, (v - c[i]) / (c[i + 1] - c[i])
+
+def interp_weights(points, xi, method='idw', **kwargs):
+    '''
+    Compute reusable interpolation weights. The neighbour search and weight computation
+    are done once, then ``apply`` interpolates new values with the same source and target
+    coordinates.
+
+    :param points: (*list or KDTree*) Source coordinates. The list contains x and y coordinate
+        arrays of the scattered points (or a k-d tree of them) for 'idw' and 'nearest'
+        methods, x and y coordinate arrays (one dimension) of the rectilinear source grid
+        for 'bilinear' method.
+    :param xi: (*list*) The list contains x and y coordinate arrays of the target.
+    :param method: (*string*) Interpolation method. [idw | nearest | bilinear | grid_nearest].
+        'idw' and 'nearest' as ``griddata``, 'bilinear' as ``linint2`` and ``interp2d``,
+        'grid_nearest' takes the nearest node of the rectilinear source grid.
+    :param pointnum: (*int*) Only used for 'idw' method. The number of the points to be used
+        for each target point. Default is ``2``.
+    :param radius: (*float*) Used for 'idw' and 'nearest' methods. The searching radius.
+        Default is ``None``, means no radius.
+    :param values: (*array_like*) Used for 'idw' and 'nearest' methods. Station values, the
+        stations with NaN values are excluded from the neighbour search. The weights are only
+        valid for values with the same missing stations. Default is ``None``, means all the
+        stations are searched and missing values are excluded by ``apply``.
+    :param grid: (*boolean*) If the target x and y coordinate arrays define a grid, otherwise
+        they are paired coordinates of target points (as ``interp2d``). Default is ``True``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*InterpWeights*) The weights.
+
+    Examples::
+
+        w = interp_weights([x_s, y_s], [x_g, y_g], method='idw', pointnum=4)
+        w.save('idw.wts')
+        w = InterpWeights.load('idw.wts')
+        r = w.apply(values)    #values: (time, station) array, r: (time, y, x) array
+    '''
+    grid = kwargs.pop('grid', True)
+    nthread = kwargs.pop('nthread', None)
+    xq = _tolist(xi[0])
+    yq = _tolist(xi[1])
+    if grid:
+        shape = [len(yq), len(xq)]
+        nxq = len(xq)
+        def target(t):
+            return xq[t % nxq], yq[t // nxq]
+    else:
+        if len(xq) != len(yq):
+            raise ValueError('x and y target coordinate arrays must have the same size')
+        shape = [len(xq)]
+        def target(t):
+            return xq[t], yq[t]
+    ntgt = 1
+    for n in shape:
+        ntgt *= n
+
+    if method in ['idw', 'nearest']:
+        tree = points if isinstance(points, KDTree) else KDTree(points)
+        radius = kwargs.pop('radius', None)
+        values = kwargs.pop('values', None)
+        mask = None
+        if not values is None:
+            mask = [v == v for v in _tolist(values)]
+            if len(mask) != tree.n:
+                raise ValueError('Values size %d does not match the station number %d' % \
+                    (len(mask), tree.n))
+        if method == 'idw':
+            pnum = kwargs.pop('pointnum', 2)
+            if radius is None:
+                def func(t):
+                    px, py = target(t)
+                    return _idw_weights(tree._knn(px, py, pnum, inf, mask))
+            else:
+                r2 = radius * radius
+                def func(t):
+                    px, py = target(t)
+                    nb = tree._ball(px, py, r2, mask)
+                    if len(nb) < pnum:
+                        return [], []
+                    nb.sort()
+                    return _idw_weights(nb)
+        else:
+            r2 = inf if radius is None or radius == inf else radius * radius
+            def func(t):
+                px, py = target(t)
+                nb = tree._knn(px, py, 1, r2, mask)
+                if len(nb) == 0:
+                    return [], []
+                return [nb[0][1]], [1.0]
+        srcshape = [tree.n]
+    elif method in ['bilinear', 'grid_nearest']:
+        x = _tolist(points[0])
+        y = _tolist(points[1])
+        nx = len(x)
+        ny = len(y)
+        xrev = nx > 1 and x[0] > x[nx - 1]
+        yrev = ny > 1 and y[0] > y[ny - 1]
+        if xrev:
+            x = x[::-1]
+        if yrev:
+            y = y[::-1]
+        def srcidx(jj, ii):
+            iy = ny - 1 - jj if yrev else jj
+            ix = nx - 1 - ii if xrev else ii
+            return iy * nx + ix
+        def func(t):
+            px, py = target(t)
+            lx = _locate(x, px)
+            ly = _locate(y, py)
+            if lx is None or ly is None:
+                return [], []
+            i, fx = lx
+            j, fy = ly
+            if method == 'grid_nearest':
+                return [srcidx(j + 1 if fy >= 0.5 else j, i + 1 if fx >= 0.5 else i)], [1.0]
+            idx = []
+            ws = []
+            for jj, wy in ((j, 1 - fy), (j + 1, fy)):
+                for ii, wx in ((i, 1 - fx), (i + 1, fx)):
+                    w = wx * wy
+                    if w > 0:
+                        idx.append(srcidx(jj, ii))
+                        ws.append(w)
+            return idx, ws
+        srcshape = [ny, nx]
+    else:
+        raise ValueError('Unsupported method: ' + method)
+
+    return _compress(srcshape, shape, _build(func, ntgt, nthread))
\ No newline at end of file
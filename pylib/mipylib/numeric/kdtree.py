@@ -0,0 +1,533 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: k-d tree spatial index of scattered points
+# Note: Jython
+#-----------------------------------------------------
+
+import heapq
+import math
+
+from org.meteoinfo.data import ArrayMath
+from ucar.ma2 import Array, DataType
+from java.lang import Double
+import jarray
+
+from miarray import MIArray
+import mipylib.miutil as miutil
+
+inf = Double.POSITIVE_INFINITY
+nan = Double.NaN
+
+__all__ = ['KDTree']
+
+def _tolist(a):
+    if isinstance(a, MIArray):
+        return [float(v) for v in a.aslist()]
+    elif isinstance(a, Array):
+        return [float(v) for v in ArrayMath.asList(a)]
+    else:
+        return [float(v) for v in a]
+
+# k-d tree of 2-D scattered points
+class KDTree(object):
+    '''
+    k-d tree of 2-D scattered points for fast nearest neighbour and radius searches. A
+    tree built once can be passed to ``griddata`` in place of the point coordinates, so
+    repeated interpolations of the same station set reuse it.
+
+    :param points: (*list*) The list contains x and y coordinate arrays of the points.
+    :param leafsize: (*int*) Maximum number of points in a leaf node. Default is ``16``.
+
+    Examples::
+
+        tree = KDTree([x_s, y_s])
+        d, i = tree.query(110.5, 35.2, k=4)
+        r, x_g, y_g = griddata(tree, values, [x_g, y_g], method='idw', pointnum=4)
+    '''
+
+    def __init__(self, points, leafsize=16):
+        self.points = points
+        self.x = _tolist(points[0])
+        self.y = _tolist(points[1])
+        if len(self.x) != len(self.y):
+            raise ValueError('x and y coordinate arrays must have the same size')
+        self.n = len(self.x)
+        self.leafsize = max(1, leafsize)
+        #Node arrays: split dimension (-1 for leaf), split value, left child, right child,
+        #leaf start and end positions in the index permutation
+        self._dim = []
+        self._split = []
+        self._left = []
+        self._right = []
+        self._lo = []
+        self._hi = []
+        self._idx = [i for i in range(self.n) if self.x[i] == self.x[i] and self.y[i] == self.y[i]]
+        if len(self._idx) > 0:
+            self.__build(0, len(self._idx))
+
+    def __len__(self):
+        return self.n
+
+    def __newnode(self):
+        self._dim.append(-1)
+        self._split.append(0.0)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._lo.append(0)
+        self._hi.append(0)
+        return len(self._dim) - 1
+
+    def __build(self, lo, hi):
+        x = self.x
+        y = self.y
+        root = self.__newnode()
+        stack = [(root, lo, hi)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if hi - lo <= self.leafsize:
+                self._lo[node] = lo
+                self._hi[node] = hi
+                continue
+            idx = self._idx[lo:hi]
+            xs = [x[i] for i in idx]
+            ys = [y[i] for i in idx]
+            if max(xs) - min(xs) >= max(ys) - min(ys):
+                dim, coord = 0, x
+            else:
+                dim, coord = 1, y
+            idx.sort(key=coord.__getitem__)
+            self._idx[lo:hi] = idx
+            mid = (lo + hi) // 2
+            self._dim[node] = dim
+            self._split[node] = coord[self._idx[mid]]
+            left = self.__newnode()
+            right = self.__newnode()
+            self._left[node] = left
+            self._right[node] = right
+            stack.append((left, lo, mid))
+            stack.append((right, mid, hi))
+
+    def _knn(self, px, py, k, dmax2, mask=None):
+        '''
+        Search k nearest points within squared distance ``dmax2``.
+
+        :returns: (*list*) (squared distance, index) tuples sorted by distance.
+        '''
+        if len(self._dim) == 0 or k <= 0:
+            return []
+        x = self.x
+        y = self.y
+        ndim = self._dim
+        nsplit = self._split
+        nleft = self._left
+        nright = self._right
+        idx = self._idx
+        heap = []
+        stack = [(0, 0.0)]
+        while stack:
+            node, bd = stack.pop()
+            bound = dmax2 if len(heap) < k else -heap[0][0]
+            if bd > bound:
+                continue
+            dim = ndim[node]
+            if dim < 0:
+                for i in idx[self._lo[node]:self._hi[node]]:
+                    if not mask is None and not mask[i]:
+                        continue
+                    dx = x[i] - px
+                    dy = y[i] - py
+                    d2 = dx * dx + dy * dy
+                    if len(heap) < k:
+                        if d2 <= dmax2:
+                            heapq.heappush(heap, (-d2, i))
+                    elif d2 < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2, i))
+            else:
+                diff = (px if dim == 0 else py) - nsplit[node]
+                if diff <= 0:
+                    near, far = nleft[node], nright[node]
+                else:
+                    near, far = nright[node], nleft[node]
+                stack.append((far, max(bd, diff * diff)))
+                stack.append((near, bd))
+        r = [(-d2, i) for d2, i in heap]
+        r.sort()
+        return r
+
+    def _ball(self, px, py, r2, mask=None):
+        '''
+        Search points within squared distance ``r2``.
+
+        :returns: (*list*) (squared distance, index) tuples.
+        '''
+        r = []
+        if len(self._dim) == 0:
+            return r
+        x = self.x
+        y = self.y
+        ndim = self._dim
+        nsplit = self._split
+        idx = self._idx
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            dim = ndim[node]
+            if dim < 0:
+                for i in idx[self._lo[node]:self._hi[node]]:
+                    if not mask is None and not mask[i]:
+                        continue
+                    dx = x[i] - px
+                    dy = y[i] - py
+                    d2 = dx * dx + dy * dy
+                    if d2 <= r2:
+                        r.append((d2, i))
+            else:
+                diff = (px if dim == 0 else py) - nsplit[node]
+                if diff <= 0 or diff * diff <= r2:
+                    stack.append(self._left[node])
+                if diff > 0 or diff * diff <= r2:
+                    stack.append(self._right[node])
+        return r
+
+    def query(self, x, y, k=1, distance_upper_bound=inf, mask=None):
+        '''
+        Query the nearest neighbours of a point.
+
+        :param x: (*float*) X coordinate of the point.
+        :param y: (*float*) Y coordinate of the point.
+        :param k: (*int*) Number of nearest neighbours. Default is ``1``.
+        :param distance_upper_bound: (*float*) Only return neighbours within this distance.
+            Default is ``inf``.
+        :param mask: (*list*) Boolean flags of the tree points, ``False`` points are skipped.
+            Default is ``None``.
+
+        :returns: Distances and indices of the neighbours sorted by distance. Scalars if ``k``
+            is ``1`` (``inf`` and ``-1`` if not found), lists otherwise (may contain less than
+            ``k`` items).
+        '''
+        if distance_upper_bound == inf:
+            dmax2 = inf
+        else:
+            dmax2 = distance_upper_bound * distance_upper_bound
+        r = self._knn(float(x), float(y), k, dmax2, mask)
+        if k == 1:
+            if len(r) == 0:
+                return inf, -1
+            return r[0][0] ** 0.5, r[0][1]
+        return [d2 ** 0.5 for d2, i in r], [i for d2, i in r]
+
+    def query_ball_point(self, x, y, r, mask=None):
+        '''
+        Query the points within a radius of a point.
+
+        :param x: (*float*) X coordinate of the point.
+        :param y: (*float*) Y coordinate of the point.
+        :param r: (*float*) Searching radius.
+        :param mask: (*list*) Boolean flags of the tree points, ``False`` points are skipped.
+            Default is ``None``.
+
+        :returns: (*list*) Indices of the points sorted by distance.
+        '''
+        rr = self._ball(float(x), float(y), r * r, mask)
+        rr.sort()
+        return [i for d2, i in rr]
+
+def _valid(values):
+    '''
+    Get values list and valid (not NaN) flags.
+    '''
+    v = _tolist(values)
+    return v, [a == a for a in v]
+
+def _fillrows(func, nx, ny, nthread):
+    '''
+    Fill a (ny, nx) double array row by row in parallel. ``func(i, row)`` fills grid row
+    ``i`` into the ``row`` list.
+    '''
+    buf = jarray.zeros(nx * ny, 'd')
+    def rows(i0, i1):
+        row = [nan] * nx
+        for i in range(i0, i1):
+            func(i, row)
+            k = i * nx
+            for j in range(nx):
+                buf[k + j] = row[j]
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(ny, nthread * 4))
+    step = (ny + nchunk - 1) // nchunk
+    miutil.pmap(rows, [(i, min(i + step, ny)) for i in range(0, ny, step)], nthread)
+    return Array.factory(DataType.DOUBLE, [ny, nx], buf)
+
+def _idw(v, nb):
+    '''
+    Inverse distance (power 2) weighted value of neighbours.
+    '''
+    if len(nb) == 0:
+        return nan
+    if nb[0][0] == 0:
+        return v[nb[0][1]]
+    s = 0.0
+    ws = 0.0
+    for d2, i in nb:
+        w = 1.0 / d2
+        s += w * v[i]
+        ws += w
+    return s / ws
+
+def idw_grid(tree, values, x_g, y_g, pnum=2, radius=None, nthread=None):
+    '''
+    Inverse distance weighted interpolation from the points of a k-d tree to grid.
+
+    :param tree: (*KDTree*) k-d tree of the scattered points.
+    :param values: (*array_like*) Values of the scattered points.
+    :param x_g: (*array_like*) X coordinates of the grid.
+    :param y_g: (*array_like*) Y coordinates of the grid.
+    :param pnum: (*int*) Number of nearest points used without radius, or minimum number
+        of points within the radius.
+    :param radius: (*float*) Searching radius. Default is ``None``, means no radius.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Interpolated grid data.
+    '''
+    v, mask = _valid(values)
+    xg = _tolist(x_g)
+    yg = _tolist(y_g)
+    if radius is None:
+        def func(i, row):
+            py = yg[i]
+            for j in range(len(xg)):
+                row[j] = _idw(v, tree._knn(xg[j], py, pnum, inf, mask))
+    else:
+        r2 = radius * radius
+        def func(i, row):
+            py = yg[i]
+            for j in range(len(xg)):
+                nb = tree._ball(xg[j], py, r2, mask)
+                if len(nb) < pnum:
+                    row[j] = nan
+                else:
+                    nb.sort()
+                    row[j] = _idw(v, nb)
+    return _fillrows(func, len(xg), len(yg), nthread)
+
+def nearest_grid(tree, values, x_g, y_g, radius=inf, nthread=None):
+    '''
+    Nearest neighbour interpolation from the points of a k-d tree to grid.
+
+    :param tree: (*KDTree*) k-d tree of the scattered points.
+    :param values: (*array_like*) Values of the scattered points.
+    :param x_g: (*array_like*) X coordinates of the grid.
+    :param y_g: (*array_like*) Y coordinates of the grid.
+    :param radius: (*float*) Searching radius. Default is ``inf``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Interpolated grid data.
+    '''
+    v, mask = _valid(values)
+    xg = _tolist(x_g)
+    yg = _tolist(y_g)
+    r2 = inf if radius == inf else radius * radius
+    def func(i, row):
+        py = yg[i]
+        for j in range(len(xg)):
+            nb = tree._knn(xg[j], py, 1, r2, mask)
+            row[j] = nan if len(nb) == 0 else v[nb[0][1]]
+    return _fillrows(func, len(xg), len(yg), nthread)
+
+def _neighbours(tree, xg, yg, sx, sy, mask, rad, nthread):
+    '''
+    Search the points within a radius (in grid cell units) of each grid cell once. The
+    neighbours of a cell are sorted by distance, so the neighbours within a smaller radius
+    are a prefix of the list.
+
+    :returns: (*list*) Neighbours of the grid rows, each is a tuple of cell start positions,
+        point indices and squared distances.
+    '''
+    nx = len(xg)
+    ny = len(yg)
+    scale = max(abs(xg[1] - xg[0]), abs(yg[1] - yg[0]))
+    r2 = (rad * scale) ** 2
+    rad2 = rad * rad
+    rows = [None] * ny
+    def part(i0, i1):
+        for i in range(i0, i1):
+            ptr = [0]
+            idx = []
+            dis = []
+            for j in range(nx):
+                nb = []
+                for d2, s in tree._ball(xg[j], yg[i], r2, mask):
+                    ex = sx[s] - j
+                    ey = sy[s] - i
+                    dis2 = ex * ex + ey * ey
+                    if dis2 <= rad2:
+                        nb.append((dis2, s))
+                nb.sort()
+                for dis2, s in nb:
+                    idx.append(s)
+                    dis.append(dis2)
+                ptr.append(len(idx))
+            rows[i] = (ptr, jarray.array(idx, 'i'), jarray.array(dis, 'd'))
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(ny, nthread * 4))
+    step = (ny + nchunk - 1) // nchunk
+    miutil.pmap(part, [(i, min(i + step, ny)) for i in range(0, ny, step)], nthread)
+    return rows
+
+def _increments(g, v, sx, sy, mask, nx):
+    '''
+    Differences between the point values and the grid analysis interpolated to the points.
+    '''
+    inc = [nan] * len(v)
+    for s in range(len(v)):
+        if not mask[s]:
+            continue
+        i1 = int(sy[s])
+        j1 = int(sx[s])
+        a = g.getDouble(i1 * nx + j1)
+        b = g.getDouble(i1 * nx + j1 + 1)
+        c = g.getDouble((i1 + 1) * nx + j1)
+        d = g.getDouble((i1 + 1) * nx + j1 + 1)
+        dl = [z for z in (a, b, c, d) if z == z]
+        if len(dl) == 0:
+            continue
+        elif len(dl) < 4:
+            cal = sum(dl) / len(dl)
+        else:
+            x1 = a + (c - a) * (sy[s] - i1)
+            x2 = b + (d - b) * (sy[s] - i1)
+            cal = x1 + (x2 - x1) * (sx[s] - j1)
+        inc[s] = v[s] - cal
+    return inc
+
+def _successive(tree, values, x_g, y_g, radius, guessw, passw, clamp, nthread):
+    '''
+    Successive correction analysis from the points of a k-d tree to grid.
+
+    :param guessw: (*function*) Weight function of squared distance for the first guess.
+    :param passw: (*function*) Weight function of squared distance and radius for the
+        correction passes.
+    :param clamp: (*boolean*) Clamp the analysis to the range of the points within the first
+        radius.
+    '''
+    v, mask = _valid(values)
+    xg = _tolist(x_g)
+    yg = _tolist(y_g)
+    nx = len(xg)
+    ny = len(yg)
+    #Point positions in grid cell units, only the points inside the grid are used
+    sx = [(a - xg[0]) / (xg[1] - xg[0]) for a in tree.x]
+    sy = [(a - yg[0]) / (yg[1] - yg[0]) for a in tree.y]
+    for s in range(tree.n):
+        if mask[s] and (sx[s] < 0 or sx[s] >= nx - 1 or sy[s] < 0 or sy[s] >= ny - 1):
+            mask[s] = False
+    if len(radius) == 0:
+        radius = [4]
+    rows = _neighbours(tree, xg, yg, sx, sy, mask, max(radius), nthread)
+
+    #First guess
+    rad2 = radius[0] * radius[0]
+    top = jarray.zeros(nx * ny, 'd')
+    bot = jarray.zeros(nx * ny, 'd')
+    def guess(i, row):
+        ptr, idx, dis = rows[i]
+        for j in range(nx):
+            s = 0.0
+            ws = 0.0
+            vmax = -inf
+            vmin = inf
+            for k in range(ptr[j], ptr[j + 1]):
+                if dis[k] > rad2:
+                    break
+                val = v[idx[k]]
+                w = guessw(dis[k])
+                s += w * val
+                ws += w
+                vmax = max(vmax, val)
+                vmin = min(vmin, val)
+            row[j] = s / ws if ws > 0 else nan
+            top[i * nx + j] = vmax
+            bot[i * nx + j] = vmin
+    r = _fillrows(guess, nx, ny, nthread)
+
+    #Correction passes, the increments of a pass are computed from the previous analysis
+    for rad in radius:
+        g = r
+        inc = _increments(g, v, sx, sy, mask, nx)
+        rad2 = rad * rad
+        def correct(i, row):
+            ptr, idx, dis = rows[i]
+            for j in range(nx):
+                n = i * nx + j
+                val = g.getDouble(n)
+                if val != val:
+                    row[j] = nan
+                    continue
+                isum = 0.0
+                wsum = 0.0
+                for k in range(ptr[j], ptr[j + 1]):
+                    if dis[k] > rad2:
+                        break
+                    e = inc[idx[k]]
+                    if e != e:
+                        continue
+                    w = passw(dis[k], rad2)
+                    isum += e * w
+                    wsum += w
+                if wsum > 0.000001:
+                    val = val + isum / wsum
+                    if clamp:
+                        val = min(max(val, bot[n]), top[n])
+                row[j] = val
+        r = _fillrows(correct, nx, ny, nthread)
+    return r
+
+def cressman_grid(tree, values, x_g, y_g, radius=[10, 7, 4, 2, 1], nthread=None):
+    '''
+    Cressman successive correction analysis from the points of a k-d tree to grid. The
+    first guess of a grid cell is the average of the points within the first radius, and
+    each pass corrects the grid with the weighted increments of the points within the
+    radius. The neighbours of the grid cells are searched once with the largest radius
+    and reused by all passes.
+
+    :param tree: (*KDTree*) k-d tree of the scattered points.
+    :param values: (*array_like*) Values of the scattered points.
+    :param x_g: (*array_like*) X coordinates of the grid (equal spacing).
+    :param y_g: (*array_like*) Y coordinates of the grid (equal spacing).
+    :param radius: (*list*) Searching radii of the passes in grid cell units.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Analysis grid data.
+    '''
+    return _successive(tree, values, x_g, y_g, radius, lambda d2: 1.0, \
+        lambda d2, r2: (r2 - d2) / (r2 + d2), True, nthread)
+
+def barnes_grid(tree, values, x_g, y_g, radius=[10, 7, 4, 2, 1], kappa=1, gamma=1, nthread=None):
+    '''
+    Barnes successive correction analysis from the points of a k-d tree to grid. The first
+    guess of a grid cell is the Gaussian weighted average of the points within the first
+    radius with weight ``exp(-d**2 / kappa)``, and each pass corrects the grid with the
+    increments of the points within the radius weighted by ``exp(-d**2 / (kappa * gamma))``.
+    The neighbours of the grid cells are searched once with the largest radius and reused by
+    all passes.
+
+    :param tree: (*KDTree*) k-d tree of the scattered points.
+    :param values: (*array_like*) Values of the scattered points.
+    :param x_g: (*array_like*) X coordinates of the grid (equal spacing).
+    :param y_g: (*array_like*) Y coordinates of the grid (equal spacing).
+    :param radius: (*list*) Searching radii of the passes in grid cell units.
+    :param kappa: (*float*) Smoothing parameter in squared grid cell units.
+    :param gamma: (*float*) Convergence parameter of the correction passes.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Array*) Analysis grid data.
+    '''
+    k1 = float(kappa)
+    k2 = float(kappa) * gamma
+    if radius is None:
+        raise ValueError('The k-d tree Barnes analysis needs the searching radii')
+    return _successive(tree, values, x_g, y_g, radius, lambda d2: math.exp(-d2 / k1), \
+        lambda d2, r2: math.exp(-d2 / k2), False, nthread)
\ No newline at end of file
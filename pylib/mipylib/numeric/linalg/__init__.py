@@ -1 +1,2 @@
-from .linalg import *
\ No newline at end of file
+from .linalg import *
+from .truncated import *
\ No newline at end of file
@@ -8,13 +8,78 @@
 
 from org.meteoinfo.math.linalg import LinalgUtil
 from org.meteoinfo.math.stats import StatsUtil
+from ucar.ma2 import Array, DataType
+from java.lang import System
+import jarray
 
 from mipylib.numeric.miarray import MIArray
+import mipylib.miutil as miutil
 
 __all__ = [
     'solve','cholesky','lu','qr', 'svd','eig','inv','lstsq'
     ]
 
+def _batched(func, arrays, nds, nout, nthread=None):
+    '''
+    Apply a function to the core matrices of stacked arrays using a thread pool.
+    
+    :param func: (*function*) The function to be applied to the core arrays of a stack index, it
+        returns ``nout`` arrays (a single array if ``nout`` is 1).
+    :param arrays: (*list*) Stacked arrays with the same leading dimensions. An array without
+        leading dimensions is used for all the stack indices.
+    :param nds: (*list*) Number of the core (trailing) dimensions of each array.
+    :param nout: (*int*) Number of the result arrays.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    
+    :returns: (*list*) Stacked result arrays with the leading dimensions.
+    '''
+    leads = []
+    srcs = []
+    for a, nd in zip(arrays, nds):
+        shape = list(a.getShape())
+        lead = shape[:len(shape) - nd]
+        core = shape[len(shape) - nd:]
+        size = 1
+        for n in core:
+            size *= n
+        leads.append(lead)
+        srcs.append((miutil.todouble(a), core, size, len(lead) == 0))
+    lead = max(leads, key=len)
+    for l in leads:
+        if len(l) > 0 and l != lead:
+            raise ValueError('Leading dimensions do not match: %s, %s' % (tuple(l), tuple(lead)))
+    nb = 1
+    for n in lead:
+        nb *= n
+        
+    def part(i0, i1):
+        out = []
+        for i in range(i0, i1):
+            args = []
+            for src, core, size, shared in srcs:
+                buf = jarray.zeros(size, 'd')
+                System.arraycopy(src, 0 if shared else i * size, buf, 0, size)
+                args.append(Array.factory(DataType.DOUBLE, core, buf))
+            r = func(*args)
+            out.append([r] if nout == 1 else [r[k] for k in range(nout)])
+        return out
+        
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(nb, nthread * 4))
+    step = max(1, (nb + nchunk - 1) // nchunk)
+    chunks = miutil.pmap(part, [(i, min(i + step, nb)) for i in range(0, nb, step)], nthread)
+    results = [r for c in chunks for r in c]
+    outs = []
+    for k in range(nout):
+        first = results[0][k]
+        n = int(first.getSize())
+        o = Array.factory(first.getDataType(), lead + list(first.getShape()))
+        for i in range(nb):
+            Array.arraycopy(results[i][k], 0, o, i * n, n)
+        outs.append(o)
+    return outs
+    
 def solve(a, b):
     '''
     Solve a linear matrix equation, or system of linear scalar equations.
@@ -33,7 +98,14 @@ def solve(a, b):
 
     x : {(M), (M, K)} ndarray
         Solution to the system a x = b.  Returned shape is identical to ``b``.
+        
+    Stacked matrices ``a`` with shape (..., M, M) and ``b`` with shape (..., M) or (..., M, K)
+    are solved for all the leading indices using a thread pool.
     '''
+    if a.ndim > 2:
+        nd = 1 if b.ndim == a.ndim - 1 else 2
+        r = _batched(LinalgUtil.solve, [a.asarray(), b.asarray()], [2, nd], 1)
+        return MIArray(r[0])
     x = LinalgUtil.solve(a.asarray(), b.asarray())
     return MIArray(x)
     
@@ -58,7 +130,12 @@ def cholesky(a):
     L : (M, M) array_like
         Upper or lower-triangular Cholesky factor of `a`.  Returns a
         matrix object if `a` is a matrix object.
+        
+    Stacked matrices with shape (..., M, M) are decomposed for all the leading indices
+    using a thread pool.
     '''
+    if a.ndim > 2:
+        return MIArray(_batched(LinalgUtil.cholesky, [a.asarray()], [2], 1)[0])
     r = LinalgUtil.cholesky(a.asarray())
     return MIArray(r)
     
@@ -152,7 +229,13 @@ def svd(a):
     Vh : ndarray
         Unitary matrix having right singular vectors as rows.
         Of shape ``(N,N)``.
+        
+    Stacked matrices with shape (..., M, N) are decomposed for all the leading indices
+    using a thread pool.
     '''
+    if a.ndim > 2:
+        r = _batched(LinalgUtil.svd_EJML, [a.asarray()], [2], 3)
+        return MIArray(r[0]), MIArray(r[1]), MIArray(r[2])
     #r = LinalgUtil.svd(a.asarray())
     r = LinalgUtil.svd_EJML(a.asarray())
     U = MIArray(r[0])
@@ -183,7 +266,13 @@ def eig(a):
         The normalized (unit "length") eigenvectors, such that the
         column ``v[:,i]`` is the eigenvector corresponding to the
         eigenvalue ``w[i]``.
+        
+    Stacked matrices with shape (..., M, M) are decomposed for all the leading indices
+    using a thread pool.
     '''
+    if a.ndim > 2:
+        r = _batched(LinalgUtil.eigen, [a.asarray()], [2], 2)
+        return MIArray(r[0]), MIArray(r[1])
     r = LinalgUtil.eigen(a.asarray())
     #r = LinalgUtil.eigen_EJML(a.asarray())
     w = MIArray(r[0])
@@ -194,10 +283,13 @@ def inv(a):
     '''
     Compute the (multiplicative) inverse of a matrix.
     
-    :param a: (*array_like*) Input array.
+    :param a: (*array_like*) Input array. Stacked matrices with shape (..., M, M) are inverted
+        for all the leading indices using a thread pool.
     
     :returns: Inverse matrix.
     '''
+    if a.ndim > 2:
+        return MIArray(_batched(LinalgUtil.inv, [a.asarray()], [2], 1)[0])
     r = LinalgUtil.inv(a.asarray())
     return MIArray(r)
     
@@ -220,6 +312,13 @@ def lstsq(a, b):
         Least-squares solution. Return shape matches shape of b.
     residues : (0,) or () or (K,) ndarray
         Sums of residues, squared 2-norm for each column in b - a x.
+        
+    Stacked systems ``a`` with shape (..., M, N) and ``b`` with shape (..., M) are solved for
+    all the leading indices using a thread pool.
     '''
+    if a.ndim > 2:
+        r = _batched(lambda x, y: StatsUtil.multipleLineRegress_OLS(y, x, True), \
+            [a.asarray(), b.asarray()], [2, 1], 2)
+        return MIArray(r[0]), MIArray(r[1])
     r = StatsUtil.multipleLineRegress_OLS(b.asarray(), a.asarray(), True)
     return MIArray(r[0]), MIArray(r[1])
\ No newline at end of file
@@ -0,0 +1,260 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Truncated singular value decomposition
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+import warnings
+
+from ucar.ma2 import Array, DataType
+from java.util import Random
+import jarray
+
+from mipylib.numeric.miarray import MIArray
+import mipylib.numeric.gemm as gemm
+import mipylib.miutil as miutil
+
+__all__ = ['svds']
+
+def _matrix(v, m, n):
+    return Array.factory(DataType.DOUBLE, [m, n], v)
+
+def _pdot(a, b, nthread=None):
+    '''
+    Matrix product ``a b``.
+    '''
+    return gemm.gemm(a, b, False, False, nthread)
+
+def _pdott(a, b, nthread=None):
+    '''
+    Matrix product ``a.T b`` without forming the transpose.
+    '''
+    return gemm.gemm(a, b, True, False, nthread)
+
+def _symeig(g, n):
+    '''
+    Eigen decomposition of a small symmetric matrix by cyclic Jacobi rotations.
+
+    :param g: (*list*) Flat row-major matrix.
+    :param n: (*int*) Matrix order.
+
+    :returns: Eigenvalues in descending order and the eigenvector (column) matrix as a list of
+        rows.
+    '''
+    a = [[g[i * n + j] for j in range(n)] for i in range(n)]
+    v = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    for sweep in range(100):
+        off = 0.0
+        diag = 0.0
+        for i in range(n):
+            diag += a[i][i] * a[i][i]
+            for j in range(i + 1, n):
+                off += a[i][j] * a[i][j]
+        if off <= 1e-30 * diag or off == 0:
+            break
+        for p in range(n - 1):
+            for q in range(p + 1, n):
+                apq = a[p][q]
+                if apq == 0:
+                    continue
+                theta = (a[q][q] - a[p][p]) / (2 * apq)
+                t = 1.0 / (abs(theta) + math.sqrt(theta * theta + 1))
+                if theta < 0:
+                    t = -t
+                c = 1.0 / math.sqrt(t * t + 1)
+                s = t * c
+                for k in range(n):
+                    akp = a[k][p]
+                    akq = a[k][q]
+                    a[k][p] = c * akp - s * akq
+                    a[k][q] = s * akp + c * akq
+                ap = a[p]
+                aq = a[q]
+                for k in range(n):
+                    apk = ap[k]
+                    aqk = aq[k]
+                    ap[k] = c * apk - s * aqk
+                    aq[k] = s * apk + c * aqk
+                for k in range(n):
+                    vkp = v[k][p]
+                    vkq = v[k][q]
+                    v[k][p] = c * vkp - s * vkq
+                    v[k][q] = s * vkp + c * vkq
+    order = sorted(range(n), key=lambda i: -a[i][i])
+    vals = [a[i][i] for i in order]
+    vecs = [[v[k][i] for i in order] for k in range(n)]
+    return vals, vecs
+
+def _orth1(y, nthread):
+    m, l = y.getShape()
+    vals, vecs = _symeig(miutil.todouble(_pdott(y, y, nthread)), l)
+    tol = max(vals[0], 0) * 1e-12
+    r = len([v for v in vals if v > tol])
+    if r == 0:
+        r = 1
+    w = jarray.zeros(l * r, 'd')
+    for i in range(l):
+        for j in range(r):
+            w[i * r + j] = vecs[i][j] / math.sqrt(vals[j]) if vals[j] > tol else 0.0
+    return _pdot(y, _matrix(w, l, r), nthread)
+
+def _orth(y, nthread):
+    '''
+    Orthonormal basis of the columns of a tall matrix from the eigen decomposition of its Gram
+    matrix, repeated once to restore the orthogonality lost to rounding.
+    '''
+    return _orth1(_orth1(y, nthread), nthread)
+
+def _vecmatrix(vecs, k):
+    n = len(vecs)
+    w = jarray.zeros(n * k, 'd')
+    for i in range(n):
+        for j in range(k):
+            w[i * k + j] = vecs[i][j]
+    return _matrix(w, n, k)
+
+def _randomized(a, k, oversample, niter, rnd, nthread):
+    m, n = a.getShape()
+    l = min(k + oversample, m, n)
+    om = jarray.zeros(n * l, 'd')
+    for i in range(n * l):
+        om[i] = rnd.nextGaussian()
+    y = _pdot(a, _matrix(om, n, l), nthread)
+    for it in range(niter):
+        z = _orth(_pdott(a, _orth(y, nthread), nthread), nthread)
+        y = _pdot(a, z, nthread)
+    q = _orth(y, nthread)
+    r = q.getShape()[1]
+    #B = Q.T A is kept transposed, B B.T gives the squared singular values
+    bt = _pdott(a, q, nthread)
+    vals, vecs = _symeig(miutil.todouble(_pdott(bt, bt, nthread)), r)
+    k = min(k, r)
+    w = _vecmatrix(vecs, k)
+    s = [math.sqrt(max(v, 0.0)) for v in vals[:k]]
+    return _pdot(q, w, nthread), s, _pdot(bt, w, nthread)
+
+def _lanczos(a, k, ncv, rnd, nthread, tol=1e-6):
+    m, n = a.getShape()
+    if m <= n:
+        dim = m
+        op = lambda v: _pdot(a, _pdott(a, v, nthread), nthread)
+    else:
+        dim = n
+        op = lambda v: _pdott(a, _pdot(a, v, nthread), nthread)
+    if ncv is None:
+        ncv = max(2 * k + 1, k + 20)
+    ncv = min(ncv, dim)
+    #Lanczos vectors are the rows of a flat buffer
+    vb = jarray.zeros(ncv * dim, 'd')
+    v = [rnd.nextGaussian() for i in range(dim)]
+    nv = math.sqrt(sum([x * x for x in v]))
+    for i in range(dim):
+        vb[i] = v[i] / nv
+    alpha = []
+    beta = []
+    j = 0
+    while True:
+        v = vb[j * dim:(j + 1) * dim]
+        w = miutil.todouble(op(_matrix(v, dim, 1)))
+        al = 0.0
+        for i in range(dim):
+            al += v[i] * w[i]
+        alpha.append(al)
+        #Full reorthogonalization against all the Lanczos vectors
+        vj = _matrix(vb, ncv, dim).section([0, 0], [j + 1, dim]).copy()
+        for rep in range(2):
+            c = _pdot(vj, _matrix(w, dim, 1), nthread)
+            corr = miutil.todouble(_pdott(vj, c, nthread))
+            for i in range(dim):
+                w[i] -= corr[i]
+        j += 1
+        b = math.sqrt(sum([x * x for x in w]))
+        if j == ncv:
+            break
+        if b <= 1e-10 * max([abs(x) for x in alpha]):
+            break
+        beta.append(b)
+        for i in range(dim):
+            vb[j * dim + i] = w[i] / b
+    nt = j
+    t = [0.0] * (nt * nt)
+    for i in range(nt):
+        t[i * nt + i] = alpha[i]
+        if i < nt - 1:
+            t[i * nt + i + 1] = beta[i]
+            t[(i + 1) * nt + i] = beta[i]
+    vals, vecs = _symeig(t, nt)
+    k = min(k, nt)
+    #Residual norm of a Ritz pair of the Gram operator: b * |last component of its vector|
+    res = max([b * abs(vecs[nt - 1][i]) for i in range(k)])
+    if res > tol * max(vals[0], 0.0):
+        warnings.warn('Lanczos did not converge: residual %.3g of the leading %d modes is above '
+            '%.3g of the largest eigenvalue, increase ncv' % (res, k, tol), RuntimeWarning)
+    s = [math.sqrt(max(v, 0.0)) for v in vals[:k]]
+    vt = _matrix(vb, ncv, dim).section([0, 0], [nt, dim]).copy()
+    y = _pdott(vt, _vecmatrix(vecs, k), nthread)
+    if m <= n:
+        return y, s, _pdott(a, y, nthread)
+    #Right singular vectors: U = A V / s
+    us = miutil.todouble(_pdot(a, y, nthread))
+    vs = miutil.todouble(y)
+    for i in range(m):
+        for j in range(k):
+            us[i * k + j] = us[i * k + j] / s[j] if s[j] > 0 else 0.0
+    for i in range(n):
+        for j in range(k):
+            vs[i * k + j] *= s[j]
+    return _matrix(us, m, k), s, _matrix(vs, n, k)
+
+def _svds(a, k, method='randomized', oversample=10, niter=2, ncv=None, seed=None, \
+    nthread=None, tol=1e-6):
+    '''
+    Truncated SVD of a double matrix.
+
+    :returns: U (m, k) array, singular value list and V*S (n, k) array.
+    '''
+    rnd = Random() if seed is None else Random(seed)
+    if method == 'randomized':
+        return _randomized(a, k, oversample, niter, rnd, nthread)
+    elif method == 'lanczos':
+        return _lanczos(a, k, ncv, rnd, nthread, tol)
+    else:
+        raise ValueError('Unknown method: ' + str(method))
+
+def svds(a, k=6, method='randomized', oversample=10, niter=2, ncv=None, seed=None, \
+    nthread=None, tol=1e-6):
+    '''
+    Compute the largest k singular values and vectors of a matrix without the full
+    decomposition. Matrix products are split among threads.
+
+    :param a: (*array_like*) Matrix to decompose with shape (M, N).
+    :param k: (*int*) Number of singular values and vectors. Default is 6.
+    :param method: (*string*) [randomized | lanczos]. ``randomized``: randomized range finder
+        with power iterations; ``lanczos``: Lanczos iteration with full reorthogonalization on
+        the smaller Gram matrix, which is never formed. Default is ``randomized``.
+    :param oversample: (*int*) Extra random vectors of the randomized method. Default is 10.
+    :param niter: (*int*) Power iterations of the randomized method. Default is 2.
+    :param ncv: (*int*) Lanczos vector number. Default is ``None``, means ``max(2k+1, k+20)``.
+    :param seed: (*int*) Random seed. Default is ``None``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    :param tol: (*float*) Relative residual tolerance of the Lanczos method, a
+        ``RuntimeWarning`` is issued when the leading k modes do not reach it. Default is 1e-6.
+
+    :returns: U (M, k), s (k,) in non-increasing order and Vh (k, N).
+    '''
+    if isinstance(a, MIArray):
+        a = a.asarray()
+    elif not isinstance(a, Array):
+        a = MIArray(a).asarray()
+    m, n = a.getShape()
+    a = _matrix(miutil.todouble(a), m, n)
+    u, s, vs = _svds(a, k, method, oversample, niter, ncv, seed, nthread, tol)
+    k = len(s)
+    vh = miutil.todouble(vs.transpose(0, 1).copy())
+    for j in range(k):
+        for i in range(n):
+            vh[j * n + i] = vh[j * n + i] / s[j] if s[j] > 0 else 0.0
+    return MIArray(u), MIArray(Array.factory(DataType.DOUBLE, [k], jarray.array(s, 'd'))), \
+        MIArray(_matrix(vh, k, n))
\ No newline at end of file
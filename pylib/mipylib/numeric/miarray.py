@@ -11,6 +11,7 @@ from org.meteoinfo.math import Complex
 from org.meteoinfo.math.linalg import LinalgUtil
 from ucar.ma2 import Array, Range, MAMath
 import jarray
+import gemm
 import numbers
 
 #import milayer
@@ -33,7 +34,7 @@ class MIArray(object):
             s1.append(s[i])
         self._shape = tuple(s1)
         self.dtype = array.getDataType()
-        self.size = int(self.array.getSize())
+        self.size = int(array.getSize())
         #self.idx = -1
         self.iterator = array.getIndexIterator()
         if self.ndim > 0:
@@ -646,17 +647,29 @@ class MIArray(object):
         '''
         return MIArray(ArrayMath.sign(self.array))
         
-    def dot(self, other):
+    def dot(self, other, transa=False, transb=False, nthread=None):
         """
-        Matrix multiplication.
+        Matrix multiplication. Large products of two matrices are computed in tiles by a thread
+        pool.
         
         :param other: (*2D or 1D Array*) Matrix or vector b.
+        :param transa: (*boolean*) Use the transpose of this matrix without forming it. Default 
+            is ``False``.
+        :param transb: (*boolean*) Use the transpose of ``other`` without forming it. Default is 
+            ``False``.
+        :param nthread: (*int*) Thread number of large matrix products. Default is ``None``, 
+            means the processor number.
         
         :returns: Result Matrix or vector.
         """  
         if isinstance(other, list):
             other = array(other)
-        r = ArrayMath.dot(self.array, other.array)
+        if self.ndim == 2 and other.ndim == 2:
+            r = gemm.gemm(self.array, other.array, transa, transb, nthread)
+        else:
+            a = self.T if transa else self
+            b = other.T if transb else other
+            r = ArrayMath.dot(a.array, b.array)
         return MIArray(r)
             
     def aslist(self):
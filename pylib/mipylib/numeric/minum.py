@@ -17,6 +17,17 @@ from ucar.ma2 import Array
 from dimarray import PyGridData, DimArray, PyStationData
 from miarray import MIArray
 from mitable import PyTableData
+from kdtree import KDTree
+from interpweights import InterpWeights, interp_weights
+from gridinterp import interpn_points
+from rasterize import polymask
+import rasterize
+import trend
+import gemm
+from filters import uniform_filter, moving_sum, moving_std, moving_min, moving_max, rolling
+import filters
+import kdtree
+import mipylib.miutil as miutil
 
 from java.lang import Math, Double, Float
 from java.util import Calendar
@@ -33,12 +44,12 @@ __all__ = [
     'atleast_1d','atleast_2d','atan','atan2','ave_month','histogram','broadcast_to','cdiff','concatenate',
     'corrcoef','cos','degrees','delete','delnan','diag','dim_array','datatable','dot','empty','exp','eye','fmax','fmin','full',
     'griddata','hcurl','hdivg','hstack','identity','interp2d',
-    'interpn','isarray','isnan','linint2','linregress','linspace','log','log10',
-    'logspace','magnitude','max','maximum','mean','median','meshgrid','min','minimum','monthname',
-    'nonzero','ones','ones_like','pol2cart','polyval','power',
+    'interpn','interp_weights','InterpWeights','isarray','isnan','KDTree','linint2','linregress','linspace','log','log10',
+    'logspace','magnitude','max','maximum','mean','median','meshgrid','min','minimum','monthname','moving_max','moving_min','moving_std','moving_sum',
+    'nonzero','ones','ones_like','pol2cart','polymask','polyval','power',
     'radians','reshape','repeat',
-    'rolling_mean','rot90','sin','smooth5','smooth9','sort','squeeze','argsort','sqrt','std','sum','tan',
-    'tile','transpose','trapz','vdot','unravel_index','var','vstack',
+    'rolling','rolling_mean','rot90','sin','smooth5','smooth9','sort','squeeze','argsort','sqrt','std','sum','tan',
+    'tile','transpose','trapz','uniform_filter','vdot','unravel_index','var','vstack',
     'where','zeros','zeros_like'
     ]
 
@@ -1547,12 +1558,16 @@ def hstack(tup):
         return concatenate(arrs, 1)
 
                 
-def dot(a, b):
+def dot(a, b, transa=False, transb=False, nthread=None):
     """
-    Matrix multiplication.
+    Matrix multiplication. Large products of two matrices are computed in tiles by a thread pool.
     
     :param a: (*2D Array*) Matrix a.
     :param b: (*2D or 1D Array*) Matrix or vector b.
+    :param transa: (*boolean*) Use the transpose of ``a`` without forming it. Default is ``False``.
+    :param transb: (*boolean*) Use the transpose of ``b`` without forming it. Default is ``False``.
+    :param nthread: (*int*) Thread number of large matrix products. Default is ``None``, means the
+        processor number.
     
     :returns: Result Matrix or vector.
     """
@@ -1563,7 +1578,14 @@ def dot(a, b):
         a = array(a)
     if isinstance(b, list):
         b = array(b)
-    r = ArrayMath.dot(a.asarray(), b.asarray())
+    if a.ndim == 2 and b.ndim == 2:
+        r = gemm.gemm(a.asarray(), b.asarray(), transa, transb, nthread)
+    else:
+        if transa:
+            a = a.T
+        if transb:
+            b = b.T
+        r = ArrayMath.dot(a.asarray(), b.asarray())
     return MIArray(r)
     
 def vdot(a, b):
@@ -1713,16 +1735,22 @@ def corrcoef(x, y):
     r = array([[1, a], [b, 1]])
     return r
         
-def linregress(x, y):
+def linregress(x, y, axis=None, nthread=None):
     '''
     Calculate a linear least-squares regression for two sets of measurements.
     
     :param x, y: (*array_like*) Two sets of measurements. Both arrays should have the same length.
+    :param axis: (*int*) Axis of the measurements. Default is ``None``, means one set of measurements.
+        If set, the regressions of all the lines along the axis are calculated and the results are
+        arrays keeping the other dimensions. ``x`` can be one dimension with the axis length.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
     :returns: Result slope, intercept, relative coefficient, two-sided p-value for a hypothesis test 
         whose null hypothesis is that the slope is zero, standard error of the estimated gradient, 
         validate data number (remove NaN values).
     '''
+    if not axis is None:
+        return trend.linregress(x, y, axis, nthread)
     if isinstance(x, list):
         x = array(x)
     if isinstance(y, list):
@@ -1841,19 +1869,27 @@ def trapz(y, x=None, dx=1.0, axis=-1):
                     dims.append(y.dims[i])
             return DimArray(MIArray(r), dims, y.fill_value, y.proj)
             
-def rolling_mean(x, window, center=False):
+def rolling_mean(x, window, center=False, running=False):
     '''
     Moving average function
     
-    :param x: (*array_like*) Input data array. Must be vector (one dimension).
+    :param x: (*array_like*) Input data array. Must be vector (one dimension), use ``rolling``
+        for multi-dimensional arrays.
     :param window: (*int*) Size of the moving window.
     :param center: (*boolean*) Set the labels at the center of the window. Default is ``False``.
+    :param running: (*boolean*) Use running sums, the cost does not depend on the window size.
+        NaN values and the edges may be handled differently from the default stencil loops.
+        Default is ``False``.
     
     :returns: (*array_like*) Moving averaged array.
     '''
     if isinstance(x, list):
         x = array(x)
-    r = ArrayMath.rolling_mean(x.asarray(), window, center)
+    if running:
+        #Full windows only, a window with NaN is NaN
+        r = filters.rolling(x, window, center=center).mean().asarray()
+    else:
+        r = ArrayMath.rolling_mean(x.asarray(), window, center)
     return MIArray(r)  
     
 def smooth5(x):
@@ -2059,6 +2095,8 @@ def linint2(*args, **kwargs):
     :param z: (*array_like*) Value array of the sample data (muti-dimension, last two dimensions are y and x).
     :param xq: (*array_like*) X coordinate array of the query data (one dimension).
     :param yq: (*array_like*) Y coordinate array of the query data (one dimension).
+    :param nthread: (*int*) Thread number to interpolate the 2-D slabs of the leading dimensions in
+        parallel. Default is ``None``, means the processor number.
     
     :returns: (*array_like*) Interpolated array.
     """
@@ -2079,7 +2117,8 @@ def linint2(*args, **kwargs):
     z = array(z).array
     xq = array(xq).array
     yq = array(yq).array
-    r = ArrayUtil.linint2(z, x, y, xq, yq)
+    nthread = kwargs.pop('nthread', None)
+    r = miutil.pslab(lambda s: ArrayUtil.linint2(s, x, y, xq, yq), z, 2, nthread)
     return MIArray(r)
     
 def interp2d(*args, **kwargs):
@@ -2088,17 +2127,19 @@ def interp2d(*args, **kwargs):
     
     :param x: (*array_like*) X coordinate array of the sample points.
     :param y: (*array_like*) Y coordinate array of the sample points.
-    :param z: (*array_like*) 2-D value array of the sample points.
+    :param z: (*array_like*) Value array of the sample points (last two dimensions are y and x).
     :param xq: (*array_like*) X coordinate array of the query points.
     :param yq: (*array_like*) Y coordinate array of the query points.
     :param kind: (*string*) The kind of the interpolation method. ['linear' | 'nearest'].
+    :param nthread: (*int*) Thread number to interpolate the 2-D slabs of the leading dimensions in
+        parallel. Default is ``None``, means the processor number.
     
     :returns: (*array_like*) Interpolated array.
     """
     if len(args) == 3:
         z = args[0]
-        x = z.dimvalue(1)
-        y = z.dimvalue(0)
+        x = z.dimvalue(z.ndim - 1)
+        y = z.dimvalue(z.ndim - 2)
         xq = args[1]
         yq = args[2]
     else:
@@ -2113,22 +2154,27 @@ def interp2d(*args, **kwargs):
     xq = array(xq).array
     yq = array(yq).array
     kind = kwargs.pop('kind', 'linear')
+    nthread = kwargs.pop('nthread', None)
     if kind == 'neareast':
-        r = ArrayUtil.resample_Neighbor(z, x, y, xq, yq)
+        r = miutil.pslab(lambda s: ArrayUtil.resample_Neighbor(s, x, y, xq, yq), z, 2, nthread)
     else:
-        r = ArrayUtil.resample_Bilinear(z, x, y, xq, yq)
+        r = miutil.pslab(lambda s: ArrayUtil.resample_Bilinear(s, x, y, xq, yq), z, 2, nthread)
     if r.getSize() == 1:
         return r.getDouble(0)
     else:
         return MIArray(r)
 
-def interpn(points, values, xi):
+def interpn(points, values, xi, nthread=None):
     """
     Multidimensional interpolation on regular grids.
     
     :param points: (*list*) The points defining the regular grid in n dimensions.
-    :param values: (*array_like*) The data on the regular grid in n dimensions.
-    :param xi: (*array_like*) The coordinates to sample the gridded data at.
+    :param values: (*array_like*) The data on the regular grid in n dimensions. Extra leading dimensions
+        are interpolated slab by slab in parallel.
+    :param xi: (*array_like*) The coordinates to sample the gridded data at. An array with shape
+        (npoints, ndim) is interpolated point by point in parallel without per point list building.
+    :param nthread: (*int*) Thread number of the leading dimension slabs or the sample points. Default
+        is ``None``, means the processor number.
     
     :returns: (*float*) Interpolated value at input coordinates.
     """
@@ -2137,6 +2183,11 @@ def interpn(points, values, xi):
         if isinstance(p, (list,tuple)):
             p = array(p)
         npoints.append(p.array)
+    nd = len(npoints)
+    
+    if isinstance(xi, MIArray) and xi.ndim == 2 and xi.shape[1] == nd:
+        r = miutil.pslab(lambda s: interpn_points(npoints, s, xi, nthread), values.array, nd, nthread)
+        return MIArray(r)
         
     if isinstance(xi, (list, tuple)):
         if isinstance(xi[0], MIArray):
@@ -2151,8 +2202,20 @@ def interpn(points, values, xi):
                 nxi.append(x)
             nxi = array(nxi).array        
     else:
-        nxi = nxi.array
-    r = ArrayUtil.interpn(npoints, values.array, nxi)
+        nxi = xi.array
+    if values.ndim > nd:
+        scalar = []
+        def func(s):
+            r = ArrayUtil.interpn(npoints, s, nxi)
+            if isinstance(r, Array):
+                return r
+            scalar.append(True)
+            return array([r]).array
+        r = miutil.pslab(func, values.array, nd, nthread)
+        if len(scalar) > 0:
+            r = r.reshape(list(r.getShape())[:values.ndim - nd])
+    else:
+        r = ArrayUtil.interpn(npoints, values.array, nxi)
     if isinstance(r, Array):
         return MIArray(r)
     else:
@@ -2162,7 +2225,9 @@ def griddata(points, values, xi=None, **kwargs):
     '''
     Interpolate scattered data to grid data.
     
-    :param points: (*list*) The list contains x and y coordinate arrays of the scattered data.
+    :param points: (*list or KDTree*) The list contains x and y coordinate arrays of the scattered data,
+        or a k-d tree built from them. A k-d tree is reused by 'idw', 'cressman', 'barnes' and 'nearest'
+        methods as with ``tree=True``, the other methods use its coordinates.
     :param values: (*array_like*) The scattered data array.
     :param xi: (*list*) The list contains x and y coordinate arrays of the grid data. Default is ``None``,
         the grid x and y coordinate size were both 500.
@@ -2175,12 +2240,34 @@ def griddata(points, values, xi=None, **kwargs):
         is ``None`` in 'idw' method, means no raduis was used. Default is ``[10, 7, 4, 2, 1]`` in cressman 
         method.
     :param convexhull: (*boolean*) If the convexhull will be used to mask result grid data. Default is ``False``.
+    :param scanline: (*boolean*) Mask with the convexhull by scanline rasterization instead of the point in
+        polygon tests of each grid cell, which is faster for large grids. Cells on the convexhull boundary
+        may be classified differently. Default is ``False``.
+    :param tree: (*boolean*) Use the k-d tree interpolation for 'idw', 'cressman', 'barnes' and 'nearest'
+        methods, which is faster for large station sets. The k-d tree based 'cressman' and 'barnes' analyses
+        search the neighbours of the grid cells once and reuse them in all passes, their results may differ
+        slightly from the Java analyses. Default is ``False``.
+    :param nthread: (*int*) Thread number of k-d tree interpolation. Default is ``None``, means the processor
+        number.
     
     :returns: (*array*) Interpolated grid data (2-D array)
     '''
     method = kwargs.pop('method', 'idw')
+    tree = kwargs.pop('tree', False)
+    if isinstance(points, KDTree):
+        tree = points
+        points = tree.points
     x_s = points[0]
     y_s = points[1]
+    if not isinstance(x_s, MIArray):
+        x_s = array(x_s)
+    if not isinstance(y_s, MIArray):
+        y_s = array(y_s)
+    if not method in ['idw', 'cressman', 'barnes', 'nearest'] or tree is False:
+        tree = None
+    elif tree is True:
+        tree = KDTree([x_s, y_s])
+    nthread = kwargs.pop('nthread', None)
     if xi is None:
         xn = 500
         yn = 500
@@ -2194,7 +2281,9 @@ def griddata(points, values, xi=None, **kwargs):
     if method == 'idw':
         pnum = kwargs.pop('pointnum', 2)
         radius = kwargs.pop('radius', None)
-        if radius is None:
+        if not tree is None:
+            r = kdtree.idw_grid(tree, values, x_g, y_g, pnum, radius, nthread)
+        elif radius is None:
             r = ArrayUtil.interpolation_IDW_Neighbor(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), pnum)
         else:
             r = ArrayUtil.interpolation_IDW_Radius(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), pnum, radius)
@@ -2202,12 +2291,19 @@ def griddata(points, values, xi=None, **kwargs):
         radius = kwargs.pop('radius', [10, 7, 4, 2, 1])
         if isinstance(radius, MIArray):
             radius = radius.aslist()
-        r = InterpUtil.cressman(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), radius)
+        if tree is None:
+            r = InterpUtil.cressman(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), radius)
+        else:
+            r = kdtree.cressman_grid(tree, values, x_g, y_g, radius, nthread)
     elif method == 'barnes':
         kappa = kwargs.pop('kappa', 1)
         gamma = kwargs.pop('gamma', 1)
         radius = kwargs.pop('radius', [10, 7, 4, 2, 1])
-        if radius is None:
+        if not tree is None:
+            if isinstance(radius, MIArray):
+                radius = radius.aslist()
+            r = kdtree.barnes_grid(tree, values, x_g, y_g, radius, kappa, gamma, nthread)
+        elif radius is None:
             r = InterpUtil.barnes(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), kappa, gamma)
         else:
             if isinstance(radius, MIArray):
@@ -2215,7 +2311,10 @@ def griddata(points, values, xi=None, **kwargs):
             r = InterpUtil.barnes(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), radius, kappa, gamma)
     elif method == 'nearest':
         radius = kwargs.pop('radius', inf)
-        r = ArrayUtil.interpolation_Nearest(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), radius)
+        if tree is None:
+            r = ArrayUtil.interpolation_Nearest(x_s.aslist(), y_s.aslist(), values, x_g.aslist(), y_g.aslist(), radius)
+        else:
+            r = kdtree.nearest_grid(tree, values, x_g, y_g, radius, nthread)
     elif method == 'inside':
         r = ArrayUtil.interpolation_Inside(x_s.asarray(), y_s.asarray(), values, x_g.asarray(), y_g.asarray(), True)
     elif method == 'inside_max':
@@ -2231,10 +2330,14 @@ def griddata(points, values, xi=None, **kwargs):
         return None
     
     convexhull = kwargs.pop('convexhull', False)
+    scanline = kwargs.pop('scanline', False)
     if convexhull:
         polyshape = ArrayUtil.convexHull(x_s.asarray(), y_s.asarray())
-        x_gg, y_gg = meshgrid(x_g, y_g)
-        r = ArrayMath.maskout(r, x_gg.array, y_gg.array, [polyshape])
+        if scanline:
+            r = ArrayMath.mul(r, rasterize.maskfactor(x_g, y_g, [polyshape], True, False))
+        else:
+            x_gg, y_gg = meshgrid(x_g, y_g)
+            r = ArrayMath.maskout(r, x_gg.array, y_gg.array, [polyshape])
         return MIArray(r), x_g, y_g
     else:
         return MIArray(r), x_g, y_g
@@ -0,0 +1,125 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Cached reprojection plans
+# Note: Jython
+#-----------------------------------------------------
+
+import os
+import threading
+from collections import OrderedDict
+
+from org.meteoinfo.data import ArrayUtil
+from ucar.ma2 import Array
+from java.lang import String
+from java.nio import ByteBuffer
+from java.security import MessageDigest
+
+from miarray import MIArray
+from interpweights import InterpWeights, interp_weights
+import mipylib.miutil as miutil
+
+# Maximum number of plans kept in memory
+maxplans = 32
+
+_plans = OrderedDict()
+_lock = threading.Lock()
+
+def _asarray(a):
+    if isinstance(a, MIArray):
+        return a.asarray()
+    elif isinstance(a, Array):
+        return a
+    else:
+        return MIArray(a).asarray()
+
+def _digest(md, a):
+    v = miutil.todouble(a)
+    bb = ByteBuffer.allocate(8 * len(v))
+    bb.asDoubleBuffer().put(v)
+    md.update(bb.array())
+    md.update(String(str(list(a.getShape()))).getBytes('UTF-8'))
+
+def plankey(xx, yy, x, y, fromproj, toproj, method='bilinear'):
+    '''
+    Get the key of a reprojection plan.
+
+    :param xx: (*array_like*) X coordinates of the source grid.
+    :param yy: (*array_like*) Y coordinates of the source grid.
+    :param x: (*array_like*) X coordinates of the target.
+    :param y: (*array_like*) Y coordinates of the target.
+    :param fromproj: (*ProjectionInfo*) Source projection.
+    :param toproj: (*ProjectionInfo*) Target projection.
+    :param method: (*string*) Interpolation method.
+
+    :returns: (*string*) Plan key.
+    '''
+    md = MessageDigest.getInstance('MD5')
+    for a in [xx, yy, x, y]:
+        _digest(md, _asarray(a))
+    s = fromproj.toProj4String() + '|' + toproj.toProj4String() + '|' + method
+    md.update(String(s).getBytes('UTF-8'))
+    return ''.join(['%02x' % (b & 0xff) for b in md.digest()])
+
+def _build(xx, yy, x, y, fromproj, toproj, method):
+    x = _asarray(x)
+    y = _asarray(y)
+    if x.getRank() == 1:
+        shape = [int(y.getSize()), int(x.getSize())]
+        x, y = ArrayUtil.meshgrid(x, y)
+    else:
+        shape = list(x.getShape())
+    pr = ArrayUtil.reproject(x, y, toproj, fromproj)
+    if method != 'bilinear':
+        method = 'grid_nearest'
+    w = interp_weights([xx, yy], [pr[0], pr[1]], method, grid=False)
+    w.shape = shape
+    return w
+
+def reproject_plan(xx, yy, x, y, fromproj, toproj, method='bilinear', cachedir=None):
+    '''
+    Get the reprojection plan from a source grid to target coordinates. The plan holds the
+    source indices and weights of the target cells, it is built once and kept in memory
+    (and in ``cachedir`` if set) for the same source coordinates, target coordinates,
+    projections and method.
+
+    :param xx: (*array_like*) X coordinates of the source grid (one dimension).
+    :param yy: (*array_like*) Y coordinates of the source grid (one dimension).
+    :param x: (*array_like*) X coordinates of the target, one dimension for a target grid.
+    :param y: (*array_like*) Y coordinates of the target, one dimension for a target grid.
+    :param fromproj: (*ProjectionInfo*) Source projection.
+    :param toproj: (*ProjectionInfo*) Target projection.
+    :param method: (*string*) Interpolation method: ``bilinear`` or ``neareast``.
+    :param cachedir: (*string*) Directory of persistent plans. Default is ``None``.
+
+    :returns: (*InterpWeights*) The plan as interpolation weights.
+    '''
+    key = plankey(xx, yy, x, y, fromproj, toproj, method)
+    with _lock:
+        w = _plans.pop(key, None)
+        if not w is None:
+            _plans[key] = w
+            return w
+    fn = None
+    if not cachedir is None:
+        fn = os.path.join(cachedir, key + '.wts')
+        if os.path.isfile(fn):
+            w = InterpWeights.load(fn)
+    if w is None:
+        w = _build(xx, yy, x, y, fromproj, toproj, method)
+        if not fn is None:
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir)
+            w.save(fn)
+    with _lock:
+        _plans[key] = w
+        while len(_plans) > maxplans:
+            _plans.popitem(last=False)
+    return w
+
+def clear_plans():
+    '''
+    Remove all reprojection plans kept in memory.
+    '''
+    with _lock:
+        _plans.clear()
\ No newline at end of file
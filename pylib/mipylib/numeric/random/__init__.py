@@ -1 +1,2 @@
-from .random import *
\ No newline at end of file
+from .random import *
+from .generator import *
\ No newline at end of file
@@ -0,0 +1,255 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Splittable random generators with parallel filling
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+
+from org.apache.commons.math3.special import Gamma
+from ucar.ma2 import Array, DataType
+from java.util import SplittableRandom
+import jarray
+
+from mipylib.numeric.miarray import MIArray
+import mipylib.miutil as miutil
+
+__all__ = ['Generator','default_rng']
+
+# Element number of a block, each block of an array is filled from its own stream
+block = 2 ** 16
+
+def _normal(rnd):
+    '''
+    Standard normal pair by the Marsaglia polar method.
+    '''
+    while True:
+        u = 2 * rnd.nextDouble() - 1
+        v = 2 * rnd.nextDouble() - 1
+        s = u * u + v * v
+        if s < 1 and s > 0:
+            f = math.sqrt(-2 * math.log(s) / s)
+            return u * f, v * f
+
+def _poisson(lam, rnd):
+    '''
+    Poisson sample: multiplication method for small lam, otherwise the transformed rejection
+    method (PTRS) of Hormann.
+    '''
+    if lam == 0:
+        return 0
+    if lam < 10:
+        e = math.exp(-lam)
+        k = 0
+        p = rnd.nextDouble()
+        while p > e:
+            k += 1
+            p *= rnd.nextDouble()
+        return k
+    slam = math.sqrt(lam)
+    loglam = math.log(lam)
+    b = 0.931 + 2.53 * slam
+    a = -0.059 + 0.02483 * b
+    invalpha = 1.1239 + 1.1328 / (b - 3.4)
+    vr = 0.9277 - 3.6224 / (b - 2)
+    while True:
+        u = rnd.nextDouble() - 0.5
+        v = rnd.nextDouble()
+        us = 0.5 - abs(u)
+        k = int(math.floor((2 * a / us + b) * u + lam + 0.43))
+        if us >= 0.07 and v <= vr:
+            return k
+        if k < 0 or (us < 0.013 and v > us):
+            continue
+        if math.log(v) + math.log(invalpha) - math.log(a / (us * us) + b) <= \
+            -lam + k * loglam - Gamma.logGamma(k + 1.0):
+            return k
+
+def _shape(args):
+    if len(args) == 1 and isinstance(args[0], (list, tuple)):
+        return list(args[0])
+    return list(args)
+
+class Generator(object):
+    '''
+    Random number generator with its own state, backed by the splittable SplitMix64 generator
+    (``java.util.SplittableRandom``). Arrays are split into fixed size blocks, each block is
+    filled by a thread from its own stream split from the generator, so the results only
+    depend on the seed and the call sequence, not on the thread number. A generator must not
+    be shared by threads, use ``spawn`` to get independent generators for the workers.
+
+    :param seed: (*int*) Random seed. Default is ``None``, means a random seed.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    '''
+
+    def __init__(self, seed=None, nthread=None):
+        if isinstance(seed, SplittableRandom):
+            self._rnd = seed
+        elif seed is None:
+            self._rnd = SplittableRandom()
+        else:
+            self._rnd = SplittableRandom(seed)
+        self.nthread = nthread
+
+    def __repr__(self):
+        return 'Generator(SplitMix64)'
+
+    def spawn(self, n):
+        '''
+        Create independent child generators.
+
+        :param n: (*int*) Child number.
+
+        :returns: (*list*) Generators.
+        '''
+        return [Generator(self._rnd.split(), self.nthread) for i in range(n)]
+
+    def _fill(self, shape, func, dtype='d', pairs=False):
+        '''
+        Fill an array block by block, ``func(rnd)`` gives one value (or two values if
+        ``pairs``).
+        '''
+        if isinstance(shape, int):
+            shape = [shape]
+        n = 1
+        for s in shape:
+            n *= s
+        r = jarray.zeros(n, dtype)
+        ranges = [(i, min(i + block, n)) for i in range(0, n, block)]
+        streams = [self._rnd.split() for i in ranges]
+
+        def part(k):
+            rnd = streams[k]
+            i0, i1 = ranges[k]
+            if pairs:
+                for i in range(i0, i1, 2):
+                    u, v = func(rnd)
+                    r[i] = u
+                    if i + 1 < i1:
+                        r[i + 1] = v
+            else:
+                for i in range(i0, i1):
+                    r[i] = func(rnd)
+
+        miutil.pmap(part, [(k,) for k in range(len(ranges))], self.nthread)
+        dt = DataType.INT if dtype == 'i' else DataType.DOUBLE
+        return MIArray(Array.factory(dt, list(shape), r))
+
+    def rand(self, *args):
+        '''
+        Random values in a given shape from a uniform distribution over [0, 1).
+
+        :param d0, d1, ..., dn: (*int*) optional. The dimensions of the returned array. If no
+            argument is given a single Python float is returned.
+
+        :returns: Random values array.
+        '''
+        if len(args) == 0:
+            return self._rnd.nextDouble()
+        return self._fill(_shape(args), lambda rnd: rnd.nextDouble())
+
+    def randn(self, *args):
+        '''
+        Random values in a given shape from the standard normal distribution.
+
+        :param d0, d1, ..., dn: (*int*) optional. The dimensions of the returned array. If no
+            argument is given a single Python float is returned.
+
+        :returns: Random values array.
+        '''
+        if len(args) == 0:
+            return _normal(self._rnd)[0]
+        return self._fill(_shape(args), _normal, pairs=True)
+
+    def randint(self, low, high=None, size=None):
+        '''
+        Random integers from low (inclusive) to high (exclusive).
+
+        :param low: (*int*) Lowest integer, or one above the highest integer if ``high`` is
+            ``None`` (the lowest is 0 then).
+        :param high: (*int*) One above the highest integer. Default is ``None``.
+        :param size: (*int or tuple*) Output shape. Default is ``None``, means a single value.
+
+        :returns: (*int or array*) Random integers.
+        '''
+        if high is None:
+            low, high = 0, low
+        if size is None:
+            return self._rnd.nextInt(low, high)
+        return self._fill(size, lambda rnd: rnd.nextInt(low, high), 'i')
+
+    def poisson(self, lam=1.0, size=None):
+        '''
+        Draw samples from a Poisson distribution.
+
+        :param lam: (*float*) Expectation of interval, should be >= 0.
+        :param size: (*int or tuple*) Output shape. Default is ``None``, means a single value.
+
+        :returns: (*int or array*) Poisson samples.
+        '''
+        if lam < 0:
+            raise ValueError('lam < 0')
+        if size is None:
+            return _poisson(lam, self._rnd)
+        return self._fill(size, lambda rnd: _poisson(lam, rnd), 'i')
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        '''
+        Draw samples from a uniform distribution over [low, high).
+
+        :param low: (*float*) Lower boundary. Default is 0.
+        :param high: (*float*) Upper boundary. Default is 1.
+        :param size: (*int or tuple*) Output shape. Default is ``None``, means a single value.
+
+        :returns: (*float or array*) Uniform samples.
+        '''
+        if size is None:
+            return low + (high - low) * self._rnd.nextDouble()
+        return self._fill(size, lambda rnd: low + (high - low) * rnd.nextDouble())
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        '''
+        Draw samples from a normal distribution.
+
+        :param loc: (*float*) Mean. Default is 0.
+        :param scale: (*float*) Standard deviation. Default is 1.
+        :param size: (*int or tuple*) Output shape. Default is ``None``, means a single value.
+
+        :returns: (*float or array*) Normal samples.
+        '''
+        if size is None:
+            return loc + scale * _normal(self._rnd)[0]
+
+        def func(rnd):
+            u, v = _normal(rnd)
+            return loc + scale * u, loc + scale * v
+        return self._fill(size, func, pairs=True)
+
+    def sample(self, dist, size=None):
+        '''
+        Draw samples from a distribution by the inversion of its cumulative distribution
+        function.
+
+        :param dist: (*RealDistribution*) Apache commons math distribution.
+        :param size: (*int or tuple*) Output shape. Default is ``None``, means a single value.
+
+        :returns: (*float or array*) Samples.
+        '''
+        if size is None:
+            return dist.inverseCumulativeProbability(self._rnd.nextDouble())
+        return self._fill(size, lambda rnd: dist.inverseCumulativeProbability(rnd.nextDouble()))
+
+def default_rng(seed=None, nthread=None):
+    '''
+    Construct a new Generator.
+
+    :param seed: (*int or Generator*) Random seed, a Generator is returned unaltered. Default
+        is ``None``, means a random seed.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: (*Generator*) The generator.
+    '''
+    if isinstance(seed, Generator):
+        return seed
+    return Generator(seed, nthread)
\ No newline at end of file
@@ -0,0 +1,170 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Polygon rasterization with mask caching
+# Note: Jython
+#-----------------------------------------------------
+
+import bisect
+import threading
+from collections import OrderedDict
+
+from ucar.ma2 import Array, DataType
+from java.lang import Double
+import jarray
+
+from miarray import MIArray
+from kdtree import _tolist
+
+nan = Double.NaN
+
+# Maximum number of rasterized masks kept in memory
+maxmasks = 32
+
+_masks = OrderedDict()
+_lock = threading.Lock()
+
+def _rings(polygons):
+    '''
+    Get the ring groups of polygons. A group is the rings (tuples of x and y coordinates) of
+    one polygon, its outline and holes, holes are excluded by the even-odd fill rule within
+    the group.
+    '''
+    groups = []
+    for p in polygons:
+        if isinstance(p, tuple):
+            groups.append(((tuple(_tolist(p[0])), tuple(_tolist(p[1]))),))
+            continue
+        for poly in p.getPolygons():
+            lines = [poly.getOutLine()]
+            if poly.hasHole():
+                lines.extend(poly.getHoleLines())
+            groups.append(tuple([(tuple([pt.X for pt in line]), tuple([pt.Y for pt in line])) \
+                for line in lines]))
+    return tuple(groups)
+
+def _scanline(x, y, groups):
+    '''
+    Rasterize ring groups to a (ny, nx) byte array with scanline fill. A grid cell is inside
+    a group if its center is inside by the even-odd rule, and inside the mask if it is inside
+    any group (union of the polygons).
+    '''
+    nx = len(x)
+    ny = len(y)
+    xrev = nx > 1 and x[0] > x[nx - 1]
+    yrev = ny > 1 and y[0] > y[ny - 1]
+    xs = x[::-1] if xrev else x
+    ys = y[::-1] if yrev else y
+    r = jarray.zeros(nx * ny, 'b')
+    for rings in groups:
+        crossings = {}
+        for px, py in rings:
+            n = len(px)
+            for k in range(n):
+                x1 = px[k]
+                y1 = py[k]
+                x2 = px[(k + 1) % n]
+                y2 = py[(k + 1) % n]
+                if y1 == y2:
+                    continue
+                if y1 > y2:
+                    x1, y1, x2, y2 = x2, y2, x1, y1
+                #Rows with y1 <= y < y2
+                i0 = bisect.bisect_left(ys, y1)
+                i1 = bisect.bisect_left(ys, y2)
+                slope = (x2 - x1) / (y2 - y1)
+                for i in range(i0, i1):
+                    crossings.setdefault(i, []).append(x1 + (ys[i] - y1) * slope)
+        for i, cs in crossings.items():
+            if len(cs) < 2:
+                continue
+            cs.sort()
+            row = (ny - 1 - i if yrev else i) * nx
+            for k in range(0, len(cs) - 1, 2):
+                j0 = bisect.bisect_left(xs, cs[k])
+                j1 = bisect.bisect_left(xs, cs[k + 1])
+                for j in range(j0, j1):
+                    r[row + (nx - 1 - j if xrev else j)] = 1
+    return Array.factory(DataType.BYTE, [ny, nx], r)
+
+def _polymask(x, y, polygons, cache=True):
+    '''
+    Get the mask array and the cached item (``None`` without cache) of polygons.
+    '''
+    if hasattr(polygons, 'shapes'):
+        polygons = polygons.shapes()
+    elif isinstance(polygons, tuple) or not hasattr(polygons, '__iter__'):
+        polygons = [polygons]
+    shapes = []
+    for p in polygons:
+        if hasattr(p, 'shapes'):
+            shapes.extend(p.shapes())
+        elif hasattr(p, 'getShapes'):
+            shapes.extend(p.getShapes())
+        else:
+            shapes.append(p)
+    groups = _rings(shapes)
+    x = _tolist(x)
+    y = _tolist(y)
+    if not cache:
+        return _scanline(x, y, groups), None
+    #Keyed by the geometry, so a changed or new polygon never gets a stale mask
+    key = (tuple(x), tuple(y), groups)
+    with _lock:
+        item = _masks.pop(key, None)
+        if not item is None:
+            _masks[key] = item
+            return item[0], item
+    r = _scanline(x, y, groups)
+    item = (r, {})
+    with _lock:
+        _masks[key] = item
+        while len(_masks) > maxmasks:
+            _masks.popitem(last=False)
+    return r, item
+
+def polymask(x, y, polygons, cache=True):
+    '''
+    Rasterize polygons to a mask grid using scanline fill. Masks are kept in an LRU cache
+    keyed by the grid coordinates and the polygon vertices, so masking every time step with
+    the same polygons rasterizes them once.
+
+    :param x: (*array_like*) X coordinates of the grid (one dimension).
+    :param y: (*array_like*) Y coordinates of the grid (one dimension).
+    :param polygons: (*list*) Polygon list. A polygon is a PolygonShape object or a tuple of x
+        and y coordinate arrays of its vertices. A layer is taken as the list of its shapes.
+    :param cache: (*boolean*) Use the mask cache. Default is ``True``.
+
+    :returns: (*array*) Mask array with shape (ny, nx), 1 inside and 0 outside the polygons.
+    '''
+    return MIArray(_polymask(x, y, polygons, cache)[0])
+
+def maskfactor(x, y, polygons, inside=True, cache=True):
+    '''
+    Get the multiplier array of polygons: 1 for kept cells and NaN for masked cells. Masking
+    an array is then an element-wise multiply broadcast over its leading dimensions.
+
+    :param x: (*array_like*) X coordinates of the grid (one dimension).
+    :param y: (*array_like*) Y coordinates of the grid (one dimension).
+    :param polygons: (*list*) Polygon list.
+    :param inside: (*boolean*) Keep the cells inside (``True``) or outside the polygons.
+    :param cache: (*boolean*) Use the mask cache. Default is ``True``.
+
+    :returns: (*Array*) Double multiplier array with shape (ny, nx).
+    '''
+    m, item = _polymask(x, y, polygons, cache)
+    if not item is None:
+        r = item[1].get(inside)
+        if not r is None:
+            return r
+    n = int(m.getSize())
+    r = jarray.zeros(n, 'd')
+    for i in range(n):
+        if (m.getByte(i) != 0) == inside:
+            r[i] = 1.0
+        else:
+            r[i] = nan
+    r = Array.factory(DataType.DOUBLE, m.getShape(), r)
+    if not item is None:
+        item[1][inside] = r
+    return r
\ No newline at end of file
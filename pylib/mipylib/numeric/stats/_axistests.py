@@ -0,0 +1,352 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Statistical tests of each line along an axis
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+
+from org.apache.commons.math3.special import Beta, Erf, Gamma
+from java.lang import Double
+
+from mipylib.numeric.miarray import MIArray
+from mipylib.numeric.trend import _reduce, _wrapreduced
+
+nan = Double.NaN
+
+def _asarray(a):
+    if isinstance(a, (list, tuple)):
+        return MIArray(a)
+    return a
+
+def _apply(func, arrays, axis, nout, nthread):
+    arrays = [_asarray(a) for a in arrays]
+    r = _reduce(func, arrays, axis, nout, nthread)
+    a = arrays[0]
+    for b in arrays[1:]:
+        if b.ndim > a.ndim:
+            a = b
+    return tuple([_wrapreduced(a, v, axis) for v in r])
+
+def _valid(v):
+    return [x for x in v if x == x]
+
+def _pairs(xs, ys):
+    x = []
+    y = []
+    for a, b in zip(xs, ys):
+        if a == a and b == b:
+            x.append(a)
+            y.append(b)
+    return x, y
+
+def _meanvar(v):
+    n = len(v)
+    m = sum(v) / n
+    s = 0.0
+    for x in v:
+        s += (x - m) * (x - m)
+    return m, s / (n - 1)
+
+def _tp(t, df):
+    '''
+    Two-sided p-value of Student's t distribution.
+    '''
+    if t != t:
+        return nan
+    if Double.isInfinite(t):
+        return 0.0
+    return Beta.regularizedBeta(df / (df + t * t), 0.5 * df, 0.5)
+
+def _t1(v, popmean):
+    n = len(v)
+    if n < 2:
+        return nan, nan
+    m, var = _meanvar(v)
+    if var == 0:
+        t = nan if m == popmean else math.copysign(Double.POSITIVE_INFINITY, m - popmean)
+    else:
+        t = (m - popmean) / math.sqrt(var / n)
+    return t, _tp(t, n - 1.0)
+
+def ttest_1samp(a, popmean, axis=0, nthread=None):
+    '''
+    T-test for the mean of each line along an axis, NaN values are removed.
+
+    :returns: t-statistic and p-value arrays.
+    '''
+    return _apply(lambda v: _t1(_valid(v), popmean), [a], axis, 2, nthread)
+
+def ttest_rel(a, b, axis=0, nthread=None):
+    '''
+    T-test on two related samples of each line along an axis, NaN pairs are removed.
+
+    :returns: t-statistic and p-value arrays.
+    '''
+    def func(x, y):
+        x, y = _pairs(x, y)
+        return _t1([u - v for u, v in zip(x, y)], 0.0)
+    return _apply(func, [a, b], axis, 2, nthread)
+
+def ttest_ind(a, b, axis=0, nthread=None):
+    '''
+    T-test for the means of two independent samples (identical variances) of each line along
+    an axis, NaN values are removed. The sample sizes along the axis can differ.
+
+    :returns: t-statistic and p-value arrays.
+    '''
+    def func(x, y):
+        x = _valid(x)
+        y = _valid(y)
+        n1 = len(x)
+        n2 = len(y)
+        if n1 < 2 or n2 < 2:
+            return nan, nan
+        m1, v1 = _meanvar(x)
+        m2, v2 = _meanvar(y)
+        df = n1 + n2 - 2.0
+        sp = ((n1 - 1) * v1 + (n2 - 1) * v2) / df
+        d = math.sqrt(sp * (1.0 / n1 + 1.0 / n2))
+        if d == 0:
+            t = nan if m1 == m2 else math.copysign(Double.POSITIVE_INFINITY, m1 - m2)
+        else:
+            t = (m1 - m2) / d
+        return t, _tp(t, df)
+    return _apply(func, [a, b], axis, 2, nthread)
+
+def chisquare(f_obs, f_exp=None, axis=0, nthread=None):
+    '''
+    One-way chi square test of each line along an axis. By default the categories are assumed
+    to be equally likely.
+
+    :returns: Chi-square statistic and p-value arrays.
+    '''
+    def func(o, e=None):
+        k = len(o)
+        if e is None:
+            s = sum(o)
+            e = [s / k] * k
+        chi = 0.0
+        for u, v in zip(o, e):
+            chi += (u - v) * (u - v) / v
+        if chi != chi or k < 2:
+            return nan, nan
+        return chi, Gamma.regularizedGammaQ(0.5 * (k - 1), 0.5 * chi)
+    arrays = [f_obs] if f_exp is None else [f_obs, f_exp]
+    return _apply(func, arrays, axis, 2, nthread)
+
+def _ties(v):
+    '''
+    Tie sums of a sorted list: sum of t(t-1)/2, t(t-1)(t-2) and t(t-1)(2t+5) of the tied
+    groups of size t.
+    '''
+    a = b = c = 0
+    n = len(v)
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and v[j] == v[i]:
+            j += 1
+        t = j - i
+        a += t * (t - 1) // 2
+        b += t * (t - 1) * (t - 2)
+        c += t * (t - 1) * (2 * t + 5)
+        i = j
+    return a, b, c
+
+def _mergecount(y):
+    '''
+    Sort a list by merge sort and count the swaps (strictly discordant pairs).
+    '''
+    n = len(y)
+    buf = list(y)
+    tmp = [0.0] * n
+    swaps = 0
+    width = 1
+    while width < n:
+        for lo in range(0, n, 2 * width):
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            i = lo
+            j = mid
+            k = lo
+            while i < mid and j < hi:
+                if buf[j] < buf[i]:
+                    tmp[k] = buf[j]
+                    swaps += mid - i
+                    j += 1
+                else:
+                    tmp[k] = buf[i]
+                    i += 1
+                k += 1
+            while i < mid:
+                tmp[k] = buf[i]
+                i += 1
+                k += 1
+            while j < hi:
+                tmp[k] = buf[j]
+                j += 1
+                k += 1
+        buf, tmp = tmp, buf
+        width *= 2
+    return buf, swaps
+
+def kendall(xs, ys):
+    '''
+    Kendall's tau-b and the two-sided p-value of the valid pairs with Knight's O(n log n)
+    algorithm.
+    '''
+    pts = sorted([p for p in zip(xs, ys) if p[0] == p[0] and p[1] == p[1]])
+    n = len(pts)
+    if n < 2:
+        return nan, nan
+    x = [p[0] for p in pts]
+    #Pairs tied in both x and y
+    ntie = 0
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and pts[j] == pts[i]:
+            j += 1
+        ntie += (j - i) * (j - i - 1) // 2
+        i = j
+    xtie, x0, x1 = _ties(x)
+    ys, dis = _mergecount([p[1] for p in pts])
+    ytie, y0, y1 = _ties(ys)
+    tot = n * (n - 1) // 2
+    if xtie == tot or ytie == tot:
+        return nan, nan
+    cd = tot - xtie - ytie + ntie - 2 * dis
+    tau = cd / math.sqrt(tot - xtie) / math.sqrt(tot - ytie)
+    tau = min(1.0, max(-1.0, tau))
+    m = n * (n - 1.0)
+    var = (m * (2 * n + 5) - x1 - y1) / 18.0 + 2.0 * xtie * ytie / m
+    if n > 2:
+        var += x0 * y0 / (9.0 * m * (n - 2))
+    if var <= 0:
+        return tau, nan
+    z = cd / math.sqrt(var)
+    return tau, Erf.erfc(abs(z) / math.sqrt(2))
+
+def kendalltau(x, y, axis=0, nthread=None):
+    '''
+    Kendall's tau-b of each line along an axis, NaN pairs are removed.
+
+    :returns: Correlation and p-value arrays.
+    '''
+    return _apply(kendall, [x, y], axis, 2, nthread)
+
+def _ranks(v):
+    '''
+    Ranks with the average rank of ties.
+    '''
+    idx = sorted(range(len(v)), key=v.__getitem__)
+    r = [0.0] * len(v)
+    n = len(v)
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and v[idx[j]] == v[idx[i]]:
+            j += 1
+        rk = 0.5 * (i + j - 1) + 1
+        for k in range(i, j):
+            r[idx[k]] = rk
+        i = j
+    return r
+
+def spearmanr(x, y, axis=0, nthread=None):
+    '''
+    Spearman rank-order correlation coefficient of each line along an axis, NaN pairs are
+    removed.
+
+    :returns: Correlation and p-value arrays.
+    '''
+    def func(xs, ys):
+        xs, ys = _pairs(xs, ys)
+        n = len(xs)
+        if n < 3:
+            return nan, nan
+        rx = _ranks(xs)
+        ry = _ranks(ys)
+        m = (n + 1) * 0.5
+        sxy = sxx = syy = 0.0
+        for a, b in zip(rx, ry):
+            sxy += (a - m) * (b - m)
+            sxx += (a - m) * (a - m)
+            syy += (b - m) * (b - m)
+        if sxx == 0 or syy == 0:
+            return nan, nan
+        rho = min(1.0, max(-1.0, sxy / math.sqrt(sxx * syy)))
+        if abs(rho) == 1:
+            return rho, 0.0
+        df = n - 2.0
+        t = rho * math.sqrt(df / ((1 - rho) * (1 + rho)))
+        return rho, _tp(t, df)
+    return _apply(func, [x, y], axis, 2, nthread)
+
+def _select(v, k):
+    '''
+    Get the k-th smallest value of a list by quickselect (median of three pivots). The list is
+    partially reordered: values before ``k`` are not larger and values after are not smaller.
+    '''
+    lo = 0
+    hi = len(v) - 1
+    while hi > lo:
+        mid = (lo + hi) // 2
+        a = v[lo]
+        b = v[mid]
+        c = v[hi]
+        if a < b:
+            pivot = b if b < c else (c if a < c else a)
+        else:
+            pivot = a if a < c else (c if b < c else b)
+        i = lo
+        j = hi
+        while i <= j:
+            while v[i] < pivot:
+                i += 1
+            while v[j] > pivot:
+                j -= 1
+            if i <= j:
+                v[i], v[j] = v[j], v[i]
+                i += 1
+                j -= 1
+        if k <= j:
+            hi = j
+        elif k >= i:
+            lo = i
+        else:
+            break
+    return v[k]
+
+def _percentiles(v, qs):
+    '''
+    Percentiles of the valid values of a line with linear interpolation.
+    '''
+    v = _valid(v)
+    n = len(v)
+    if n == 0:
+        return [nan] * len(qs)
+    r = []
+    for q in qs:
+        pos = q / 100. * (n - 1)
+        k = int(math.floor(pos))
+        f = pos - k
+        a = _select(v, k)
+        if f > 0 and k + 1 < n:
+            b = min(v[k + 1:])
+            a += (b - a) * f
+        r.append(a)
+    return r
+
+def percentile(a, q, axis=0, nthread=None):
+    '''
+    Exact percentiles of each line along an axis by selection instead of sorting, NaN values
+    are removed.
+
+    :returns: Percentile array, or a list of arrays for a list of percentiles.
+    '''
+    qs = q if isinstance(q, (list, tuple)) else [q]
+    r = _apply(lambda v: _percentiles(v, qs), [a], axis, len(qs), nthread)
+    return list(r) if isinstance(q, (list, tuple)) else r[0]
\ No newline at end of file
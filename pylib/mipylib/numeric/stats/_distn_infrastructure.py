@@ -8,20 +8,106 @@
 
 from org.meteoinfo.math.distribution import DistributionUtil
 from org.apache.commons.math3.distribution import RealDistribution
+from ucar.ma2 import Array, DataType
+from java.lang import Double
+import jarray
 
 import mipylib.numeric.minum as minum
 from mipylib.numeric.miarray import MIArray
+from mipylib.numeric.dimarray import DimArray
+from mipylib.numeric.random.generator import default_rng
+import mipylib.miutil as miutil
+from _axistests import _apply as _applylines, _valid
 
 import numbers
+import threading
+from collections import OrderedDict
+
+nan = Double.NaN
+
+# Maximum number of distribution objects kept in memory
+maxdists = 256
+
+_dists = OrderedDict()
+_lock = threading.Lock()
+
+# Element functions of the distribution objects for parameter arrays
+_methods = {
+    'pdf': lambda d, x: d.density(x),
+    'logpdf': lambda d, x: d.logDensity(x),
+    'cdf': lambda d, x: d.cumulativeProbability(x),
+    'ppf': lambda d, x: d.inverseCumulativeProbability(x),
+    'mean': lambda d, x: d.getNumericalMean(),
+    'std': lambda d, x: d.getNumericalVariance() ** 0.5,
+    'var': lambda d, x: d.getNumericalVariance()
+    }
+
+def _isarray(a):
+    return isinstance(a, (list, tuple, MIArray, Array))
+
+def _broadcast(arrays):
+    '''
+    Broadcast arrays (and scalars) to the common shape.
+
+    :returns: The shape, flat double arrays (scalars are kept) and the template array with the
+        most dimensions.
+    '''
+    tmpl = None
+    for i, a in enumerate(arrays):
+        if isinstance(a, (list, tuple)):
+            arrays[i] = a = minum.array(a)
+        elif isinstance(a, Array):
+            arrays[i] = a = MIArray(a)
+        if isinstance(a, MIArray) and (tmpl is None or a.ndim > tmpl.ndim):
+            tmpl = a
+    nd = tmpl.ndim
+    shape = [1] * nd
+    for a in arrays:
+        if isinstance(a, MIArray):
+            s = [1] * (nd - a.ndim) + list(a.shape)
+            for i in range(nd):
+                if s[i] != 1:
+                    if shape[i] != 1 and shape[i] != s[i]:
+                        raise ValueError('Shapes can not be broadcast together')
+                    shape[i] = s[i]
+    r = []
+    for a in arrays:
+        if isinstance(a, MIArray):
+            if list(a.shape) != shape:
+                a = minum.broadcast_to(a, shape)
+            r.append(miutil.todouble(a))
+        else:
+            r.append(a)
+    return shape, r, tmpl
 
 class rv_continuous(object):
     '''
     A generic continuous random variable class meant for subclassing.
+    
+    Distribution objects are cached by their parameters, so repeated calls with the same
+    parameters build the object once. Parameters can be arrays, which are broadcast with ``x``
+    and evaluated element by element in parallel. Calling the random variable with its
+    parameters gives a frozen distribution.
     '''
     
+    # Parameter names in the order of the positional arguments, for keyword arguments
+    _names = ()
+    # Parameter estimation of a sample list: fitter(values, method) -> parameter tuple
+    _fitter = None
+    # The fitter only uses the positive values (distributions on x > 0)
+    _fitpositive = False
+    
     def __init__(self):
         pass
     
+    def __call__(self, *args, **kwargs):
+        '''
+        Freeze the distribution for the given parameters.
+        
+        :returns: (*rv_frozen*) Frozen distribution.
+        '''
+        return rv_frozen(self, *args, **kwargs)
+    
     def _parse_args(self, *args):
         loc = 0
         scale = 1
@@ -38,27 +124,204 @@ class rv_continuous(object):
             for arg in args:
                 r.append(arg)
             return tuple(r)
-        
+    
+    def _params(self, args, kwargs):
+        '''
+        Positional parameters from the arguments and the keyword arguments of ``_names``.
+        '''
+        args = list(args)
+        for name in self._names[len(args):]:
+            if not name in kwargs:
+                break
+            args.append(kwargs.pop(name))
+        for name in self._names:
+            if name in kwargs:
+                raise TypeError('Parameter %s is given without the former parameters' % name)
+        return args
+    
     def _create_distribution(self, *args):
         '''
         Create a distribution object.
         '''
         return RealDistribution()
+    
+    def _distribution(self, *args):
+        '''
+        Get the cached distribution object of the parameters.
+        '''
+        key = (self.__class__.__name__,) + tuple(args)
+        with _lock:
+            dist = _dists.pop(key, None)
+            if not dist is None:
+                _dists[key] = dist
+                return dist
+        dist = self._create_distribution(*args)
+        with _lock:
+            _dists[key] = dist
+            while len(_dists) > maxdists:
+                _dists.popitem(last=False)
+        return dist
+    
+    def _vectorized(self, method, x, params, nthread=None):
+        '''
+        Evaluate a method with parameter arrays element by element. Invalid parameters give
+        NaN.
+        '''
+        arrays = list(params) if x is None else [x] + list(params)
+        shape, vals, tmpl = _broadcast(arrays)
+        if not x is None:
+            xs = vals[0]
+            vals = vals[1:]
+        n = 1
+        for s in shape:
+            n *= s
+        func = _methods[method]
+        create = self._create_distribution
+        r = jarray.zeros(n, 'd')
+        
+        #Bounded LRU of the chunk's distribution objects, the last one is checked first since
+        #broadcast parameters repeat in runs
+        def part(i0, i1):
+            cache = OrderedDict()
+            last = lastdist = None
+            for i in range(i0, i1):
+                p = tuple([v if isinstance(v, numbers.Number) else v[i] for v in vals])
+                xi = None if x is None else (xs if isinstance(xs, numbers.Number) else xs[i])
+                if xi != xi or any([v != v for v in p]):
+                    r[i] = nan
+                    continue
+                if p == last:
+                    dist = lastdist
+                else:
+                    dist = cache.pop(p, None)
+                    if dist is None:
+                        try:
+                            dist = create(*p)
+                        except Exception:
+                            dist = False
+                    cache[p] = dist
+                    if len(cache) > maxdists:
+                        cache.popitem(last=False)
+                    last = p
+                    lastdist = dist
+                r[i] = nan if dist is False else func(dist, xi)
+        
+        if nthread is None:
+            nthread = miutil.cpu_count()
+        nchunk = max(1, min(n, nthread * 4))
+        step = max(1, (n + nchunk - 1) // nchunk)
+        miutil.pmap(part, [(i, min(i + step, n)) for i in range(0, n, step)], nthread)
+        r = MIArray(Array.factory(DataType.DOUBLE, shape, r))
+        if isinstance(tmpl, DimArray) and list(tmpl.shape) == shape:
+            return DimArray(r, tmpl.dims, tmpl.fill_value, tmpl.proj)
+        return r
+    
+    def _evaluate(self, method, x, args, kwargs):
+        nthread = kwargs.pop('nthread', None)
+        params = self._params(args, kwargs)
+        if any([_isarray(p) for p in params]):
+            return self._vectorized(method, x, params, nthread)
+        return self._apply(method, self._distribution(*params), x)
+    
+    def _apply(self, method, dist, x):
+        '''
+        Evaluate a method of a distribution object.
+        '''
+        if method in ['mean', 'std', 'var']:
+            return _methods[method](dist, None)
+        if isinstance(x, (list, tuple)):
+            x = minum.array(x)
+        if isinstance(x, MIArray):
+            x = x.array
+        if method == 'pdf':
+            r = DistributionUtil.pdf(dist, x)
+        elif method == 'logpdf':
+            r = DistributionUtil.logpdf(dist, x)
+        elif method == 'cdf':
+            r = DistributionUtil.cdf(dist, x)
+        elif method == 'pmf':
+            r = DistributionUtil.pmf(dist, x)
+        else:
+            r = DistributionUtil.ppf(dist, x)
+        return MIArray(r)
+    
+    def fit(self, data, axis=0, method='mle', zeros='drop', nthread=None):
+        '''
+        Fit the distribution parameters of each line along an axis, NaN values are removed.
+        The lines are fitted in parallel, a line with too few valid values or a failed fit
+        gives NaN parameters.
+        
+        Distributions on positive values (expon, gamma, lognorm and weibull) are fitted to the
+        positive values of a line only, zeros and negative values (e.g. dry days of
+        precipitation) are handled by ``zeros``.
+        
+        :param data: (*array_like*) Sample data.
+        :param axis: (*int*) Sample axis. Default is 0.
+        :param method: (*string*) [mle | lmoments]. Maximum likelihood or L-moments
+            estimation. Default is ``mle``.
+        :param zeros: (*string*) [drop | nan | fraction]. Non-positive values of the positive
+            distributions are dropped; give NaN parameters for the lines with them (filter
+            the data before fitting); or are dropped and their fraction of the valid values
+            is returned as an extra array (the probability of zero of a mixed distribution,
+            as for SPI). Default is ``drop``.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
         
+        :returns: Parameter arrays in the order of the positional parameters (and the
+            non-positive fraction with ``zeros='fraction'``), floats for one dimension data.
+        '''
+        if self._fitter is None:
+            raise NotImplementedError('Fitting is not supported by %s' % \
+                self.__class__.__name__[:-4])
+        if not method in ['mle', 'lmoments']:
+            raise ValueError('Unknown method: ' + str(method))
+        if not zeros in ['drop', 'nan', 'fraction']:
+            raise ValueError('Unknown zeros option: ' + str(zeros))
+        fitter = self._fitter
+        positive = self._fitpositive
+        npar = len(self._names)
+        nout = npar + 1 if zeros == 'fraction' else npar
+        
+        def func(v):
+            v = _valid(v)
+            n = len(v)
+            if positive:
+                v = [x for x in v if x > 0]
+            nz = n - len(v)
+            if nz > 0 and zeros == 'nan':
+                return (nan,) * nout
+            try:
+                r = tuple(fitter(v, method))
+            except (ValueError, ZeroDivisionError, OverflowError):
+                r = (nan,) * npar
+            if zeros == 'fraction':
+                r = r + (float(nz) / n if n > 0 else nan,)
+            return r
+        return _applylines(func, [data], axis, nout, nthread)
+    
+    def _rvs(self, dist, size, random_state):
+        if not random_state is None:
+            return default_rng(random_state).sample(dist, size)
+        r = DistributionUtil.rvs(dist, size)
+        return MIArray(r)
+    
     def rvs(self, *args, **kwargs):
         '''
         Random variates of given type.
-
+        
         :param loc: (*float*) location parameter (default=0).
         :param scale: (*float*) scale parameter (default=1).
         :param size: (*int*) Size.
+        :param random_state: (*int or Generator*) Random seed or generator. Default is ``None``,
+            means the global random state. With a seed or a generator, large arrays are filled
+            in parallel and the samples are reproducible.
         
         :returns: Probability density function.
         '''
-        dist = self._create_distribution(*args)
-        size = kwargs.pop('size', 1)        
-        r = DistributionUtil.rvs(dist, size)
-        return MIArray(r)
+        size = kwargs.pop('size', 1)
+        random_state = kwargs.pop('random_state', None)
+        #A new object, the cached ones are shared and sampling changes their generator state
+        dist = self._create_distribution(*self._params(args, kwargs))
+        return self._rvs(dist, size, random_state)
     
     def pdf(self, x, *args, **kwargs):
         '''
@@ -70,14 +333,8 @@ class rv_continuous(object):
         
         :returns: Probability density function.
         '''
-        dist = self._create_distribution(*args)
-        if isinstance(x, (list, tuple)):
-            x = minum.array(x)
-        if isinstance(x, MIArray):
-            x = x.array
-        r = DistributionUtil.pdf(dist, x)
-        return MIArray(r)
-        
+        return self._evaluate('pdf', x, args, kwargs)
+    
     def logpdf(self, x, *args, **kwargs):
         '''
         Log of the probability density function at x of the given RV.
@@ -88,14 +345,8 @@ class rv_continuous(object):
         
         :returns: Log of the probability density function.
         '''
-        dist = self._create_distribution(*args)
-        if isinstance(x, (list, tuple)):
-            x = minum.array(x)
-        if isinstance(x, MIArray):
-            x = x.array
-        r = DistributionUtil.logpdf(dist, x)
-        return MIArray(r)
-        
+        return self._evaluate('logpdf', x, args, kwargs)
+    
     def cdf(self, x, *args, **kwargs):
         '''
         Cumulative distribution function of the given RV.
@@ -106,14 +357,8 @@ class rv_continuous(object):
         
         :returns: Cumulative distribution function.
         '''
-        dist = self._create_distribution(*args)
-        if isinstance(x, (list, tuple)):
-            x = minum.array(x)
-        if isinstance(x, MIArray):
-            x = x.array
-        r = DistributionUtil.cdf(dist, x)
-        return MIArray(r)
-        
+        return self._evaluate('cdf', x, args, kwargs)
+    
     def pmf(self, x, *args, **kwargs):
         '''
         Probability mass function (PMF) of the given RV.
@@ -124,14 +369,9 @@ class rv_continuous(object):
         
         :returns: Probability mas function.
         '''
-        dist = self._create_distribution(*args)
-        if isinstance(x, (list, tuple)):
-            x = minum.array(x)
-        if isinstance(x, MIArray):
-            x = x.array
-        r = DistributionUtil.pmf(dist, x)
-        return MIArray(r)
-        
+        dist = self._distribution(*self._params(args, kwargs))
+        return self._apply('pmf', dist, x)
+    
     def ppf(self, x, *args, **kwargs):
         '''
         Percent point function (inverse of cdf) at q of the given RV.
@@ -142,14 +382,8 @@ class rv_continuous(object):
         
         :returns: Quantile corresponding to the lower tail probability q.
         '''
-        dist = self._create_distribution(*args)
-        if isinstance(x, (list, tuple)):
-            x = minum.array(x)
-        if isinstance(x, MIArray):
-            x = x.array
-        r = DistributionUtil.ppf(dist, x)
-        return MIArray(r)
-        
+        return self._evaluate('ppf', x, args, kwargs)
+    
     def mean(self, *args, **kwargs):
         '''
         Mean of the distribution.
@@ -159,9 +393,8 @@ class rv_continuous(object):
         
         :returns: Mean of the distribution.
         '''
-        dist = self._create_distribution(*args)
-        return dist.getMean()
-        
+        return self._evaluate('mean', None, args, kwargs)
+    
     def std(self, *args, **kwargs):
         '''
         Standard deviation of the distribution.
@@ -171,9 +404,8 @@ class rv_continuous(object):
         
         :returns: Standard deviation of the distribution.
         '''
-        dist = self._create_distribution(*args)
-        return dist.getStandardDeviation()
-        
+        return self._evaluate('std', None, args, kwargs)
+    
     def var(self, *args, **kwargs):
         '''
         Variance of the distribution.
@@ -183,5 +415,87 @@ class rv_continuous(object):
         
         :returns: Variance of the distribution.
         '''
-        dist = self._create_distribution(*args)
-        return dist.getNumericalVariance()
\ No newline at end of file
+        return self._evaluate('var', None, args, kwargs)
+
+class rv_frozen(object):
+    '''
+    Distribution with fixed parameters. The distribution object is created once, parameter
+    arrays are broadcast with ``x`` at each evaluation. Random variates use a new object for
+    each call.
+
+    :param dist: (*rv_continuous*) The random variable.
+    :param args: Distribution parameters.
+    :param kwargs: Distribution keyword parameters and ``nthread``.
+    '''
+
+    def __init__(self, dist, *args, **kwargs):
+        self.dist = dist
+        self.nthread = kwargs.pop('nthread', None)
+        self.args = dist._params(args, kwargs)
+        if len(kwargs) > 0:
+            raise TypeError('Unknown parameters: ' + ', '.join(kwargs.keys()))
+        self.vectorized = any([_isarray(p) for p in self.args])
+        self._obj = None if self.vectorized else dist._create_distribution(*self.args)
+
+    def __repr__(self):
+        return '%s frozen %s' % (self.dist.__class__.__name__[:-4], tuple(self.args))
+
+    def _evaluate(self, method, x):
+        if self.vectorized:
+            return self.dist._vectorized(method, x, self.args, self.nthread)
+        return self.dist._apply(method, self._obj, x)
+
+    def rvs(self, size=1, random_state=None):
+        '''
+        Random variates.
+
+        :param size: (*int*) Size.
+        :param random_state: (*int or Generator*) Random seed or generator. Default is ``None``.
+
+        :returns: Random variates.
+        '''
+        if self.vectorized:
+            raise ValueError('Random variates need scalar parameters')
+        return self.dist._rvs(self.dist._create_distribution(*self.args), size, random_state)
+
+    def pdf(self, x):
+        '''
+        Probability density function at x.
+        '''
+        return self._evaluate('pdf', x)
+
+    def logpdf(self, x):
+        '''
+        Log of the probability density function at x.
+        '''
+        return self._evaluate('logpdf', x)
+
+    def cdf(self, x):
+        '''
+        Cumulative distribution function at x.
+        '''
+        return self._evaluate('cdf', x)
+
+    def ppf(self, q):
+        '''
+        Percent point function (inverse of cdf) at q.
+        '''
+        return self._evaluate('ppf', q)
+
+    def mean(self):
+        '''
+        Mean of the distribution.
+        '''
+        return self._evaluate('mean', None)
+
+    def std(self):
+        '''
+        Standard deviation of the distribution.
+        '''
+        return self._evaluate('std', None)
+
+    def var(self):
+        '''
+        Variance of the distribution.
+        '''
+        return self._evaluate('var', None)
\ No newline at end of file
@@ -0,0 +1,191 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Distribution parameter estimation of sample lines
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+
+from org.apache.commons.math3.special import Gamma
+from java.lang import Double
+
+nan = Double.NaN
+
+# Euler-Mascheroni constant
+_euler = 0.5772156649015329
+
+def lmoments(v):
+    '''
+    First three sample L-moments of a list from the unbiased probability weighted moments.
+
+    :returns: l1, l2, l3 (NaN for too few values).
+    '''
+    n = len(v)
+    if n < 3:
+        return nan, nan, nan
+    x = sorted(v)
+    b0 = b1 = b2 = 0.0
+    for i in range(n):
+        b0 += x[i]
+        b1 += x[i] * i
+        b2 += x[i] * i * (i - 1)
+    b0 /= n
+    b1 /= n * (n - 1.0)
+    b2 /= n * (n - 1.0) * (n - 2.0)
+    return b0, 2 * b1 - b0, 6 * b2 - 6 * b1 + b0
+
+def _meanstd(v):
+    n = len(v)
+    m = sum(v) / n
+    s = 0.0
+    for x in v:
+        s += (x - m) * (x - m)
+    return m, math.sqrt(s / n)
+
+def _positive(v):
+    return [x for x in v if x > 0]
+
+def normfit(v, method):
+    '''
+    Normal distribution location and scale.
+    '''
+    if method == 'lmoments':
+        l1, l2, l3 = lmoments(v)
+        return l1, l2 * math.sqrt(math.pi)
+    if len(v) < 2:
+        return nan, nan
+    return _meanstd(v)
+
+def exponfit(v, method):
+    '''
+    Exponential distribution scale (mean), the L-moment and MLE estimates are the mean.
+    '''
+    v = _positive(v)
+    if len(v) == 0:
+        return (nan,)
+    return (sum(v) / len(v),)
+
+def gammafit(v, method):
+    '''
+    Gamma distribution shape and scale of the positive values. MLE solves
+    ln(a) - digamma(a) = ln(mean) - mean(ln x) by Newton iterations from Thom's estimate;
+    L-moments use Hosking's rational approximation of the shape from the L-CV.
+    '''
+    v = _positive(v)
+    n = len(v)
+    if n < 2:
+        return nan, nan
+    m = sum(v) / n
+    if method == 'lmoments':
+        if n < 3:
+            return nan, nan
+        l1, l2, l3 = lmoments(v)
+        t = l2 / l1
+        if t <= 0 or t >= 1:
+            return nan, nan
+        if t < 0.5:
+            z = math.pi * t * t
+            a = (1 - 0.3080 * z) / (z - 0.05812 * z * z + 0.01765 * z * z * z)
+        else:
+            z = 1 - t
+            a = (0.7213 * z - 0.5947 * z * z) / (1 - 2.1817 * z + 1.2113 * z * z)
+        return a, l1 / a
+    s = math.log(m) - sum([math.log(x) for x in v]) / n
+    if s <= 0:
+        return nan, nan
+    a = (1 + math.sqrt(1 + 4 * s / 3)) / (4 * s)
+    for it in range(50):
+        f = math.log(a) - Gamma.digamma(a) - s
+        d = 1 / a - Gamma.trigamma(a)
+        step = f / d
+        a1 = a - step
+        if a1 <= 0:
+            a1 = a / 2
+        if abs(a1 - a) <= 1e-10 * a:
+            a = a1
+            break
+        a = a1
+    return a, m / a
+
+def weibullfit(v, method):
+    '''
+    Weibull distribution shape and scale of the positive values. L-moments use
+    l2 / l1 = 1 - 2 ** (-1 / c); MLE refines the shape by Newton iterations from the L-moment
+    estimate.
+    '''
+    v = _positive(v)
+    n = len(v)
+    if n < 3:
+        return nan, nan
+    l1, l2, l3 = lmoments(v)
+    t = l2 / l1
+    if t <= 0 or t >= 1:
+        return nan, nan
+    c = -math.log(2) / math.log(1 - t)
+    if method != 'lmoments':
+        lv = [math.log(x) for x in v]
+        ml = sum(lv) / n
+        #Powers of x / max(x) keep the sums finite for large shapes
+        lmax = max(lv)
+        for it in range(100):
+            s0 = s1 = s2 = 0.0
+            for u in lv:
+                w = math.exp(c * (u - lmax))
+                s0 += w
+                s1 += w * u
+                s2 += w * u * u
+            f = s1 / s0 - 1 / c - ml
+            d = (s2 * s0 - s1 * s1) / (s0 * s0) + 1 / (c * c)
+            c1 = c - f / d
+            if c1 <= 0:
+                c1 = c / 2
+            if abs(c1 - c) <= 1e-10 * c:
+                c = c1
+                break
+            c = c1
+        s0 = sum([math.exp(c * (u - lmax)) for u in lv])
+        return c, math.exp(lmax) * (s0 / n) ** (1 / c)
+    return c, l1 / math.exp(Gamma.logGamma(1 + 1 / c))
+
+def gumbelfit(v, method):
+    '''
+    Gumbel (maximum) distribution location and scale. L-moments give the scale l2 / ln(2);
+    MLE refines the scale by Newton iterations from the L-moment estimate.
+    '''
+    n = len(v)
+    if n < 3:
+        return nan, nan
+    l1, l2, l3 = lmoments(v)
+    if l2 <= 0:
+        return nan, nan
+    b = l2 / math.log(2)
+    if method == 'lmoments':
+        return l1 - _euler * b, b
+    m = sum(v) / n
+    xmin = min(v)
+    for it in range(100):
+        s0 = s1 = s2 = 0.0
+        for x in v:
+            w = math.exp(-(x - xmin) / b)
+            s0 += w
+            s1 += w * x
+            s2 += w * x * x
+        g = b - m + s1 / s0
+        d = 1 + (s2 * s0 - s1 * s1) / (b * b * s0 * s0)
+        b1 = b - g / d
+        if b1 <= 0:
+            b1 = b / 2
+        if abs(b1 - b) <= 1e-10 * b:
+            b = b1
+            break
+        b = b1
+    s0 = sum([math.exp(-(x - xmin) / b) for x in v])
+    return xmin - b * math.log(s0 / n), b
+
+def lognormfit(v, method):
+    '''
+    Log-normal distribution scale (mean of ln x) and shape (standard deviation of ln x) of the
+    positive values, from the normal fit of the logarithms.
+    '''
+    return normfit([math.log(x) for x in _positive(v)], method)
\ No newline at end of file
@@ -12,6 +12,7 @@ from org.apache.commons.math3.distribution import NormalDistribution, BetaDistri
     ParetoDistribution, TDistribution, TriangularDistribution, UniformRealDistribution, WeibullDistribution
 
 from _distn_infrastructure import rv_continuous
+from _fitting import normfit, exponfit, gammafit, weibullfit, gumbelfit, lognormfit
 
 __all__ = [
     'norm','beta','cauchy','chi2','expon','f','gamma','gumbel','laplace','levy','logistic','lognorm',
@@ -23,6 +24,9 @@ class norm_gen(rv_continuous):
     A normal continuous random variable.
     '''
     
+    _names = ('loc', 'scale')
+    _fitter = staticmethod(normfit)
+
     def _create_distribution(self, *args):
         '''
         Create a normal distribution object.
@@ -38,6 +42,8 @@ class beta_gen(rv_continuous):
     A beta continuous random variable.
     '''
     
+    _names = ('a', 'b')
+
     def _create_distribution(self, *args):
         '''
         Create a normal distribution object.
@@ -53,6 +59,8 @@ class cauchy_gen(rv_continuous):
     A cauchy continuous random variable.
     '''
     
+    _names = ('loc', 'scale')
+
     def _create_distribution(self, *args):
         '''
         Create a cauchy distribution object.
@@ -68,6 +76,8 @@ class chi2_gen(rv_continuous):
     A chi squared continuous random variable.
     '''
     
+    _names = ('df',)
+
     def _create_distribution(self, *args):
         '''
         Create a chi squared distribution object.
@@ -83,6 +93,10 @@ class expon_gen(rv_continuous):
     A exponential continuous random variable.
     '''
     
+    _names = ('scale',)
+    _fitter = staticmethod(exponfit)
+    _fitpositive = True
+
     def _create_distribution(self, *args):
         '''
         Create a exponential distribution object.
@@ -98,6 +112,8 @@ class f_gen(rv_continuous):
     A F continuous random variable.
     '''
     
+    _names = ('dfn', 'dfd')
+
     def _create_distribution(self, *args):
         '''
         Create a F distribution object.
@@ -113,6 +129,10 @@ class gamma_gen(rv_continuous):
     A gamma continuous random variable.
     '''
     
+    _names = ('a', 'scale')
+    _fitter = staticmethod(gammafit)
+    _fitpositive = True
+
     def _create_distribution(self, *args):
         '''
         Create a gamma distribution object.
@@ -128,6 +148,9 @@ class gumbel_gen(rv_continuous):
     A gumbel continuous random variable.
     '''
     
+    _names = ('loc', 'scale')
+    _fitter = staticmethod(gumbelfit)
+
     def _create_distribution(self, *args):
         '''
         Create a gumbel distribution object.
@@ -143,6 +166,8 @@ class laplace_gen(rv_continuous):
     A Laplace continuous random variable.
     '''
     
+    _names = ('loc', 'scale')
+
     def _create_distribution(self, *args):
         '''
         Create a Laplace distribution object.
@@ -158,6 +183,8 @@ class levy_gen(rv_continuous):
     A Levy continuous random variable.
     '''
     
+    _names = ('loc', 'scale')
+
     def _create_distribution(self, *args):
         '''
         Create a Levy distribution object.
@@ -173,6 +200,8 @@ class logistic_gen(rv_continuous):
     A logistic continuous random variable.
     '''
     
+    _names = ('loc', 'scale')
+
     def _create_distribution(self, *args):
         '''
         Create a logistic distribution object.
@@ -188,6 +217,10 @@ class lognorm_gen(rv_continuous):
     A Log-normal continuous random variable.
     '''
     
+    _names = ('scale', 'shape')
+    _fitter = staticmethod(lognormfit)
+    _fitpositive = True
+
     def _create_distribution(self, *args):
         '''
         Create a Log-normal distribution object.
@@ -203,6 +236,8 @@ class nakagami_gen(rv_continuous):
     A Nakagami continuous random variable.
     '''
     
+    _names = ('scale', 'shape')
+
     def _create_distribution(self, *args):
         '''
         Create a Nakagami distribution object.
@@ -218,6 +253,8 @@ class pareto_gen(rv_continuous):
     A Pareto continuous random variable.
     '''
     
+    _names = ('scale', 'shape')
+
     def _create_distribution(self, *args):
         '''
         Create a Pareto distribution object.
@@ -233,6 +270,8 @@ class t_gen(rv_continuous):
     A Student's t continuous random variable.
     '''
     
+    _names = ('df',)
+
     def _create_distribution(self, *args):
         '''
         Create a Student's t-distribution object.
@@ -248,6 +287,8 @@ class triang_gen(rv_continuous):
     A Triangular continuous random variable.
     '''
     
+    _names = ('loc', 'scale', 'c')
+
     def _create_distribution(self, *args):
         '''
         Create a Triangular distribution object.
@@ -271,6 +312,8 @@ class uniform_gen(rv_continuous):
     A Uniform continuous random variable.
     '''
     
+    _names = ('lower', 'upper')
+
     def _create_distribution(self, *args):
         '''
         Create a Uniform distribution object.
@@ -286,6 +329,10 @@ class weibull_gen(rv_continuous):
     A Weibull continuous random variable.
     '''
     
+    _names = ('c', 'scale')
+    _fitter = staticmethod(weibullfit)
+    _fitpositive = True
+
     def _create_distribution(self, *args):
         '''
         Create a Weibull distribution object.
@@ -0,0 +1,487 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Parallel bootstrap and permutation tests
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+
+from ucar.ma2 import Array, DataType
+from java.lang import Double
+from java.util import SplittableRandom
+import jarray
+
+from mipylib.numeric.miarray import MIArray
+from mipylib.numeric.filters import _lines
+from mipylib.numeric.trend import _wrapreduced
+from mipylib.numeric.gemm import gemm
+import mipylib.miutil as miutil
+from _axistests import _percentiles, _select
+
+nan = Double.NaN
+
+__all__ = ['bootstrap','permutation_test']
+
+# Statistics evaluated from matrix products of the resample weights and the samples
+_moments = ['mean', 'var', 'std', 'corr', 'slope']
+
+# Resample statistic number of a chunk of cells held in memory at a time
+block = 2 ** 20
+
+def _ranges(n, nthread):
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(n, nthread * 4))
+    step = max(1, (n + nchunk - 1) // nchunk)
+    return [(i, min(i + step, n)) for i in range(0, n, step)], nthread
+
+def _chunks(nc, nres, nthread):
+    '''
+    Cell chunks for the threads, small enough that the resample statistics of a chunk fit in
+    ``block``.
+    '''
+    ranges, nthread = _ranges(nc, nthread)
+    step = max(1, min(ranges[0][1] - ranges[0][0], block // max(1, nres)))
+    return [(i, min(i + step, nc)) for i in range(0, nc, step)], nthread
+
+def _asarray(a):
+    if isinstance(a, (list, tuple)):
+        return MIArray(a)
+    return a
+
+def _samples(a, axis):
+    '''
+    Get the sample matrix (nsample, ncell) of an array with the samples along an axis.
+    '''
+    shape = list(a.shape)
+    if axis < 0:
+        axis += len(shape)
+    src = miutil.todouble(a)
+    starts, n, st = _lines(shape, axis)
+    nc = len(starts)
+    if axis == 0:
+        return a, src, n, nc, shape[1:]
+    r = jarray.zeros(n * nc, 'd')
+    for c in range(nc):
+        s0 = starts[c]
+        for j in range(n):
+            r[j * nc + c] = src[s0 + j * st]
+    return a, r, n, nc, shape[:axis] + shape[axis + 1:]
+
+def _expand(x, n, nc):
+    '''
+    Repeat a shared sample vector for all the cells.
+    '''
+    r = jarray.zeros(n * nc, 'd')
+    for j in range(n):
+        v = x[j]
+        for c in range(nc):
+            r[j * nc + c] = v
+    return r
+
+def _columns(m, n, nc, c0, c1):
+    '''
+    Get the sample matrix (nsample, c1 - c0) of a chunk of cells.
+    '''
+    k = c1 - c0
+    if k == nc:
+        return m
+    r = jarray.zeros(n * k, 'd')
+    for j in range(n):
+        r[j * k:(j + 1) * k] = m[j * nc + c0:j * nc + c1]
+    return r
+
+def _line(m, n, nc, c):
+    '''
+    Get the samples of a cell, a one column matrix is shared by all the cells.
+    '''
+    if nc == 1:
+        c = 0
+    return [m[j * nc + c] for j in range(n)]
+
+def _hasnan(mats, n, nc, c):
+    for m in mats:
+        for j in range(n):
+            v = m[j * nc + c]
+            if v != v:
+                return True
+    return False
+
+def _center(v, n, nc):
+    '''
+    Remove the mean of each cell, the spread and correlation statistics are shift invariant.
+    '''
+    m = [0.0] * nc
+    for j in range(n):
+        for c in range(nc):
+            m[c] += v[j * nc + c]
+    m = [s / n for s in m]
+    r = jarray.zeros(n * nc, 'd')
+    for j in range(n):
+        for c in range(nc):
+            r[j * nc + c] = v[j * nc + c] - m[c]
+    return r
+
+def _indices(n, nres, seed, perm, nthread):
+    '''
+    Get the resample indices (nres, n). Each resample has its own stream split from the seed,
+    so the indices do not depend on the thread number.
+    '''
+    base = SplittableRandom() if seed is None else SplittableRandom(seed)
+    streams = [base.split() for i in range(nres)]
+    idx = jarray.zeros(nres * n, 'i')
+
+    def part(r0, r1):
+        for r in range(r0, r1):
+            rnd = streams[r]
+            o = r * n
+            if perm:
+                for j in range(n):
+                    idx[o + j] = j
+                for j in range(n - 1, 0, -1):
+                    k = rnd.nextInt(j + 1)
+                    t = idx[o + j]
+                    idx[o + j] = idx[o + k]
+                    idx[o + k] = t
+            else:
+                for j in range(n):
+                    idx[o + j] = rnd.nextInt(n)
+
+    ranges, nthread = _ranges(nres, nthread)
+    miutil.pmap(part, ranges, nthread)
+    return idx
+
+def _product(w, nres, n, v, nc, nthread):
+    return miutil.todouble(gemm(Array.factory(DataType.DOUBLE, [nres, n], w), \
+        Array.factory(DataType.DOUBLE, [n, nc], v), nthread=nthread))
+
+def _momentstat(stat, sums, n):
+    '''
+    Statistic of a cell from the weighted sums (sx, sxx) or (sx, sy, sxx, syy, sxy).
+    '''
+    if stat == 'mean':
+        return sums[0] / n
+    if stat in ['var', 'std']:
+        m = sums[0] / n
+        var = max(0.0, sums[1] / n - m * m)
+        return var if stat == 'var' else math.sqrt(var)
+    sx, sy, sxx, syy, sxy = sums
+    mx = sx / n
+    my = sy / n
+    cov = sxy / n - mx * my
+    vx = sxx / n - mx * mx
+    vy = syy / n - my * my
+    if stat == 'slope':
+        return cov / vx if vx > 0 else nan
+    if vx <= 0 or vy <= 0:
+        return nan
+    r = cov / math.sqrt(vx * vy)
+    if r != r:
+        return nan
+    return min(1.0, max(-1.0, r))
+
+def _linestat(stat, xs, ys=None):
+    '''
+    Statistic of the values of a cell.
+    '''
+    if callable(stat):
+        return stat(xs) if ys is None else stat(xs, ys)
+    n = len(xs)
+    if stat == 'median':
+        v = list(xs)
+        if any([x != x for x in v]):
+            return nan
+        if n % 2 == 1:
+            return _select(v, n // 2)
+        a = _select(v, n // 2 - 1)
+        return 0.5 * (a + min(v[n // 2:]))
+    if ys is None:
+        sx = sum(xs)
+        return _momentstat(stat, (sx, sum([x * x for x in xs])), n)
+    sums = (sum(xs), sum(ys), sum([x * x for x in xs]), sum([y * y for y in ys]), \
+        sum([x * y for x, y in zip(xs, ys)]))
+    return _momentstat(stat, sums, n)
+
+def _mediandiff(xs, ys):
+    return _linestat('median', xs) - _linestat('median', ys)
+
+def _summary(b, qs):
+    '''
+    Percentile confidence limits and standard error of the resample statistics of a cell.
+    '''
+    if any([x != x for x in b]):
+        return nan, nan, nan
+    lo, hi = _percentiles(b, qs)
+    nres = len(b)
+    m = sum(b) / nres
+    return lo, hi, math.sqrt(sum([(x - m) * (x - m) for x in b]) / max(1, nres - 1))
+
+def _pvalue(t, alternative):
+    '''
+    Observed statistic (the first) and p-value from the permutation statistics of a cell.
+    '''
+    t0 = t[0]
+    if t0 != t0:
+        return t0, nan
+    cnt = 0
+    for x in t[1:]:
+        if alternative == 'greater':
+            cnt += x >= t0
+        elif alternative == 'less':
+            cnt += x <= t0
+        else:
+            cnt += abs(x) >= abs(t0)
+    return t0, (cnt + 1.0) / len(t)
+
+def _isnative(stat):
+    return not callable(stat) and stat in _moments
+
+def _check(stat, ndata):
+    if callable(stat):
+        return
+    if stat in ['corr', 'slope']:
+        if ndata != 2:
+            raise ValueError('Statistic %s needs two data arrays (x, y)' % stat)
+    elif stat in ['mean', 'median', 'var', 'std']:
+        pass
+    else:
+        raise ValueError('Unknown statistic: ' + str(stat))
+
+def bootstrap(statistic, data, n_resamples=1000, axis=0, ci=0.95, seed=None, nthread=None):
+    '''
+    Bootstrap confidence intervals of a statistic for each grid cell. The same resamples (of the
+    indices along ``axis``) are used for all the cells. Resamples are drawn from independent
+    streams split from ``seed``, so results are reproducible whatever the thread number.
+    The built-in moment statistics are evaluated for all the resamples of a chunk of cells by
+    matrix products, the others cell by cell. Chunks are processed in parallel and summarized
+    as they are done, so the resample statistics of all the cells are never held together.
+
+    :param statistic: (*string or function*) Statistic: ``mean``, ``median``, ``var``, ``std``,
+        ``corr`` (Pearson correlation of x and y) or ``slope`` (linear regression slope of y on
+        x); or a function of the sample values list (two lists for two data arrays).
+    :param data: (*array_like or tuple*) Sample array, or a tuple of x and y arrays for two sample
+        statistics. x can be one dimension with the sample number.
+    :param n_resamples: (*int*) Resample number. Default is 1000.
+    :param axis: (*int*) Sample axis. Default is 0.
+    :param ci: (*float*) Confidence level. Default is 0.95.
+    :param seed: (*int*) Random seed. Default is ``None``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: Lower and upper percentile confidence limits and bootstrap standard error arrays
+        of the grid (the data dimensions except ``axis``). Cells with NaN values are NaN for
+        the built-in statistics, a function gets the values as they are.
+    '''
+    if not isinstance(data, tuple):
+        data = (data,)
+    data = [_asarray(d) for d in data]
+    _check(statistic, len(data))
+    ys = [_samples(d, axis if d.ndim > 1 or len(data) == 1 else 0) for d in data]
+    tmpl, v, n, nc, gshape = max(ys, key=lambda y: y[3])
+    mats = []
+    for t, m, nn, c, g in ys:
+        if nn != n:
+            raise ValueError('Sample numbers do not match: %d, %d' % (nn, n))
+        mats.append(_expand(m, n, nc) if c == 1 and nc > 1 else m)
+    nres = n_resamples
+    idx = _indices(n, nres, seed, False, nthread)
+    native = _isnative(statistic)
+    if native:
+        w = jarray.zeros(nres * n, 'd')
+        for r in range(nres):
+            for j in range(n):
+                w[r * n + idx[r * n + j]] += 1.0
+    qs = [50. * (1 - ci), 50. * (1 + ci)]
+    lo = jarray.zeros(nc, 'd')
+    hi = jarray.zeros(nc, 'd')
+    se = jarray.zeros(nc, 'd')
+
+    #Each chunk of cells is resampled and summarized on its own, the chunk matrix products
+    #run in the worker thread
+    def part(c0, c1):
+        k = c1 - c0
+        subs = [_columns(m, n, nc, c0, c1) for m in mats]
+        if native:
+            if statistic != 'mean':
+                subs = [_center(u, n, k) for u in subs]
+            vs = list(subs)
+            vs.extend([[u * u for u in m] for m in subs])
+            if len(subs) == 2:
+                vs.append([x * y for x, y in zip(subs[0], subs[1])])
+            prods = [_product(w, nres, n, jarray.array(u, 'd'), k, 1) for u in vs]
+        for i in range(k):
+            c = c0 + i
+            if not callable(statistic) and _hasnan(subs, n, k, i):
+                lo[c] = hi[c] = se[c] = nan
+                continue
+            if native:
+                b = [_momentstat(statistic, [p[r * k + i] for p in prods], n) \
+                    for r in range(nres)]
+            else:
+                lines = [_line(m, n, k, i) for m in subs]
+                b = []
+                for r in range(nres):
+                    o = r * n
+                    rs = [[line[idx[o + j]] for j in range(n)] for line in lines]
+                    b.append(_linestat(statistic, *rs))
+            lo[c], hi[c], se[c] = _summary(b, qs)
+
+    ranges, nthread = _chunks(nc, nres, nthread)
+    miutil.pmap(part, ranges, nthread)
+    r = []
+    for x in [lo, hi, se]:
+        if len(gshape) == 0:
+            r.append(x[0])
+        else:
+            r.append(_wrapreduced(tmpl, Array.factory(DataType.DOUBLE, gshape, x), axis))
+    return tuple(r)
+
+def permutation_test(statistic, data, n_resamples=1000, axis=0, alternative='two-sided', \
+    seed=None, nthread=None, permutation_type=None):
+    '''
+    Permutation test for each grid cell. The same permutations (of the indices along ``axis``)
+    are used for all the cells. Permutations are drawn from independent streams split from
+    ``seed``, so results are reproducible whatever the thread number.
+
+    ``independent`` tests compare the samples a and b, which are pooled and split again by
+    each permutation, the sample numbers may differ. ``pairings`` tests permute y against x
+    and need equal sample numbers. The mean statistic, and corr and slope with a one dimension
+    x (e.g. a time index), are evaluated for all the permutations of a chunk of cells by matrix
+    products.
+
+    :param statistic: (*string or function*) Statistic: ``mean``, ``median`` (differences of two
+        samples), ``corr`` or ``slope`` (of paired x and y); or a function of two sample value
+        lists.
+    :param data: (*tuple*) Sample arrays (a, b) or (x, y).
+    :param n_resamples: (*int*) Permutation number. Default is 1000.
+    :param axis: (*int*) Sample axis. Default is 0.
+    :param alternative: (*string*) [two-sided | greater | less]. Default is ``two-sided``.
+    :param seed: (*int*) Random seed. Default is ``None``.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+    :param permutation_type: (*string*) [independent | pairings]. Default is ``None``, means
+        ``pairings`` for corr and slope and ``independent`` otherwise (including functions).
+
+    :returns: Statistic and p-value arrays of the grid (the data dimensions except ``axis``).
+        Cells with NaN values are NaN for the built-in statistics, a function gets the values
+        as they are.
+    '''
+    if len(data) != 2:
+        raise ValueError('Two data arrays are needed')
+    if not callable(statistic) and not statistic in ['mean', 'median', 'corr', 'slope']:
+        raise ValueError('Unknown statistic: ' + str(statistic))
+    if permutation_type is None:
+        permutation_type = 'pairings' if statistic in ['corr', 'slope'] else 'independent'
+    if not permutation_type in ['independent', 'pairings']:
+        raise ValueError('Unknown permutation type: ' + str(permutation_type))
+    if not callable(statistic) and (permutation_type == 'pairings') != \
+        (statistic in ['corr', 'slope']):
+        raise ValueError('Statistic %s does not support %s permutations' % (statistic, \
+            permutation_type))
+    a, b = [_asarray(d) for d in data]
+    sx = _samples(a, axis if a.ndim > 1 else 0)
+    sy = _samples(b, axis if b.ndim > 1 else 0)
+    tmpl, vy, ny, nc, gshape = sy if sy[3] >= sx[3] else sx
+    nres = n_resamples
+    builtin = not callable(statistic)
+    st = jarray.zeros(nc, 'd')
+    pv = jarray.zeros(nc, 'd')
+    if permutation_type == 'pairings':
+        n = sx[2]
+        if ny != n:
+            raise ValueError('Sample numbers do not match: %d, %d' % (n, ny))
+        idx = _indices(n, nres, seed, True, nthread)
+        ncx = sx[3]
+        ncy = sy[3]
+        native = builtin and ncx == 1 and nc > 1
+        if native:
+            x = [v for v in sx[1]]
+            xnan = any([v != v for v in x])
+            m = sum(x) / n
+            x = [v - m for v in x]
+            #Permuted x rows (the first row is the identity) against all the cells
+            w = jarray.zeros((nres + 1) * n, 'd')
+            for j in range(n):
+                w[j] = x[j]
+            for r in range(nres):
+                for j in range(n):
+                    w[(r + 1) * n + j] = x[idx[r * n + j]]
+            sxx = sum([v * v for v in x])
+
+        def part(c0, c1):
+            k = c1 - c0
+            if native:
+                y = _center(_columns(sy[1], n, nc, c0, c1), n, k)
+                sxy = _product(w, nres + 1, n, y, k, 1)
+            for i in range(k):
+                c = c0 + i
+                if native:
+                    ys = _line(y, n, k, i)
+                    if xnan or any([v != v for v in ys]):
+                        st[c] = pv[c] = nan
+                        continue
+                    syy = sum([v * v for v in ys])
+                    t = [_momentstat(statistic, (0.0, 0.0, sxx, syy, sxy[r * k + i]), n) \
+                        for r in range(nres + 1)]
+                else:
+                    xs = _line(sx[1], n, ncx, c)
+                    ys = _line(sy[1], n, ncy, c)
+                    if builtin and any([v != v for v in xs + ys]):
+                        st[c] = pv[c] = nan
+                        continue
+                    t = [_linestat(statistic, xs, ys)]
+                    for r in range(nres):
+                        o = r * n
+                        t.append(_linestat(statistic, [xs[idx[o + j]] for j in range(n)], ys))
+                st[c], pv[c] = _pvalue(t, alternative)
+    else:
+        n1 = sx[2]
+        n2 = ny
+        if sx[3] != nc:
+            raise ValueError('Grid shapes do not match')
+        n = n1 + n2
+        idx = _indices(n, nres, seed, True, nthread)
+        native = statistic == 'mean'
+        if native:
+            #Group weights: 1/n1 for a and -1/n2 for b, the product is the mean difference
+            w = jarray.zeros((nres + 1) * n, 'd')
+            for j in range(n):
+                w[j] = 1.0 / n1 if j < n1 else -1.0 / n2
+            for r in range(nres):
+                o = r * n
+                for j in range(n):
+                    w[(r + 1) * n + idx[o + j]] = 1.0 / n1 if j < n1 else -1.0 / n2
+        func = statistic if callable(statistic) else _mediandiff
+
+        def part(c0, c1):
+            k = c1 - c0
+            z = jarray.zeros(n * k, 'd')
+            z[0:n1 * k] = _columns(sx[1], n1, nc, c0, c1)
+            z[n1 * k:n * k] = _columns(sy[1], n2, nc, c0, c1)
+            if native:
+                d = _product(w, nres + 1, n, z, k, 1)
+            for i in range(k):
+                c = c0 + i
+                zs = _line(z, n, k, i)
+                if builtin and any([v != v for v in zs]):
+                    st[c] = pv[c] = nan
+                    continue
+                if native:
+                    t = [d[r * k + i] for r in range(nres + 1)]
+                else:
+                    t = [func(zs[:n1], zs[n1:])]
+                    for r in range(nres):
+                        o = r * n
+                        p = [zs[idx[o + j]] for j in range(n)]
+                        t.append(func(p[:n1], p[n1:]))
+                st[c], pv[c] = _pvalue(t, alternative)
+
+    ranges, nthread = _chunks(nc, nres + 1, nthread)
+    miutil.pmap(part, ranges, nthread)
+
+    r = []
+    for x in [st, pv]:
+        if len(gshape) == 0:
+            r.append(x[0])
+        else:
+            r.append(_wrapreduced(tmpl, Array.factory(DataType.DOUBLE, gshape, x), axis))
+    return tuple(r)
\ No newline at end of file
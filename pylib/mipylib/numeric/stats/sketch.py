@@ -0,0 +1,310 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Mergeable quantile sketches of grid cells
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+
+from ucar.ma2 import Array, DataType
+from java.lang import Double
+import jarray
+
+from mipylib.numeric.miarray import MIArray
+from mipylib.numeric.dimarray import DimArray
+from mipylib.numeric.filters import _lines
+import mipylib.miutil as miutil
+
+nan = Double.NaN
+
+__all__ = ['QuantileSketch']
+
+# Shared empty centroid array of new digests, the arrays are replaced and never changed
+_empty = jarray.zeros(0, 'd')
+
+class _Digest(object):
+    '''
+    Merging t-digest of one cell. Centroid sizes are bounded by the arcsine scale function,
+    so the tails keep small centroids and tail quantiles stay accurate. Centroids and the
+    buffer of added values are primitive double arrays, the buffer is allocated on the first
+    value and compressed when it is full.
+    '''
+
+    __slots__ = ['means', 'weights', 'buf', 'nbuf', 'total', 'min', 'max']
+
+    def __init__(self):
+        self.means = _empty
+        self.weights = _empty
+        self.buf = None
+        self.nbuf = 0
+        self.total = 0.0
+        self.min = Double.POSITIVE_INFINITY
+        self.max = Double.NEGATIVE_INFINITY
+
+    def add(self, values, size, delta):
+        for v in values:
+            if v == v:
+                if self.buf is None:
+                    self.buf = jarray.zeros(size, 'd')
+                elif self.nbuf == len(self.buf):
+                    self.compress(delta)
+                self.buf[self.nbuf] = v
+                self.nbuf += 1
+                if v < self.min:
+                    self.min = v
+                if v > self.max:
+                    self.max = v
+
+    def compress(self, delta, extra=None):
+        pts = [(self.buf[i], 1.0) for i in range(self.nbuf)]
+        pts.extend(zip(self.means, self.weights))
+        if not extra is None:
+            pts.extend(extra)
+        self.nbuf = 0
+        if len(pts) == 0:
+            return
+        pts.sort()
+        total = 0.0
+        for m, w in pts:
+            total += w
+        means = []
+        weights = []
+        cm, cw = pts[0]
+        wsofar = 0.0
+        limit = self._qlimit(0.0, delta)
+        for m, w in pts[1:]:
+            if (wsofar + cw + w) / total <= limit:
+                cw += w
+                cm += (m - cm) * w / cw
+            else:
+                means.append(cm)
+                weights.append(cw)
+                wsofar += cw
+                limit = self._qlimit(wsofar / total, delta)
+                cm, cw = m, w
+        means.append(cm)
+        weights.append(cw)
+        self.means = jarray.array(means, 'd')
+        self.weights = jarray.array(weights, 'd')
+        self.total = total
+
+    @staticmethod
+    def _qlimit(q, delta):
+        '''
+        Quantile limit of a centroid starting at ``q``: one unit of the k1 scale function
+        k(q) = delta / (2 pi) * asin(2q - 1).
+        '''
+        k = delta / (2 * math.pi) * math.asin(min(1.0, max(-1.0, 2 * q - 1))) + 1
+        if k >= delta / 4.0:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / delta) + 1) / 2
+
+    def merge(self, other, delta):
+        extra = list(zip(other.means, other.weights))
+        extra.extend([(other.buf[i], 1.0) for i in range(other.nbuf)])
+        if other.min < self.min:
+            self.min = other.min
+        if other.max > self.max:
+            self.max = other.max
+        self.compress(delta, extra)
+
+    def quantile(self, q):
+        n = len(self.means)
+        if n == 0:
+            return nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        if n == 1:
+            return self.means[0]
+        means = self.means
+        weights = self.weights
+        target = q * self.total
+        #The first and last half centroids interpolate from the extremes
+        if target < weights[0] / 2:
+            if weights[0] == 1:
+                return means[0]
+            return self.min + (means[0] - self.min) * target / (weights[0] / 2)
+        cum = weights[0] / 2
+        for i in range(n - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if target < cum + step:
+                if weights[i] == 1 and target - cum < 0.5:
+                    return means[i]
+                if weights[i + 1] == 1 and cum + step - target <= 0.5:
+                    return means[i + 1]
+                return means[i] + (means[i + 1] - means[i]) * (target - cum) / step
+            cum += step
+        w = weights[n - 1]
+        if w == 1:
+            return means[n - 1]
+        return means[n - 1] + (self.max - means[n - 1]) * (target - cum) / (w / 2)
+
+class QuantileSketch(object):
+    '''
+    Approximate quantiles of each grid cell from mergeable t-digest sketches. The samples are
+    added chunk by chunk (e.g. the time steps of a file iterator), so the full sample array is
+    never in memory. Sketches built by different workers over the same grid merge into one.
+    NaN values are skipped.
+
+    :param compression: (*float*) Compression of the t-digests, the centroid number of a cell is
+        about the compression. Larger compression is more accurate. Default is 100.
+
+    Examples::
+
+        sk = QuantileSketch()
+        for f in files:
+            sk.update(readtmax(f), axis=0)
+        p90 = sk.percentile(90)
+    '''
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.shape = None
+        self.dims = None
+        self.fill_value = -9999.0
+        self.proj = None
+        self.cells = None
+
+    def __repr__(self):
+        return 'QuantileSketch [shape=%s, compression=%s]' % (self.shape, self.compression)
+
+    def _chunks(self, nthread):
+        n = len(self.cells)
+        if nthread is None:
+            nthread = miutil.cpu_count()
+        nchunk = max(1, min(n, nthread * 4))
+        step = max(1, (n + nchunk - 1) // nchunk)
+        return [(i, min(i + step, n)) for i in range(0, n, step)], nthread
+
+    def _init(self, shape):
+        self.shape = tuple(shape)
+        n = 1
+        for s in shape:
+            n *= s
+        self.cells = [_Digest() for i in range(n)]
+
+    def update(self, a, axis=0, nthread=None):
+        '''
+        Add a chunk of samples.
+
+        :param a: (*array_like*) Sample array, the other dimensions than ``axis`` are the grid.
+        :param axis: (*int*) Sample axis. Default is 0.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+        '''
+        if isinstance(a, (list, tuple)):
+            a = MIArray(a)
+        shape = list(a.shape)
+        if axis < 0:
+            axis += len(shape)
+        gshape = shape[:axis] + shape[axis + 1:]
+        if self.cells is None:
+            self._init(gshape)
+            if isinstance(a, DimArray):
+                self.dims = [a.dims[i] for i in range(a.ndim) if i != axis]
+                self.fill_value = a.fill_value
+                self.proj = a.proj
+        elif tuple(gshape) != self.shape:
+            raise ValueError('Grid shape %s does not match the sketch %s' % (tuple(gshape), \
+                self.shape))
+        src = miutil.todouble(a)
+        starts, n, st = _lines(shape, axis)
+        delta = self.compression
+        size = max(16, int(delta) // 2)
+        cells = self.cells
+
+        def part(i0, i1):
+            for i in range(i0, i1):
+                s0 = starts[i]
+                cells[i].add([src[s0 + j * st] for j in range(n)], size, delta)
+
+        ranges, nthread = self._chunks(nthread)
+        miutil.pmap(part, ranges, nthread)
+
+    def merge(self, other, nthread=None):
+        '''
+        Merge another sketch of the same grid into this sketch.
+
+        :param other: (*QuantileSketch*) The other sketch.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+        '''
+        if other.cells is None:
+            return self
+        if self.cells is None:
+            self._init(other.shape)
+            self.dims = other.dims
+            self.fill_value = other.fill_value
+            self.proj = other.proj
+        elif self.shape != other.shape:
+            raise ValueError('Grid shapes do not match: %s, %s' % (self.shape, other.shape))
+        delta = self.compression
+        cells = self.cells
+        ocells = other.cells
+
+        def part(i0, i1):
+            for i in range(i0, i1):
+                cells[i].merge(ocells[i], delta)
+
+        ranges, nthread = self._chunks(nthread)
+        miutil.pmap(part, ranges, nthread)
+        return self
+
+    def quantile(self, q, nthread=None):
+        '''
+        Get the approximate quantile of each grid cell.
+
+        :param q: (*float or list*) Quantile (or quantile list) between 0 and 1.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+        :returns: (*array*) Quantile array with the grid shape, or a list of arrays for a list
+            of quantiles.
+        '''
+        if self.cells is None:
+            raise ValueError('The sketch is empty')
+        qs = q if isinstance(q, (list, tuple)) else [q]
+        delta = self.compression
+        cells = self.cells
+        rs = [jarray.zeros(len(cells), 'd') for x in qs]
+
+        def part(i0, i1):
+            for i in range(i0, i1):
+                c = cells[i]
+                if c.nbuf > 0:
+                    c.compress(delta)
+                for k in range(len(qs)):
+                    rs[k][i] = c.quantile(qs[k])
+
+        ranges, nthread = self._chunks(nthread)
+        miutil.pmap(part, ranges, nthread)
+        r = []
+        for x in rs:
+            x = MIArray(Array.factory(DataType.DOUBLE, list(self.shape), x))
+            if not self.dims is None:
+                x = DimArray(x, self.dims, self.fill_value, self.proj)
+            r.append(x)
+        return r if isinstance(q, (list, tuple)) else r[0]
+
+    def percentile(self, q, nthread=None):
+        '''
+        Get the approximate percentile of each grid cell.
+
+        :param q: (*float or list*) Percentile (or percentile list) between 0 and 100.
+        :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+        :returns: (*array*) Percentile array with the grid shape, or a list of arrays for a list
+            of percentiles.
+        '''
+        if isinstance(q, (list, tuple)):
+            return self.quantile([x / 100. for x in q], nthread)
+        return self.quantile(q / 100., nthread)
+
+    def count(self):
+        '''
+        Get the valid sample number of each grid cell.
+
+        :returns: (*array*) Count array with the grid shape.
+        '''
+        r = jarray.array([c.total + c.nbuf for c in self.cells], 'd')
+        return MIArray(Array.factory(DataType.DOUBLE, list(self.shape), r))
\ No newline at end of file
@@ -12,10 +12,16 @@ from ucar.ma2 import Array
 
 from mipylib.numeric.miarray import MIArray
 import mipylib.numeric.minum as minum
+import mipylib.miutil as miutil
+import mipylib.numeric.trend as trend
+from mipylib.numeric.trend import mktrend
+import _axistests
+from sketch import QuantileSketch
+from resample import bootstrap, permutation_test
 
 __all__ = [
-    'chi2_contingency','chisquare','covariance','cov','pearsonr','spearmanr','kendalltau',
-    'linregress','mlinregress','percentile','ttest_1samp', 'ttest_ind','ttest_rel'
+    'bootstrap','chi2_contingency','chisquare','covariance','cov','pearsonr','spearmanr','kendalltau',
+    'linregress','mktrend','mlinregress','percentile','permutation_test','QuantileSketch','ttest_1samp', 'ttest_ind','ttest_rel'
     ]
 
 def covariance(x, y, bias=False):
@@ -104,7 +110,7 @@ def pearsonr(x, y, axis=None):
         r = StatsUtil.pearsonr(x.array, y.array, axis)
         return MIArray(r[0]), MIArray(r[1])
     
-def kendalltau(x, y):
+def kendalltau(x, y, axis=None, nthread=None):
     '''
     Calculates Kendall's tau, a correlation measure for ordinal data.
     
@@ -116,8 +122,11 @@ def kendalltau(x, y):
     
     :param x: (*array_like*) x data array.
     :param y: (*array_like*) y data array.
+    :param axis: (*int*) By default, the index is into the flattened array, otherwise 
+        along the specified axis.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
-    :returns: Correlation.
+    :returns: Correlation. Correlation and 2-tailed p-value arrays along an axis.
     
     Notes
     -----
@@ -139,14 +148,17 @@ def kendalltau(x, y):
            tables", Software: Practice and Experience, Vol. 24, No. 3,
            pp. 327-336, 1994.
     '''
+    if not axis is None:
+        return _axistests.kendalltau(x, y, axis, nthread)
     if isinstance(x, list):
         x = MIArray(ArrayUtil.array(x))
     if isinstance(y, list):
         y = MIArray(ArrayUtil.array(y))
-    r = StatsUtil.kendalltau(x.asarray(), y.asarray())
-    return r
+    #Merge sort counting of discordant pairs, O(n log n)
+    r = _axistests.kendall(miutil.todouble(x), miutil.todouble(y))
+    return r[0]
 
-def spearmanr(m, y=None, axis=0):
+def spearmanr(m, y=None, axis=0, pointwise=False, nthread=None):
     '''
     Calculates a Spearman rank-order correlation coefficient.
     
@@ -163,9 +175,16 @@ def spearmanr(m, y=None, axis=0):
     :param axis: (*int*) If axis=0 (default), then each column represents a variable, with 
         observations in the rows. If axis=1, the relationship is transposed: each row represents 
         a variable, while the columns contain observations..
+    :param pointwise: (*boolean*) Calculate the correlations of the lines of ``m`` and ``y`` along 
+        ``axis`` (e.g. the time series of each grid point) instead of the correlation matrix. Default 
+        is ``False``, arrays with more than two dimensions are always pointwise.
+    :param nthread: (*int*) Thread number of pointwise correlations. Default is ``None``, means the 
+        processor number.
     
-    :returns: Spearman correlation matrix.
+    :returns: Spearman correlation matrix. Correlation and 2-tailed p-value arrays if pointwise.
     '''
+    if not y is None and (pointwise or (isinstance(m, MIArray) and m.ndim > 2)):
+        return _axistests.spearmanr(m, y, axis, nthread)
     if isinstance(m, list):
         m = MIArray(ArrayUtil.array(m))
     if axis == 1 and m.ndim == 2:
@@ -184,17 +203,24 @@ def spearmanr(m, y=None, axis=0):
         r = StatsUtil.spearmanr(m.asarray(), y.asarray())
         return MIArray(r)
         
-def linregress(x, y, outvdn=False):
+def linregress(x, y, outvdn=False, axis=None, nthread=None):
     '''
     Calculate a linear least-squares regression for two sets of measurements.
     
     :param x, y: (*array_like*) Two sets of measurements. Both arrays should have the same length.
     :param outvdn: (*boolean*) Output validate data number or not. Default is False.
+    :param axis: (*int*) Axis of the measurements. Default is ``None``, means one set of measurements.
+        If set, the regressions of all the lines along the axis are calculated and the results are
+        arrays keeping the other dimensions. ``x`` can be one dimension with the axis length.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
     :returns: Result slope, intercept, relative coefficient, two-sided p-value for a hypothesis test 
         whose null hypothesis is that the slope is zero, standard error of the estimated gradient, 
         validate data number (remove NaN values).
     '''
+    if not axis is None:
+        r = trend.linregress(x, y, axis, nthread)
+        return r if outvdn else r[:5]
     if isinstance(x, list):
         x = MIArray(ArrayUtil.array(x))
     if isinstance(y, list):
@@ -222,20 +248,40 @@ def mlinregress(y, x):
     r = StatsUtil.multipleLineRegress_OLS(y.asarray(), x.asarray())
     return MIArray(r[0]), MIArray(r[1])
     
-def percentile(a, q, axis=None):
+def percentile(a, q, axis=None, method=None, compression=100, nthread=None):
     '''
     Compute the qth percentile of the data along the specified axis.
     
     :param a: (*array_like*) Input array.
     :param q: (*float*) float in range of [0,100].
-        Percentile to compute, which must be between 0 and 100 inclusive.
+        Percentile to compute, which must be between 0 and 100 inclusive. The ``select`` and
+        ``sketch`` methods also take a list of percentiles and return a list of arrays.
     :param axis: (*int*) Axis or axes along which the percentiles are computed. The default is 
         to compute the percentile along a flattened version of the array.
+    :param method: (*string*) Percentile method along an axis, ``axis`` must be given. Default
+        is ``None``, means sorting.
+        ``select``: exact percentiles by selection (quickselect) of each line, NaN values are 
+        removed; ``sketch``: approximate percentiles from t-digest sketches (see ``QuantileSketch``
+        for sketches updated chunk by chunk).
+    :param compression: (*float*) Compression of the ``sketch`` method. Default is 100.
+    :param nthread: (*int*) Thread number of the ``select`` and ``sketch`` methods. Default is 
+        ``None``, means the processor number.
     
     :returns: (*float*) qth percentile value.
     '''
+    if not method is None:
+        if axis is None:
+            raise ValueError('Method %s needs an axis' % method)
+        if method == 'select':
+            return _axistests.percentile(a, q, axis, nthread)
+        elif method == 'sketch':
+            sk = QuantileSketch(compression)
+            sk.update(a, axis, nthread)
+            return sk.percentile(q, nthread)
+        else:
+            raise ValueError('Unknown method: ' + str(method))
     if isinstance(a, list):
-        a = MIArray(ArrayUtil.array(x))
+        a = MIArray(ArrayUtil.array(a))
     if axis is None:
         r = StatsUtil.percentile(a.asarray(), q)
     else:
@@ -243,7 +289,7 @@ def percentile(a, q, axis=None):
         r = MIArray(r)
     return r
     
-def ttest_1samp(a, popmean):
+def ttest_1samp(a, popmean, axis=None, nthread=None):
     '''
     Calculate the T-test for the mean of ONE group of scores.
 
@@ -252,15 +298,20 @@ def ttest_1samp(a, popmean):
     
     :param a: (*array_like*) Sample observation.
     :param popmean: (*float*) Expected value in null hypothesis.
+    :param axis: (*int*) By default, the index is into the flattened array, otherwise 
+        along the specified axis.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
     :returns: t-statistic and p-value
     '''
+    if not axis is None:
+        return _axistests.ttest_1samp(a, popmean, axis, nthread)
     if isinstance(a, list):
-        a = MIArray(ArrayUtil.array(x))
+        a = MIArray(ArrayUtil.array(a))
     r = StatsUtil.tTest(a.asarray(), popmean)
     return r[0], r[1]
     
-def ttest_rel(a, b):
+def ttest_rel(a, b, axis=None, nthread=None):
     '''
     Calculates the T-test on TWO RELATED samples of scores, a and b.
 
@@ -269,9 +320,14 @@ def ttest_rel(a, b):
     
     :param a: (*array_like*) Sample data a.
     :param b: (*array_like*) Sample data b.
+    :param axis: (*int*) By default, the index is into the flattened array, otherwise 
+        along the specified axis.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
     :returns: t-statistic and p-value
     '''
+    if not axis is None:
+        return _axistests.ttest_rel(a, b, axis, nthread)
     if isinstance(a, list):
         a = MIArray(ArrayUtil.array(a))
     if isinstance(b, list):
@@ -279,7 +335,7 @@ def ttest_rel(a, b):
     r = StatsUtil.pairedTTest(a.asarray(), b.asarray())
     return r[0], r[1]
     
-def ttest_ind(a, b):
+def ttest_ind(a, b, axis=None, nthread=None):
     '''
     Calculates the T-test for the means of TWO INDEPENDENT samples of scores.
 
@@ -289,9 +345,14 @@ def ttest_ind(a, b):
     
     :param a: (*array_like*) Sample data a.
     :param b: (*array_like*) Sample data b.
+    :param axis: (*int*) By default, the index is into the flattened array, otherwise 
+        along the specified axis. The sample sizes along the axis can differ.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
     :returns: t-statistic and p-value
     '''
+    if not axis is None:
+        return _axistests.ttest_ind(a, b, axis, nthread)
     if isinstance(a, list):
         a = MIArray(ArrayUtil.array(a))
     if isinstance(b, list):
@@ -299,7 +360,7 @@ def ttest_ind(a, b):
     r = StatsUtil.tTest(a.asarray(), b.asarray())
     return r[0], r[1]
     
-def chisquare(f_obs, f_exp=None):
+def chisquare(f_obs, f_exp=None, axis=None, nthread=None):
     '''
     Calculates a one-way chi square test.
 
@@ -309,9 +370,14 @@ def chisquare(f_obs, f_exp=None):
     :param f_obs: (*array_like*) Observed frequencies in each category.
     :param f_exp: (*array_like*) Expected frequencies in each category. By default the categories 
         are assumed to be equally likely.
+    :param axis: (*int*) By default, the index is into the flattened array, otherwise 
+        the categories are along the specified axis.
+    :param nthread: (*int*) Thread number with ``axis``. Default is ``None``, means the processor number.
     
     :returns: Chi-square statistic and p-value
     '''
+    if not axis is None:
+        return _axistests.chisquare(f_obs, f_exp, axis, nthread)
     if isinstance(f_obs, list):
         f_obs = MIArray(ArrayUtil.array(f_obs))
     if f_exp is None:
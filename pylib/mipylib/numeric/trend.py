@@ -0,0 +1,244 @@
+#-----------------------------------------------------
+# Author: Yaqiang Wang
+# Date: 2026-10-18
+# Purpose: Gridpoint-wise regression and trend analysis along an axis
+# Note: Jython
+#-----------------------------------------------------
+
+import math
+
+from ucar.ma2 import Array, DataType
+from org.apache.commons.math3.special import Beta, Erf
+from java.lang import Double
+import jarray
+
+from miarray import MIArray
+from dimarray import DimArray
+from filters import _lines
+import mipylib.miutil as miutil
+
+nan = Double.NaN
+
+__all__ = ['linregress','mktrend']
+
+def _reduce(func, arrays, axis, nout, nthread=None):
+    '''
+    Apply ``func(*lines)`` to the lines of arrays along an axis in parallel. ``func`` returns
+    ``nout`` values of a line. The arrays have the same shape except the axis length, a one
+    dimension array is the same line for all the lines of a multi-dimensional array.
+
+    :returns: (*list*) ``nout`` double arrays with the shape of the arrays without the axis,
+        or floats if the arrays are one dimension.
+    '''
+    ndim = max([a.ndim for a in arrays])
+    if axis < 0:
+        axis += ndim
+    rshape = None
+    srcs = []
+    for a in arrays:
+        shape = list(a.shape)
+        if a.ndim == 1 and ndim > 1:
+            srcs.append((miutil.todouble(a), None, shape[0], 1))
+            continue
+        if a.ndim != ndim:
+            raise ValueError('Array dimensions do not match: %d, %d' % (a.ndim, ndim))
+        s = shape[:axis] + shape[axis + 1:]
+        if rshape is None:
+            rshape = s
+        elif s != rshape:
+            raise ValueError('Array shapes do not match except the axis: %s, %s' % \
+                (tuple(s), tuple(rshape)))
+        starts, n, st = _lines(shape, axis)
+        srcs.append((miutil.todouble(a), starts, n, st))
+    nfull = [n for src, starts, n, st in srcs if not starts is None][0]
+    for src, starts, n, st in srcs:
+        if starts is None and n != nfull:
+            raise ValueError('One dimension array length must equal the axis length: %d' % nfull)
+    m = 1
+    for s in rshape:
+        m *= s
+    outs = [jarray.zeros(m, 'd') for k in range(nout)]
+
+    def part(i0, i1):
+        for i in range(i0, i1):
+            lines = []
+            for src, starts, n, st in srcs:
+                if starts is None:
+                    lines.append(src)
+                else:
+                    s0 = starts[i]
+                    lines.append([src[s0 + j * st] for j in range(n)])
+            r = func(*lines)
+            for k in range(nout):
+                outs[k][i] = r[k]
+
+    if nthread is None:
+        nthread = miutil.cpu_count()
+    nchunk = max(1, min(m, nthread * 4))
+    step = max(1, (m + nchunk - 1) // nchunk)
+    miutil.pmap(part, [(i, min(i + step, m)) for i in range(0, m, step)], nthread)
+    if len(rshape) == 0:
+        return [o[0] for o in outs]
+    return [Array.factory(DataType.DOUBLE, rshape, o) for o in outs]
+
+def _wrapreduced(a, r, axis):
+    '''
+    Wrap a reduced array, a DimArray keeps the dimensions except the axis.
+    '''
+    if not isinstance(r, Array):
+        return r
+    if isinstance(a, DimArray):
+        if axis < 0:
+            axis += a.ndim
+        dims = [a.dims[i] for i in range(a.ndim) if i != axis]
+        return DimArray(MIArray(r), dims, a.fill_value, a.proj)
+    return MIArray(r)
+
+def _asarray(a):
+    if isinstance(a, (list, tuple)):
+        return MIArray(a)
+    return a
+
+def _linfit(xs, ys):
+    '''
+    Least-squares line of the valid pairs of a line.
+    '''
+    x = []
+    y = []
+    for a, b in zip(xs, ys):
+        if a == a and b == b:
+            x.append(a)
+            y.append(b)
+    n = len(x)
+    if n < 3:
+        return nan, nan, nan, nan, nan, n
+    mx = sum(x) / n
+    my = sum(y) / n
+    sxx = 0.0
+    syy = 0.0
+    sxy = 0.0
+    for a, b in zip(x, y):
+        dx = a - mx
+        dy = b - my
+        sxx += dx * dx
+        syy += dy * dy
+        sxy += dx * dy
+    if sxx == 0:
+        return nan, nan, nan, nan, nan, n
+    slope = sxy / sxx
+    intercept = my - slope * mx
+    if syy == 0:
+        r = 0.0
+    else:
+        r = min(1.0, max(-1.0, sxy / math.sqrt(sxx * syy)))
+    df = n - 2
+    if abs(r) == 1:
+        return slope, intercept, r, 0.0, 0.0, n
+    t = r * math.sqrt(df / ((1.0 - r) * (1.0 + r)))
+    p = Beta.regularizedBeta(df / (df + t * t), 0.5 * df, 0.5)
+    stderr = math.sqrt((1 - r * r) * syy / sxx / df)
+    return slope, intercept, r, p, stderr, n
+
+def linregress(x, y, axis=0, nthread=None):
+    '''
+    Linear least-squares regression of each line along an axis, evaluated for all the lines
+    in parallel. NaN pairs are removed.
+
+    :param x: (*array_like*) X values, one dimension with the axis length or the same shape
+        as ``y``.
+    :param y: (*array_like*) Y values.
+    :param axis: (*int*) Axis of the samples. Default is 0.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: Slope, intercept, correlation coefficient, two-sided p-value for a hypothesis test
+        whose null hypothesis is that the slope is zero, standard error of the estimated slope and
+        validate data number. Arrays keep the dimensions of ``y`` except the axis.
+    '''
+    x = _asarray(x)
+    y = _asarray(y)
+    r = _reduce(_linfit, [x, y], axis, 6, nthread)
+    a = y if y.ndim >= x.ndim else x
+    return tuple([_wrapreduced(a, v, axis) for v in r])
+
+def _median(v):
+    v = sorted(v)
+    n = len(v)
+    if n == 0:
+        return nan
+    if n % 2 == 1:
+        return v[n // 2]
+    return 0.5 * (v[n // 2 - 1] + v[n // 2])
+
+def _mk(xs, ys):
+    '''
+    Sen's slope and Mann-Kendall test of the valid pairs of a line.
+    '''
+    pts = sorted([(a, b) for a, b in zip(xs, ys) if a == a and b == b])
+    n = len(pts)
+    if n < 3:
+        return nan, nan, nan, nan
+    x = [p[0] for p in pts]
+    y = [p[1] for p in pts]
+    slopes = []
+    s = 0
+    for i in range(n - 1):
+        xi = x[i]
+        yi = y[i]
+        for j in range(i + 1, n):
+            dx = x[j] - xi
+            if dx == 0:
+                continue
+            dy = y[j] - yi
+            slopes.append(dy / dx)
+            if dy > 0:
+                s += 1
+            elif dy < 0:
+                s -= 1
+    slope = _median(slopes)
+    intercept = _median(y) - slope * _median(x)
+    #Variance of S with the correction of tied groups
+    ties = 0
+    ys = sorted(y)
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and ys[j + 1] == ys[i]:
+            j += 1
+        t = j - i + 1
+        ties += t * (t - 1) * (2 * t + 5)
+        i = j + 1
+    var = (n * (n - 1) * (2 * n + 5) - ties) / 18.0
+    if var <= 0:
+        return slope, intercept, nan, nan
+    if s > 0:
+        z = (s - 1) / math.sqrt(var)
+    elif s < 0:
+        z = (s + 1) / math.sqrt(var)
+    else:
+        z = 0.0
+    p = Erf.erfc(abs(z) / math.sqrt(2))
+    return slope, intercept, z, p
+
+def mktrend(y, x=None, axis=0, nthread=None):
+    '''
+    Sen's slope and Mann-Kendall trend test of each line along an axis, evaluated for all the
+    lines in parallel. NaN values are removed.
+
+    :param y: (*array_like*) Y values.
+    :param x: (*array_like*) X values, one dimension with the axis length or the same shape
+        as ``y``. Default is ``None``, means 0, 1, 2, ...
+    :param axis: (*int*) Axis of the samples. Default is 0.
+    :param nthread: (*int*) Thread number. Default is ``None``, means the processor number.
+
+    :returns: Sen's slope (median of the pairwise slopes), intercept, Mann-Kendall Z statistic
+        and two-sided p-value. Arrays keep the dimensions of ``y`` except the axis.
+    '''
+    y = _asarray(y)
+    if x is None:
+        ax = axis + y.ndim if axis < 0 else axis
+        x = MIArray(range(y.shape[ax]))
+    else:
+        x = _asarray(x)
+    r = _reduce(_mk, [x, y], axis, 4, nthread)
+    a = y if y.ndim >= x.ndim else x
+    return tuple([_wrapreduced(a, v, axis) for v in r])
\ No newline at end of file